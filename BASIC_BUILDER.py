@@ -1,7 +1,11 @@
 """This script creates the monthly member detail excel reports for the QBH program
 Clinical Quality Metrics"""
 
+import multiprocessing
+import os
 import sys
+import time
+import traceback
 import xlsxwriter
 import pandas
 from qbfunctions import qbfunctions
@@ -25,8 +29,28 @@ except BaseException:
           "./cqm_detail.py 2019 2")
     quit()
 
+# Reports whose inputs have not changed since the last run are skipped unless
+# --force is given: ./cqm_detail.py 2019 2 --force
+FORCE_REBUILD = "--force" in sys.argv[3:]
+
 DATES = qbfunctions.dates(MONTH, YEAR)
 
+# Number of processes used to load the SAS datasets
+LOAD_WORKERS = int(os.environ.get("QB_LOAD_WORKERS", 8))
+# Number of processes used to build the hospital reports, 1 builds them
+# one at a time in this process
+REPORT_WORKERS = int(os.environ.get("QB_REPORT_WORKERS", os.cpu_count()))
+# Machine-readable copies of the member detail sheets to write next to each
+# workbook, e.g. QB_EXPORT_FORMATS=parquet,csv. By default only the xlsx files
+# are written.
+EXPORT_FORMATS = [i for i in os.environ.get(
+    "QB_EXPORT_FORMATS", "").split(",") if i]
+# Number of background threads that copy finished workbooks to the OUT
+# directory, and the local directory the workbooks are written to first (the
+# system temporary directory by default)
+FLUSH_WORKERS = int(os.environ.get("QB_FLUSH_WORKERS", 2))
+SCRATCH_DIR = os.environ.get("QB_SCRATCH_DIR")
+
 PROVIDER = "/n04/data/p4vrept/Data/Provider/qb_hospitals_2019.sas7bdat"
 
 QBH_DIR = "/n04/data/p4vrept/Programs/Quality_Blue_Hospital_2019/"
@@ -102,117 +126,82 @@ CQM_MBR_DETAIL = DATA_DIR + "cqm_mbr_detail_" + \
     str(YEAR) + "_" + str('{0:0>2}'.format(MONTH)) + "_prosp.sas7bdat"
 
 
-PROVIDER = qbfunctions.loadsas(PROVIDER)
-PROVIDER = qbfunctions.decoder(PROVIDER)
-
-# Load the SAS datasets into pandas dataframes
-MEMBER_HOSP03 = qbfunctions.loadsas(MEMBER_HOSP03)
-HOSP03_SCORES = qbfunctions.loadsas(HOSP03_SCORES)
-MEMBER_HOSP04 = qbfunctions.loadsas(MEMBER_HOSP04)
-HOSP04_SCORES = qbfunctions.loadsas(HOSP04_SCORES)
-MEMBER_HOSP19 = qbfunctions.loadsas(MEMBER_HOSP19)
-HOSP19_SCORES = qbfunctions.loadsas(HOSP19_SCORES)
-MEMBER_HOSP20 = qbfunctions.loadsas(MEMBER_HOSP20)
-HOSP20_SCORES = qbfunctions.loadsas(HOSP20_SCORES)
-MEMBER_HOSP21 = qbfunctions.loadsas(MEMBER_HOSP21)
-HOSP21_SCORES = qbfunctions.loadsas(HOSP21_SCORES)
-MEMBER_RRAMA = qbfunctions.loadsas(MEMBER_RRAMA)
-RRAMA_SCORES = qbfunctions.loadsas(RRAMA_SCORES)
-MEMBER_RRACOMM = qbfunctions.loadsas(MEMBER_RRACOMM)
-RRACOMM_SCORES = qbfunctions.loadsas(RRACOMM_SCORES)
-MEMBER_HOSP22 = qbfunctions.loadsas(MEMBER_HOSP22)
-HOSP22_SCORES = qbfunctions.loadsas(HOSP22_SCORES)
-MEMBER_HOSP23 = qbfunctions.loadsas(MEMBER_HOSP23)
-HOSP23_SCORES = qbfunctions.loadsas(HOSP23_SCORES)
-MEMBER_HOSP24 = qbfunctions.loadsas(MEMBER_HOSP24)
-HOSP24_SCORES = qbfunctions.loadsas(HOSP24_SCORES)
-CQM_MBR_DETAIL = qbfunctions.loadsas(CQM_MBR_DETAIL)
-
-# Decode the byte objects into strings
-MEMBER_HOSP03 = qbfunctions.decoder(MEMBER_HOSP03)
-HOSP03_SCORES = qbfunctions.decoder(HOSP03_SCORES)
-MEMBER_HOSP04 = qbfunctions.decoder(MEMBER_HOSP04)
-HOSP04_SCORES = qbfunctions.decoder(HOSP04_SCORES)
-MEMBER_HOSP19 = qbfunctions.decoder(MEMBER_HOSP19)
-HOSP19_SCORES = qbfunctions.decoder(HOSP19_SCORES)
-MEMBER_HOSP20 = qbfunctions.decoder(MEMBER_HOSP20)
-HOSP20_SCORES = qbfunctions.decoder(HOSP20_SCORES)
-MEMBER_HOSP21 = qbfunctions.decoder(MEMBER_HOSP21)
-HOSP21_SCORES = qbfunctions.decoder(HOSP21_SCORES)
-MEMBER_RRAMA = qbfunctions.decoder(MEMBER_RRAMA)
-RRAMA_SCORES = qbfunctions.decoder(RRAMA_SCORES)
-MEMBER_RRACOMM = qbfunctions.decoder(MEMBER_RRACOMM)
-RRACOMM_SCORES = qbfunctions.decoder(RRACOMM_SCORES)
-MEMBER_HOSP22 = qbfunctions.decoder(MEMBER_HOSP22)
-HOSP22_SCORES = qbfunctions.decoder(HOSP22_SCORES)
-MEMBER_HOSP23 = qbfunctions.decoder(MEMBER_HOSP23)
-HOSP23_SCORES = qbfunctions.decoder(HOSP23_SCORES)
-MEMBER_HOSP24 = qbfunctions.decoder(MEMBER_HOSP24)
-HOSP24_SCORES = qbfunctions.decoder(HOSP24_SCORES)
-CQM_MBR_DETAIL = qbfunctions.decoder(CQM_MBR_DETAIL)
+# Load the SAS datasets into pandas dataframes and decode the byte objects
+# into strings. The files are read concurrently by LOAD_WORKERS processes.
+# Decoded datasets are cached locally, so a rerun only parses the files that
+# changed since the last run. Member datasets are limited to the columns the
+# reports use. Missing values stay typed (NaN, pandas strings) and only
+# become blank cells when the detail writers write them.
+SAS_DATASETS = {
+    'PROVIDER': (PROVIDER, qbfunctions.detail_columns['provider']),
+    'MEMBER_HOSP03': (MEMBER_HOSP03, qbfunctions.detail_columns['hosp03']),
+    'HOSP03_SCORES': (HOSP03_SCORES, None),
+    'MEMBER_HOSP04': (MEMBER_HOSP04, qbfunctions.detail_columns['hosp04']),
+    'HOSP04_SCORES': (HOSP04_SCORES, None),
+    'MEMBER_HOSP19': (MEMBER_HOSP19, qbfunctions.detail_columns['hosp19']),
+    'HOSP19_SCORES': (HOSP19_SCORES, None),
+    'MEMBER_HOSP20': (MEMBER_HOSP20, qbfunctions.detail_columns['hosp20']),
+    'HOSP20_SCORES': (HOSP20_SCORES, None),
+    'MEMBER_HOSP21': (MEMBER_HOSP21, qbfunctions.detail_columns['hosp21']),
+    'HOSP21_SCORES': (HOSP21_SCORES, None),
+    'MEMBER_RRAMA': (MEMBER_RRAMA, qbfunctions.detail_columns['rrama']),
+    'RRAMA_SCORES': (RRAMA_SCORES, None),
+    'MEMBER_RRACOMM': (MEMBER_RRACOMM, qbfunctions.detail_columns['rracomm']),
+    'RRACOMM_SCORES': (RRACOMM_SCORES, None),
+    'MEMBER_HOSP22': (MEMBER_HOSP22, qbfunctions.detail_columns['hosp22']),
+    'HOSP22_SCORES': (HOSP22_SCORES, None),
+    'MEMBER_HOSP23': (MEMBER_HOSP23, qbfunctions.detail_columns['hosp23']),
+    'HOSP23_SCORES': (HOSP23_SCORES, None),
+    'MEMBER_HOSP24': (MEMBER_HOSP24, qbfunctions.detail_columns['hosp24']),
+    'HOSP24_SCORES': (HOSP24_SCORES, None),
+    'CQM_MBR_DETAIL': (CQM_MBR_DETAIL, qbfunctions.detail_columns['cqm_mbr_detail'])
+}
+
+FRAMES = qbfunctions.loadsas_parallel(
+    SAS_DATASETS, workers=LOAD_WORKERS, decode=True, typed=True)
+
+PROVIDER = FRAMES['PROVIDER']
+MEMBER_HOSP03 = FRAMES['MEMBER_HOSP03']
+HOSP03_SCORES = FRAMES['HOSP03_SCORES']
+MEMBER_HOSP04 = FRAMES['MEMBER_HOSP04']
+HOSP04_SCORES = FRAMES['HOSP04_SCORES']
+MEMBER_HOSP19 = FRAMES['MEMBER_HOSP19']
+HOSP19_SCORES = FRAMES['HOSP19_SCORES']
+MEMBER_HOSP20 = FRAMES['MEMBER_HOSP20']
+HOSP20_SCORES = FRAMES['HOSP20_SCORES']
+MEMBER_HOSP21 = FRAMES['MEMBER_HOSP21']
+HOSP21_SCORES = FRAMES['HOSP21_SCORES']
+MEMBER_RRAMA = FRAMES['MEMBER_RRAMA']
+RRAMA_SCORES = FRAMES['RRAMA_SCORES']
+MEMBER_RRACOMM = FRAMES['MEMBER_RRACOMM']
+RRACOMM_SCORES = FRAMES['RRACOMM_SCORES']
+MEMBER_HOSP22 = FRAMES['MEMBER_HOSP22']
+HOSP22_SCORES = FRAMES['HOSP22_SCORES']
+MEMBER_HOSP23 = FRAMES['MEMBER_HOSP23']
+HOSP23_SCORES = FRAMES['HOSP23_SCORES']
+MEMBER_HOSP24 = FRAMES['MEMBER_HOSP24']
+HOSP24_SCORES = FRAMES['HOSP24_SCORES']
+CQM_MBR_DETAIL = FRAMES['CQM_MBR_DETAIL']
+
+REPORT_DATASETS = {
+    'provider': PROVIDER,
+    'hosp03': MEMBER_HOSP03,
+    'hosp04': MEMBER_HOSP04,
+    'hosp19': MEMBER_HOSP19,
+    'hosp20': MEMBER_HOSP20,
+    'hosp21': MEMBER_HOSP21,
+    'rrama': MEMBER_RRAMA,
+    'rracomm': MEMBER_RRACOMM,
+    'hosp22': MEMBER_HOSP22,
+    'hosp23': MEMBER_HOSP23,
+    'hosp24': MEMBER_HOSP24,
+    'cqm_mbr_detail': CQM_MBR_DETAIL
+}
 
 # Fix the dates into excel format
-
-
-def sasdate2xl(dfcol):
-    newcol = []
-    for i in newcol:
-        if i != "":
-            i = i - 9342
-        newcol.append(i)
-    return newcol
-
-
-MEMBER_HOSP03["EACM_BIR_DT"] = MEMBER_HOSP03["EACM_BIR_DT"].apply(lambda x: x + 21916)
-MEMBER_HOSP03["EAC_ADMM_DT"] = MEMBER_HOSP03["EAC_ADMM_DT"].apply(lambda x: x + 21916)
-MEMBER_HOSP03["EAC_DCG_DT"] = MEMBER_HOSP03["EAC_DCG_DT"].apply(lambda x: x + 21916)
-MEMBER_HOSP03["dx_svce_dt"] = MEMBER_HOSP03["dx_svce_dt"].where(MEMBER_HOSP03["dx_svce_dt"] != "").apply(lambda x: x + 21916)
-MEMBER_HOSP03["dx2_svce_dt"] = MEMBER_HOSP03["dx2_svce_dt"].where(MEMBER_HOSP03["dx2_svce_dt"] != "").apply(lambda x: x + 21916)
-MEMBER_HOSP03["dx3_svce_dt"] = MEMBER_HOSP03["dx3_svce_dt"].where(MEMBER_HOSP03["dx3_svce_dt"] != "").apply(lambda x: x + 21916)
-MEMBER_HOSP03["proc_svce_dt"] = MEMBER_HOSP03["proc_svce_dt"].where(MEMBER_HOSP03["proc_svce_dt"] != "").apply(lambda x: x + 21916)
-MEMBER_HOSP03["pall_care_svce_dt"] = MEMBER_HOSP03["pall_care_svce_dt"].where(MEMBER_HOSP03["pall_care_svce_dt"] != "").apply(lambda x: x + 21916)
-
-MEMBER_HOSP04["EACM_BIR_DT"] = MEMBER_HOSP04["EACM_BIR_DT"].apply(lambda x: x + 21916)
-MEMBER_HOSP04["EAC_ADMM_DT"] = MEMBER_HOSP04["EAC_ADMM_DT"].apply(lambda x: x + 21916)
-MEMBER_HOSP04["EAC_DCG_DT"] = MEMBER_HOSP04["EAC_DCG_DT"].apply(lambda x: x + 21916)
-MEMBER_HOSP04["dx_svce_dt"] = MEMBER_HOSP04["dx_svce_dt"].where(MEMBER_HOSP04["dx_svce_dt"] != "").apply(lambda x: x + 21916)
-MEMBER_HOSP04["dx2_svce_dt"] = MEMBER_HOSP04["dx2_svce_dt"].where(MEMBER_HOSP04["dx2_svce_dt"] != "").apply(lambda x: x + 21916)
-MEMBER_HOSP04["dx3_svce_dt"] = MEMBER_HOSP04["dx3_svce_dt"].where(MEMBER_HOSP04["dx3_svce_dt"] != "").apply(lambda x: x + 21916)
-MEMBER_HOSP04["proc_svce_dt"] = MEMBER_HOSP04["proc_svce_dt"].where(MEMBER_HOSP04["proc_svce_dt"] != "").apply(lambda x: x + 21916)
-MEMBER_HOSP04["pall_care_svce_dt"] = MEMBER_HOSP04["pall_care_svce_dt"].where(MEMBER_HOSP04["pall_care_svce_dt"] != "").apply(lambda x: x + 21916)
-
-MEMBER_HOSP19["EACM_BIR_DT"] = MEMBER_HOSP19["EACM_BIR_DT"].apply(lambda x: x + 21916)
-MEMBER_HOSP19["SVCE_DT"] = MEMBER_HOSP19["SVCE_DT"].apply(lambda x: x + 21916)
-MEMBER_HOSP19["num_svce_dt"] = MEMBER_HOSP19["num_svce_dt"].where(MEMBER_HOSP19["num_svce_dt"] != "").apply(lambda x: x + 21916)
-
-MEMBER_HOSP20["EACM_BIR_DT"] = MEMBER_HOSP20["EACM_BIR_DT"].apply(lambda x: x + 21916)
-MEMBER_HOSP20["SVCE_DT"] = MEMBER_HOSP20["SVCE_DT"].apply(lambda x: x + 21916)
-MEMBER_HOSP20["num_svce_dt"] = MEMBER_HOSP20["num_svce_dt"].where(MEMBER_HOSP20["num_svce_dt"] != "").apply(lambda x: x + 21916)
-
-MEMBER_HOSP21["EACM_BIR_DT"] = MEMBER_HOSP21["EACM_BIR_DT"].apply(lambda x: x + 21916)
-MEMBER_HOSP21["EAC_ADMM_DT"] = MEMBER_HOSP21["EAC_ADMM_DT"].apply(lambda x: x + 21916)
-MEMBER_HOSP21["EAC_DCG_DT"] = MEMBER_HOSP21["EAC_DCG_DT"].apply(lambda x: x + 21916)
-MEMBER_HOSP21["follow_up_svce_dt"] = MEMBER_HOSP21["follow_up_svce_dt"].where(MEMBER_HOSP21["follow_up_svce_dt"] != "").apply(lambda x: x + 21916)
-
-MEMBER_RRAMA["eacm_bir_dt"] = MEMBER_RRAMA["eacm_bir_dt"].apply(lambda x: x + 21916)
-MEMBER_RRAMA["ADM_DT2"] = MEMBER_RRAMA["ADM_DT2"].apply(lambda x: x + 21916)
-MEMBER_RRAMA["IESD2"] = MEMBER_RRAMA["IESD2"].apply(lambda x: x + 21916)
-MEMBER_RRAMA["READMITDATE30"] = MEMBER_RRAMA["READMITDATE30"].where(MEMBER_RRAMA["READMITDATE30"] != "").apply(lambda x: x + 21916)
-
-MEMBER_RRACOMM["eacm_bir_dt"] = MEMBER_RRACOMM["eacm_bir_dt"].apply(lambda x: x + 21916)
-MEMBER_RRACOMM["ADM_DT2"] = MEMBER_RRACOMM["ADM_DT2"].apply(lambda x: x + 21916)
-MEMBER_RRACOMM["IESD2"] = MEMBER_RRACOMM["IESD2"].apply(lambda x: x + 21916)
-MEMBER_RRACOMM["READMITDATE30"] = MEMBER_RRACOMM["READMITDATE30"].where(MEMBER_RRACOMM["READMITDATE30"] != "").apply(lambda x: x + 21916)
-
-MEMBER_HOSP22["EACM_BIR_DT"] = MEMBER_HOSP22["EACM_BIR_DT"].apply(lambda x: x + 21916)
-MEMBER_HOSP22["svce_dt"] = MEMBER_HOSP22["svce_dt"].apply(lambda x: x + 21916)
-MEMBER_HOSP23["EACM_BIR_DT"] = MEMBER_HOSP23["EACM_BIR_DT"].apply(lambda x: x + 21916)
-MEMBER_HOSP23["svce_dt"] = MEMBER_HOSP23["svce_dt"].apply(lambda x: x + 21916)
-MEMBER_HOSP24["EACM_BIR_DT"] = MEMBER_HOSP24["EACM_BIR_DT"].apply(lambda x: x + 21916)
-MEMBER_HOSP24["svce_dt"] = MEMBER_HOSP24["svce_dt"].apply(lambda x: x + 21916)
-
-CQM_MBR_DETAIL["mbr_bir_dt"] = CQM_MBR_DETAIL["mbr_bir_dt"].apply(lambda x: x + 21916)
-CQM_MBR_DETAIL["LAST_PCP_VISIT_DATE"] = CQM_MBR_DETAIL["LAST_PCP_VISIT_DATE"].where(CQM_MBR_DETAIL["LAST_PCP_VISIT_DATE"] != "").apply(lambda x: x + 21916)
+for DATE_NAME in qbfunctions.date_columns:
+    qbfunctions.sas_to_excel_dates(
+        REPORT_DATASETS[DATE_NAME], qbfunctions.date_columns[DATE_NAME])
 
 
 #print("NO FILTERING", member_hosp03)
@@ -340,384 +329,142 @@ DEFINITIONS.append(['Readm - MA and Comm',
                     ' when the return occurs to the facility of the Index Admission or will show "Other"'])
 
 
-def filterdf(df, col, var):
-    df = df.copy(deep=True).where(df[col] == var).dropna(how='all')
-    return df
-
-
-def cqm_detail_report(hospital_id, id_var, name_var, outdir):
-
-    prov = filterdf(PROVIDER, id_var, hospital_id)
-    hosp03 = filterdf(MEMBER_HOSP03, id_var, hospital_id)
+# The parts of each report that are the same for every hospital are built once
+# per run and stamped into each workbook: the title block at the top of every
+# sheet, with the hospital name written on row 1 by the report, and the
+# Definitions sheet
+TITLE_BLOCK = [
+    ('write', (0, 0, str(YEAR) +
+               ' QUALITY BLUE HOSPITAL - CLINICAL QUALITY METRICS DETAIL'),
+     'title1'),
+    ('write', (2, 0, "CLAIMS PAID THROUGH: " + DATES["Claims Paid"]),
+     'title2'),
+    ('write', (3, 0, "CLAIMS INCURRED THROUGH: " + DATES["Claims Incurred"]),
+     'title2')]
+
+DEFINITIONS_SHEET = TITLE_BLOCK + [
+    ('write_row', (5, 0, DEFINITIONS[0]), 'header'),
+    ('set_column', (0, 2, 20), None),
+    ('set_column', (3, 3, 150), None)]
+for DEF_ROW in range(1, len(DEFINITIONS)):
+    DEFINITIONS_SHEET.append(
+        ('write_row', (5 + DEF_ROW, 0, DEFINITIONS[DEF_ROW]), 'table_body'))
+
+# The member detail sheets of each report, in order: sheet name, dataset,
+# detail spec, the denominator and numerator columns of the rate formula and
+# the table title. The Member Summary has no rate row, so its table starts a
+# row higher.
+REPORT_SHEETS = [
+    ('Member Summary', 'cqm_mbr_detail', 'cqm_mbr_detail', None, ''),
+    ('Hosp03 - Pall Care MA', 'hosp03', 'hosp03', (12, 21), ''),
+    ('Hosp04 - Pall Care COMM', 'hosp04', 'hosp04', (12, 21), ''),
+    ("Hosp19 - 3 Day ED (MA)", 'hosp19', 'hosp19', (6, 10),
+     qbfunctions.cqmbenchmarks['hosp19']['title']),
+    ("Hosp20 - 3 Day ED (Comm)", 'hosp20', 'hosp19', (6, 10),
+     qbfunctions.cqmbenchmarks['hosp20']['title']),
+    ("Readm - MA", 'rrama', 'reads', (7, 12),
+     qbfunctions.cqmbenchmarks['rrama']['title']),
+    ("Readm - Comm", 'rracomm', 'reads', (7, 12),
+     qbfunctions.cqmbenchmarks['rracomm']['title']),
+    ("Hosp21 - 7 Day Follow-up", 'hosp21', 'hosp21', (7, 13), ''),
+    ('Hosp22 - Preop Lab', 'hosp22', 'hosp22', (6, 8), ''),
+    ('Hosp23 - Preop Cardiac', 'hosp23', 'hosp23', (6, 8), ''),
+    ('Hosp24 - Preop EKG', 'hosp24', 'hosp24', (6, 8), '')]
+
+
+# Index every report dataset by hospital and by Quality Blue ID once, so each
+# report takes its rows by position instead of filtering the full datasets
+PARTITIONS = {}
+for PART_VAR in ['hospital_id2', 'quality_blue_id']:
+    PARTITIONS[PART_VAR] = {}
+    for PART_NAME in REPORT_DATASETS:
+        PARTITIONS[PART_VAR][PART_NAME] = qbfunctions.partition(
+            REPORT_DATASETS[PART_NAME], PART_VAR)
+
+
+def filterdf(name, id_var, hospital_id):
     try:
-        hosp03_den = hosp03['hosp03_den'].sum()
-        hosp03_num = hosp03['hosp03_num'].sum()
-    except BaseException:
-        hosp03_den = 0
-        hosp03_num = 0
+        return REPORT_DATASETS[name].take(
+            PARTITIONS[id_var][name][hospital_id])
+    except KeyError:
+        return REPORT_DATASETS[name].iloc[0:0]
 
-    #print(hosp03_den, hosp03_num)
 
-    hosp04 = filterdf(MEMBER_HOSP04, id_var, hospital_id)
-    try:
-        hosp04_den = hosp04['hosp04_den'].sum()
-        hosp04_num = hosp04['hosp04_num'].sum()
-    except BaseException:
-        hosp04_den = 0
-        hosp04_num = 0
+def report_path(hospital_id, outdir):
+    return outdir + "H_" + hospital_id + \
+        "_MO_NH_Quality_Blue_CQM_Member_Detail.xlsx"
 
-    #print(hosp04_den, hosp04_num)
 
-    #print("First dataset load", hosp03)
-    hosp19 = filterdf(MEMBER_HOSP19, id_var, hospital_id)
-    try:
-        hosp19_den = hosp19['hosp19_den'].sum()
-        hosp19_num = hosp19['hosp19_num'].sum()
-    except BaseException:
-        hosp19_den = 0
-        hosp19_num = 0
+# Hash of the report layout: the rendering code's layout version, the
+# definitions, the report sheets and the detail specs they are rendered from
+LAYOUT_HASH = qbfunctions.content_hash(
+    [], qbfunctions.layout_version, DEFINITIONS_SHEET, REPORT_SHEETS,
+    qbfunctions.detail_specs)
 
-    hosp20 = filterdf(MEMBER_HOSP20, id_var, hospital_id)
-    try:
-        hosp20_den = hosp20['hosp20_den'].sum()
-        hosp20_num = hosp20['hosp20_num'].sum()
-    except BaseException:
-        hosp20_den = 0
-        hosp20_num = 0
-
-    hosp21 = filterdf(MEMBER_HOSP21, id_var, hospital_id)
-    try:
-        hosp21_den = hosp21['hosp21_den'].sum()
-        hosp21_num = hosp21['hosp21_num'].sum()
-    except BaseException:
-        hosp21_den = 0
-        hosp21_num = 0
-
-    rrama = filterdf(MEMBER_RRAMA, id_var, hospital_id)
-    try:
-        rrama_den = rrama['rrama_den'].sum()
-        rrama_num = rrama['rrama_num'].sum()
-    except BaseException:
-        rrama_den = 0
-        rrama_num = 0
-
-    rracomm = filterdf(MEMBER_RRACOMM, id_var, hospital_id)
-    try:
-        rracomm_den = rracomm['rracomm_den'].sum()
-        rracomm_num = rracomm['rracomm_num'].sum()
-    except BaseException:
-        rracomm_den = 0
-        rracomm_num = 0
 
-    hosp22 = filterdf(MEMBER_HOSP22, id_var, hospital_id)
-    try:
-        hosp22_den = hosp22['hosp22_den'].sum()
-        hosp22_num = hosp22['hosp22_num'].sum()
-    except BaseException:
-        hosp22_den = 0
-        hosp22_num = 0
+# Hash of everything a report is built from: each dataset's rows for the
+# hospital, the reporting period headers, the export formats and the layout
+def report_hash(hospital_id, id_var):
+    frames = [filterdf(name, id_var, hospital_id) for name in REPORT_DATASETS]
+    return qbfunctions.content_hash(
+        frames, YEAR, DATES["Claims Paid"], DATES["Claims Incurred"],
+        EXPORT_FORMATS, LAYOUT_HASH)
 
-    hosp23 = filterdf(MEMBER_HOSP23, id_var, hospital_id)
-    try:
-        hosp23_den = hosp23['hosp23_den'].sum()
-        hosp23_num = hosp23['hosp23_num'].sum()
-    except BaseException:
-        hosp23_den = 0
-        hosp23_num = 0
 
-    hosp24 = filterdf(MEMBER_HOSP24, id_var, hospital_id)
-    try:
-        hosp24_den = hosp24['hosp24_den'].sum()
-        hosp24_num = hosp24['hosp24_num'].sum()
-    except BaseException:
-        hosp24_den = 0
-        hosp24_num = 0
+# With a flusher the report files are written to its scratch directory and
+# copied to outdir in the background
+def cqm_detail_report(hospital_id, id_var, name_var, outdir, flusher=None):
 
-    mbr_detail = filterdf(CQM_MBR_DETAIL, id_var, hospital_id)
+    prov = filterdf('provider', id_var, hospital_id)
+    hospital = hospital_id + ' - ' + prov[name_var].values[0]
+    path = report_path(hospital_id, outdir)
+    target = path if flusher is None else flusher.local(path)
 
     # Create the xlsx file
     workbook = xlsxwriter.Workbook(
-        outdir +
-        "H_" +
-        hospital_id +
-        "_MO_NH_Quality_Blue_CQM_Member_Detail.xlsx",
+        target,
         {
             'nan_inf_to_errors': True})
 
-    qbfunctions.highmark_styles(workbook)
+    styles = qbfunctions.highmark_styles(workbook)
 
     worksheet = workbook.add_worksheet('Definitions')
-    worksheet.write(
-        0,
-        0,
-        str(YEAR) +
-        ' QUALITY BLUE HOSPITAL - CLINICAL QUALITY METRICS DETAIL',
-        qbfunctions.title1)
-    worksheet.write(1, 0, hospital_id + ' - ' +
-                    prov[name_var].values[0], qbfunctions.title2)
-    worksheet.write(2, 0, "CLAIMS PAID THROUGH: " +
-                    DATES["Claims Paid"], qbfunctions.title2)
-    worksheet.write(3, 0, "CLAIMS INCURRED THROUGH: " +
-                    DATES["Claims Incurred"], qbfunctions.title2)
-
-    startrow = 5
-    worksheet.write_row(startrow, 0, DEFINITIONS[0], qbfunctions.header)
-    currow = startrow + 1
-    worksheet.set_column(0, 2, 20)
-    worksheet.set_column(3, 3, 150)
-    for i in range(1, len(DEFINITIONS)):
-        worksheet.write_row(currow, 0, DEFINITIONS[i], qbfunctions.table_body)
-        currow = currow + 1
-
-    worksheet = workbook.add_worksheet('Member Summary')
-    worksheet.write(
-        0,
-        0,
-        str(YEAR) +
-        ' QUALITY BLUE HOSPITAL - CLINICAL QUALITY METRICS DETAIL',
-        qbfunctions.title1)
-    worksheet.write(1, 0, hospital_id + ' - ' + prov[name_var].values[0],
-                    qbfunctions.title2)
-    worksheet.write(2, 0, "CLAIMS PAID THROUGH: " + DATES["Claims Paid"],
-                    qbfunctions.title2)
-    worksheet.write(
-        3,
-        0,
-        "CLAIMS INCURRED THROUGH: " +
-        DATES["Claims Incurred"],
-        qbfunctions.title2)
-
-    qbfunctions.cqm_mbr_detail(worksheet, mbr_detail, startrow=5, startcol=0)
-
-    worksheet = workbook.add_worksheet('Hosp03 - Pall Care MA')
-    worksheet.write(
-        0,
-        0,
-        str(YEAR) +
-        ' QUALITY BLUE HOSPITAL - CLINICAL QUALITY METRICS DETAIL',
-        qbfunctions.title1)
-    worksheet.write(1, 0, hospital_id + ' - ' +
-                    prov[name_var].values[0], qbfunctions.title2)
-    worksheet.write(2, 0, "CLAIMS PAID THROUGH: " +
-                    DATES["Claims Paid"], qbfunctions.title2)
-    worksheet.write(
-        3,
-        0,
-        "CLAIMS INCURRED THROUGH: " +
-        DATES["Claims Incurred"],
-        qbfunctions.title2)
-    worksheet.write(4, 0, rate(12, 21, hosp03_den, startrow=9), qbfunctions.title2) 
-
-    qbfunctions.hosp03_detail(worksheet, hosp03, startrow=6, startcol=0)
-
-
-    worksheet = workbook.add_worksheet('Hosp04 - Pall Care COMM')
-    worksheet.write(
-        0,
-        0,
-        str(YEAR) +
-        ' QUALITY BLUE HOSPITAL - CLINICAL QUALITY METRICS DETAIL',
-        qbfunctions.title1)
-    worksheet.write(1, 0, hospital_id + ' - ' +
-                    prov[name_var].values[0], qbfunctions.title2)
-    worksheet.write(2, 0, "CLAIMS PAID THROUGH: " +
-                    DATES["Claims Paid"], qbfunctions.title2)
-    worksheet.write(
-        3,
-        0,
-        "CLAIMS INCURRED THROUGH: " +
-        DATES["Claims Incurred"],
-        qbfunctions.title2)
-    worksheet.write(4, 0, rate(12, 21, hosp04_den, startrow=9), qbfunctions.title2) 
-    qbfunctions.hosp04_detail(worksheet, hosp04, startrow=6, startcol=0)
-
-
-
-    worksheet = workbook.add_worksheet("Hosp19 - 3 Day ED (MA)")
-    worksheet.write(
-        0,
-        0,
-        str(YEAR) +
-        ' QUALITY BLUE HOSPITAL - CLINICAL QUALITY METRICS DETAIL',
-        qbfunctions.title1)
-    worksheet.write(1, 0, hospital_id + ' - ' +
-                    prov[name_var].values[0], qbfunctions.title2)
-    worksheet.write(2, 0, "CLAIMS PAID THROUGH: " +
-                    DATES["Claims Paid"], qbfunctions.title2)
-    worksheet.write(
-        3,
-        0,
-        "CLAIMS INCURRED THROUGH: " +
-        DATES["Claims Incurred"],
-        qbfunctions.title2)
-    worksheet.write(4, 0, rate(6, 10, hosp19_den, startrow=9), qbfunctions.title2)
-
-    qbfunctions.hosp19_detail(
-        worksheet,
-        hosp19,
-        startrow=6,
-        startcol=0,
-        title=qbfunctions.cqmbenchmarks['hosp19']['title'])
-
-    worksheet = workbook.add_worksheet("Hosp20 - 3 Day ED (Comm)")
-    worksheet.write(
-        0,
-        0,
-        str(YEAR) +
-        ' QUALITY BLUE HOSPITAL - CLINICAL QUALITY METRICS DETAIL',
-        qbfunctions.title1)
-    worksheet.write(1, 0, hospital_id + ' - ' +
-                    prov[name_var].values[0], qbfunctions.title2)
-    worksheet.write(2, 0, "CLAIMS PAID THROUGH: " +
-                    DATES["Claims Paid"], qbfunctions.title2)
-    worksheet.write(
-        3,
-        0,
-        "CLAIMS INCURRED THROUGH: " +
-        DATES["Claims Incurred"],
-        qbfunctions.title2)
-    worksheet.write(4, 0, rate(6, 10, hosp20_den, startrow=9), qbfunctions.title2)
-
-    qbfunctions.hosp19_detail(
-        worksheet,
-        hosp20,
-        startrow=6,
-        startcol=0,
-        title=qbfunctions.cqmbenchmarks['hosp20']['title'])
-
-    worksheet = workbook.add_worksheet("Readm - MA")
-    worksheet.write(
-        0,
-        0,
-        str(YEAR) +
-        ' QUALITY BLUE HOSPITAL - CLINICAL QUALITY METRICS DETAIL',
-        qbfunctions.title1)
-    worksheet.write(1, 0, hospital_id + ' - ' +
-                    prov[name_var].values[0], qbfunctions.title2)
-    worksheet.write(2, 0, "CLAIMS PAID THROUGH: " +
-                    DATES["Claims Paid"], qbfunctions.title2)
-    worksheet.write(
-        3,
-        0,
-        "CLAIMS INCURRED THROUGH: " +
-        DATES["Claims Incurred"],
-        qbfunctions.title2)
-    worksheet.write(4, 0, rate(7, 12, rrama_den, startrow=9), qbfunctions.title2)
-
-    qbfunctions.reads_detail(worksheet, rrama, startrow=6, startcol=0,
-                             title=qbfunctions.cqmbenchmarks['rrama']['title'])
-
-    worksheet = workbook.add_worksheet("Readm - Comm")
-    worksheet.write(
-        0,
-        0,
-        str(YEAR) +
-        ' QUALITY BLUE HOSPITAL - CLINICAL QUALITY METRICS DETAIL',
-        qbfunctions.title1)
-    worksheet.write(1, 0, hospital_id + ' - ' +
-                    prov[name_var].values[0], qbfunctions.title2)
-    worksheet.write(2, 0, "CLAIMS PAID THROUGH: " +
-                    DATES["Claims Paid"], qbfunctions.title2)
-    worksheet.write(
-        3,
-        0,
-        "CLAIMS INCURRED THROUGH: " +
-        DATES["Claims Incurred"],
-        qbfunctions.title2)
-    worksheet.write(4, 0, rate(7, 12, rracomm_den, startrow=9), qbfunctions.title2)
-
-    qbfunctions.reads_detail(
-        worksheet,
-        rracomm,
-        startrow=6,
-        startcol=0,
-        title=qbfunctions.cqmbenchmarks['rracomm']['title'])
-    worksheet = workbook.add_worksheet("Hosp21 - 7 Day Follow-up")
-    worksheet.write(
-        0,
-        0,
-        str(YEAR) +
-        ' QUALITY BLUE HOSPITAL - CLINICAL QUALITY METRICS DETAIL',
-        qbfunctions.title1)
-    worksheet.write(1, 0, hospital_id + ' - ' + prov[name_var].values[0],
-                    qbfunctions.title2)
-    worksheet.write(2, 0, "CLAIMS PAID THROUGH: " + DATES["Claims Paid"],
-                    qbfunctions.title2)
-    worksheet.write(
-        3,
-        0,
-        "CLAIMS INCURRED THROUGH: " +
-        DATES["Claims Incurred"],
-        qbfunctions.title2)
-    worksheet.write(4, 0, rate(7, 13, hosp21_den, startrow=9), qbfunctions.title2)
-
-    qbfunctions.hosp21_detail(worksheet, hosp21, startrow=6, startcol=0)
-    
-    worksheet = workbook.add_worksheet('Hosp22 - Preop Lab')
-    worksheet.write(
-        0,
-        0,
-        str(YEAR) +
-        ' QUALITY BLUE HOSPITAL - CLINICAL QUALITY METRICS DETAIL',
-        qbfunctions.title1)
-    worksheet.write(1, 0, hospital_id + ' - ' +
-                    prov[name_var].values[0], qbfunctions.title2)
-    worksheet.write(2, 0, "CLAIMS PAID THROUGH: " +
-                    DATES["Claims Paid"], qbfunctions.title2)
-    worksheet.write(
-        3,
-        0,
-        "CLAIMS INCURRED THROUGH: " +
-        DATES["Claims Incurred"],
-        qbfunctions.title2)
-    worksheet.write(4, 0, rate(6, 8, hosp22_den, startrow=9), qbfunctions.title2) 
-
-    qbfunctions.hosp22_detail(worksheet, hosp22, startrow=6, startcol=0)
-
-    worksheet = workbook.add_worksheet('Hosp23 - Preop Cardiac')
-    worksheet.write(
-        0,
-        0,
-        str(YEAR) +
-        ' QUALITY BLUE HOSPITAL - CLINICAL QUALITY METRICS DETAIL',
-        qbfunctions.title1)
-    worksheet.write(1, 0, hospital_id + ' - ' +
-                    prov[name_var].values[0], qbfunctions.title2)
-    worksheet.write(2, 0, "CLAIMS PAID THROUGH: " +
-                    DATES["Claims Paid"], qbfunctions.title2)
-    worksheet.write(
-        3,
-        0,
-        "CLAIMS INCURRED THROUGH: " +
-        DATES["Claims Incurred"],
-        qbfunctions.title2)
-    worksheet.write(4, 0, rate(6, 8, hosp23_den, startrow=9), qbfunctions.title2) 
-
-    qbfunctions.hosp23_detail(worksheet, hosp23, startrow=6, startcol=0)
-    
-    worksheet = workbook.add_worksheet('Hosp24 - Preop EKG')
-    worksheet.write(
-        0,
-        0,
-        str(YEAR) +
-        ' QUALITY BLUE HOSPITAL - CLINICAL QUALITY METRICS DETAIL',
-        qbfunctions.title1)
-    worksheet.write(1, 0, hospital_id + ' - ' +
-                    prov[name_var].values[0], qbfunctions.title2)
-    worksheet.write(2, 0, "CLAIMS PAID THROUGH: " +
-                    DATES["Claims Paid"], qbfunctions.title2)
-    worksheet.write(
-        3,
-        0,
-        "CLAIMS INCURRED THROUGH: " +
-        DATES["Claims Incurred"],
-        qbfunctions.title2)
-    worksheet.write(4, 0, rate(6, 8, hosp24_den, startrow=9), qbfunctions.title2) 
-
-    qbfunctions.hosp24_detail(worksheet, hosp24, startrow=6, startcol=0)
-    
-    
+    qbfunctions.stamp(worksheet, DEFINITIONS_SHEET, styles)
+    worksheet.write(1, 0, hospital, styles.title2)
+
+    details = {}
+    for sheet, name, spec, columns, title in REPORT_SHEETS:
+        details[name] = filterdf(name, id_var, hospital_id)
+        worksheet = workbook.add_worksheet(sheet)
+        qbfunctions.stamp(worksheet, TITLE_BLOCK, styles)
+        worksheet.write(1, 0, hospital, styles.title2)
+        startrow = 5
+        if columns is not None:
+            try:
+                den = details[name][name + '_den'].sum()
+            except BaseException:
+                den = 0
+            worksheet.write(4, 0, rate(columns[0], columns[1], den,
+                                       startrow=9), styles.title2)
+            startrow = 6
+        qbfunctions.render_detail(worksheet, details[name], spec,
+                                  startrow=startrow, startcol=0, title=title,
+                                  styles=styles)
+
     workbook.close()
+    if flusher is not None:
+        flusher.flush(path)
+
+    # Export the same member rows, one file per sheet, next to the workbook
+    if EXPORT_FORMATS:
+        stem = path[:-len(".xlsx")]
+        for sheet, name, spec, columns, title in REPORT_SHEETS:
+            qbfunctions.export_detail(
+                details[name], spec, target[:-len(".xlsx")] + "_" + name,
+                EXPORT_FORMATS)
+            if flusher is not None:
+                for i in EXPORT_FORMATS:
+                    flusher.flush(stem + "_" + name + "." + i, key=path)
 
 #cqm_detail_report("000390050", id_var="hospital_id2", name_var="hospital_name2", outdir=QBH_DIR+"OUT/CQM_Member_Detail/")
 #cqm_detail_report("000390050", id_var="quality_blue_id", name_var="quality_blue_name", outdir=QBH_DIR+"OUT/CQM_Member_Detail/")
@@ -725,40 +472,117 @@ def cqm_detail_report(hospital_id, id_var, name_var, outdir):
 # cqm_detail_report("002098676")
 
 
-def create_reports():
+# This function builds one report for create_reports() and returns a record
+# of the outcome instead of raising, so a failed hospital does not stop the
+# others. Records are (hospital id, id variable, error or None, seconds).
+def report_job(job, flusher=None):
+    hospital_id, id_var, name_var, outdir = job
+    start = time.perf_counter()
+    try:
+        cqm_detail_report(hospital_id, id_var=id_var,
+                          name_var=name_var, outdir=outdir, flusher=flusher)
+        error = None
+    except BaseException:
+        error = traceback.format_exc()
+    return hospital_id, id_var, error, time.perf_counter() - start
+
+
+def create_reports(workers=REPORT_WORKERS, force=FORCE_REBUILD):
     hospitals = CQM_MBR_DETAIL.reset_index(drop=True).copy(deep=True)
     hospitals = hospitals.drop_duplicates(subset=['hospital_id2'])
 
+    reports = []
     for i in hospitals['hospital_id2']:
-        try:
-            outdir = QBH_DIR + "OUT/CQM_Member_Detail/"
-            cqm_detail_report(i, id_var='hospital_id2',
-                              name_var='hospital_name2', outdir=outdir)
-        except BaseException:
-            print("ERROR: Hospital report " + i + " was unable to be created")
-    for i in hospitals['quality_blue_id']:
-        try:
-            outdir = QBH_DIR + "OUT/CQM_Member_Detail/Aggregate"
-            cqm_detail_report(i, id_var='quality_blue_id',
-                              name_var='quality_blue_name', outdir=outdir)
-        except BaseException:
-            print("ERROR: Hospital report " + i + " was unable to be created")
+        outdir = QBH_DIR + "OUT/CQM_Member_Detail/"
+        reports.append((i, 'hospital_id2', 'hospital_name2', outdir))
+    # Several hospitals share a Quality Blue ID, build each aggregate once
+    for i in hospitals['quality_blue_id'].drop_duplicates():
+        outdir = QBH_DIR + "OUT/CQM_Member_Detail/Aggregate"
+        reports.append((i, 'quality_blue_id', 'quality_blue_name', outdir))
+
+    # Skip reports that already exist and were built from the same inputs
+    manifest_file = QBH_DIR + "OUT/CQM_Member_Detail/manifest.json"
+    manifest = qbfunctions.load_manifest(manifest_file)
+    hashes = {}
+    jobs = []
+    for hospital_id, id_var, name_var, outdir in reports:
+        path = report_path(hospital_id, outdir)
+        hashes[path] = report_hash(hospital_id, id_var)
+        if force or manifest.get(path) != hashes[path] or \
+                not os.path.exists(path):
+            jobs.append((hospital_id, id_var, name_var, outdir))
+
+    outdirs = dict(((i[0], i[1]), i[3]) for i in jobs)
+    start = time.perf_counter()
+    results = []
+    if workers > 1:
+        # Forked workers share the datasets and partitions already in memory.
+        # Each writes its reports straight to the OUT directory, the other
+        # workers keep rendering meanwhile.
+        with multiprocessing.get_context("fork").Pool(workers) as pool:
+            for result in pool.imap_unordered(report_job, jobs):
+                results.append(result)
+    else:
+        # Render each report while the previous ones are copied to the OUT
+        # directory, a report only counts as built once its files are there
+        flusher = qbfunctions.Flusher(FLUSH_WORKERS, scratch_dir=SCRATCH_DIR)
+        for job in jobs:
+            results.append(report_job(job, flusher))
+        errors = flusher.close()
+        for i, (hospital_id, id_var, error, seconds) in enumerate(results):
+            path = report_path(hospital_id, outdirs[(hospital_id, id_var)])
+            if error is None and path in errors:
+                results[i] = (hospital_id, id_var, errors[path], seconds)
+    elapsed = time.perf_counter() - start
+
+    # Record the inputs of every report that was built, and forget failed
+    # reports so they are retried on the next run
+    for hospital_id, id_var, error, seconds in results:
+        path = report_path(hospital_id, outdirs[(hospital_id, id_var)])
+        if error is None:
+            manifest[path] = hashes[path]
+        else:
+            manifest.pop(path, None)
+    qbfunctions.save_manifest(manifest_file, manifest)
+
+    failures = [i for i in results if i[2] is not None]
+    timings = sorted(results, key=lambda x: x[3], reverse=True)
+    print("CQM Member Detail reports:", len(results) - len(failures),
+          "created,", len(failures), "failed,", len(reports) - len(jobs),
+          "unchanged in", "{0:.1f}s using {1} worker(s)".format(
+              elapsed, workers))
+    if results:
+        print("Average report time: {0:.2f}s".format(
+            sum(i[3] for i in results) / len(results)))
+    print("Slowest reports:")
+    for hospital_id, id_var, error, seconds in timings[:5]:
+        print("    {0} ({1}): {2:.2f}s".format(hospital_id, id_var, seconds))
+    for hospital_id, id_var, error, seconds in failures:
+        print("ERROR: Hospital report " + str(hospital_id) + " (" +
+              id_var + ") was unable to be created")
+        print(error)
+    return results
 
 
 create_reports()
 
 
+# The all-hospital detail workbooks are streamed to disk row by row with the
+# constant_memory option, so memory use does not grow with the member count.
+# They are written to local scratch space and copied to the OUT directory in
+# the background while the next one is rendered.
+FLUSHER = qbfunctions.Flusher(FLUSH_WORKERS, scratch_dir=SCRATCH_DIR)
+
+DETAIL_PATH = QBH_DIR + "OUT/Quality_Blue_" + str(YEAR) + "_" + str(MONTH) + \
+    "_Hosp03_Detail"
+
 # Create the xlsx file
 WORKBOOK = xlsxwriter.Workbook(
-    "/n04/data/p4vrept/Programs/Quality_Blue_Hospital_2019/OUT/" +
-    "Quality_Blue_" +
-    str(YEAR) +
-    "_" +
-    str(MONTH) +
-    "_Hosp03_Detail.xlsx",
+    FLUSHER.local(DETAIL_PATH + ".xlsx"),
     {
-        'nan_inf_to_errors': True})
-qbfunctions.highmark_styles(WORKBOOK)
+        'nan_inf_to_errors': True,
+        'constant_memory': True})
+STYLES = qbfunctions.highmark_styles(WORKBOOK)
 
 WORKSHEET = WORKBOOK.add_worksheet("Hosp03")
 WORKSHEET.write(
@@ -766,28 +590,36 @@ WORKSHEET.write(
     0,
     str(YEAR) +
     ' QUALITY BLUE HOSPITAL - CLINICAL QUALITY METRICS DETAIL',
-    qbfunctions.title1)
-#worksheet.write(1, 0, hospital_id, qbfunctions.title2)
+    STYLES.title1)
+#worksheet.write(1, 0, hospital_id, STYLES.title2)
 WORKSHEET.write(2, 0, "Hosp03")
 
 qbfunctions.hosp03_detail(WORKSHEET, MEMBER_HOSP03,
-                          startrow=4, startcol=0, hospital=True)
+                          startrow=4, startcol=0, hospital=True, styles=STYLES,
+                          stream=True)
 
 WORKBOOK.close()
+FLUSHER.flush(DETAIL_PATH + ".xlsx")
+
+if EXPORT_FORMATS:
+    qbfunctions.export_detail(
+        MEMBER_HOSP03, 'hosp03', FLUSHER.local(DETAIL_PATH),
+        EXPORT_FORMATS, hospital=True)
+    for FORMAT in EXPORT_FORMATS:
+        FLUSHER.flush(DETAIL_PATH + "." + FORMAT)
 
 
+DETAIL_PATH = QBH_DIR + "OUT/Quality_Blue_" + str(YEAR) + "_" + str(MONTH) + \
+    "_Hosp19_Detail"
+
 # Create the xlsx file
 WORKBOOK = xlsxwriter.Workbook(
-    "/n04/data/p4vrept/Programs/Quality_Blue_Hospital_2019/OUT/" +
-    "Quality_Blue_" +
-    str(YEAR) +
-    "_" +
-    str(MONTH) +
-    "_Hosp19_Detail.xlsx",
+    FLUSHER.local(DETAIL_PATH + ".xlsx"),
     {
-        'nan_inf_to_errors': True})
+        'nan_inf_to_errors': True,
+        'constant_memory': True})
 
-qbfunctions.highmark_styles(WORKBOOK)
+STYLES = qbfunctions.highmark_styles(WORKBOOK)
 
 WORKSHEET = WORKBOOK.add_worksheet("Hosp19")
 WORKSHEET.write(
@@ -795,27 +627,35 @@ WORKSHEET.write(
     0,
     str(YEAR) +
     ' QUALITY BLUE HOSPITAL - CLINICAL QUALITY METRICS DETAIL',
-    qbfunctions.title1)
-#worksheet.write(1, 0, hospital_id, qbfunctions.title2)
+    STYLES.title1)
+#worksheet.write(1, 0, hospital_id, STYLES.title2)
 WORKSHEET.write(2, 0, "Hosp19")
 
 qbfunctions.hosp19_detail(WORKSHEET, MEMBER_HOSP19,
-                          startrow=4, startcol=0, hospital=True)
+                          startrow=4, startcol=0, hospital=True, styles=STYLES,
+                          stream=True)
 
 WORKBOOK.close()
+FLUSHER.flush(DETAIL_PATH + ".xlsx")
+
+if EXPORT_FORMATS:
+    qbfunctions.export_detail(
+        MEMBER_HOSP19, 'hosp19', FLUSHER.local(DETAIL_PATH),
+        EXPORT_FORMATS, hospital=True)
+    for FORMAT in EXPORT_FORMATS:
+        FLUSHER.flush(DETAIL_PATH + "." + FORMAT)
+
+DETAIL_PATH = QBH_DIR + "OUT/Quality_Blue_" + str(YEAR) + "_" + str(MONTH) + \
+    "_Hosp20_Detail"
 
 # Create the xlsx file
 WORKBOOK = xlsxwriter.Workbook(
-    "/n04/data/p4vrept/Programs/Quality_Blue_Hospital_2019/OUT/" +
-    "Quality_Blue_" +
-    str(YEAR) +
-    "_" +
-    str(MONTH) +
-    "_Hosp20_Detail.xlsx",
+    FLUSHER.local(DETAIL_PATH + ".xlsx"),
     {
-        'nan_inf_to_errors': True})
+        'nan_inf_to_errors': True,
+        'constant_memory': True})
 
-qbfunctions.highmark_styles(WORKBOOK)
+STYLES = qbfunctions.highmark_styles(WORKBOOK)
 
 WORKSHEET = WORKBOOK.add_worksheet("Hosp20")
 WORKSHEET.write(
@@ -823,28 +663,36 @@ WORKSHEET.write(
     0,
     str(YEAR) +
     ' QUALITY BLUE HOSPITAL - CLINICAL QUALITY METRICS DETAIL',
-    qbfunctions.title1)
-#worksheet.write(1, 0, hospital_id, qbfunctions.title2)
+    STYLES.title1)
+#worksheet.write(1, 0, hospital_id, STYLES.title2)
 WORKSHEET.write(2, 0, "Hosp20")
 
 qbfunctions.hosp19_detail(WORKSHEET, MEMBER_HOSP20,
-                          startrow=4, startcol=0, hospital=True)
+                          startrow=4, startcol=0, hospital=True, styles=STYLES,
+                          stream=True)
 
 WORKBOOK.close()
+FLUSHER.flush(DETAIL_PATH + ".xlsx")
+
+if EXPORT_FORMATS:
+    qbfunctions.export_detail(
+        MEMBER_HOSP20, 'hosp19', FLUSHER.local(DETAIL_PATH),
+        EXPORT_FORMATS, hospital=True)
+    for FORMAT in EXPORT_FORMATS:
+        FLUSHER.flush(DETAIL_PATH + "." + FORMAT)
 
 
+DETAIL_PATH = QBH_DIR + "OUT/Quality_Blue_" + str(YEAR) + "_" + str(MONTH) + \
+    "_Hosp21_Detail"
+
 # Create the xlsx file
 WORKBOOK = xlsxwriter.Workbook(
-    "/n04/data/p4vrept/Programs/Quality_Blue_Hospital_2019/OUT/" +
-    "Quality_Blue_" +
-    str(YEAR) +
-    "_" +
-    str(MONTH) +
-    "_Hosp21_Detail.xlsx",
+    FLUSHER.local(DETAIL_PATH + ".xlsx"),
     {
-        'nan_inf_to_errors': True})
+        'nan_inf_to_errors': True,
+        'constant_memory': True})
 
-qbfunctions.highmark_styles(WORKBOOK)
+STYLES = qbfunctions.highmark_styles(WORKBOOK)
 
 WORKSHEET = WORKBOOK.add_worksheet("Hosp21")
 WORKSHEET.write(
@@ -852,11 +700,24 @@ WORKSHEET.write(
     0,
     str(YEAR) +
     ' QUALITY BLUE HOSPITAL - CLINICAL QUALITY METRICS DETAIL',
-    qbfunctions.title1)
-#WORKSHEET.write(1, 0, hospital_id, qbfunctions.title2)
+    STYLES.title1)
+#WORKSHEET.write(1, 0, hospital_id, STYLES.title2)
 WORKSHEET.write(2, 0, "Hosp21")
 
 qbfunctions.hosp21_detail(WORKSHEET, MEMBER_HOSP21,
-                          startrow=4, startcol=0, hospital=True)
+                          startrow=4, startcol=0, hospital=True, styles=STYLES,
+                          stream=True)
 
 WORKBOOK.close()
+FLUSHER.flush(DETAIL_PATH + ".xlsx")
+
+if EXPORT_FORMATS:
+    qbfunctions.export_detail(
+        MEMBER_HOSP21, 'hosp21', FLUSHER.local(DETAIL_PATH),
+        EXPORT_FORMATS, hospital=True)
+    for FORMAT in EXPORT_FORMATS:
+        FLUSHER.flush(DETAIL_PATH + "." + FORMAT)
+
+for DETAIL_PATH, ERROR in FLUSHER.close().items():
+    print("ERROR: " + DETAIL_PATH + " was unable to be written")
+    print(ERROR)
@@ -0,0 +1,737 @@
+"""This script times the qbfunctions helpers against the code they replaced
+on synthetic data. Run it directly: ./BUILDER_BENCHMARKS.py"""
+
+import contextlib
+import io
+import os
+import tempfile
+import time
+import zipfile
+import numpy as np
+import xlsxwriter
+import pandas as pd
+import BUILDER_FUNCTIONS as qbfunctions
+
+
+# Time a function call and return the result with the elapsed seconds
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+# The per-cell decoder that decoder() replaced. Each column is copied out and
+# written back so the loop also works under pandas copy-on-write.
+def legacy_decoder(df):
+    columns = list(df.columns.values)
+    for i in columns:
+        values = df[i].to_numpy(copy=True)
+        for j in range(0, len(values)):
+            try:
+                values[j] = values[j].decode("utf-8")
+            except BaseException:
+                continue
+        df[i] = values
+    return df
+
+
+# Build a member detail shaped frame with byte string and numeric columns
+def synthetic_member_frame(rows=1000000, seed=0):
+    rng = np.random.RandomState(seed)
+    hospitals = np.array(["{0:0>9}".format(i).encode("utf-8")
+                          for i in range(500)], dtype=object)
+    names = np.array(["MEMBER{0}".format(i).encode("utf-8")
+                      for i in range(20000)], dtype=object)
+    products = np.array([b"MA", b"COMM", b"MEDIGAP"], dtype=object)
+    return pd.DataFrame({
+        'hospital_id2': hospitals[rng.randint(0, len(hospitals), rows)],
+        'EACM_LA_NM': names[rng.randint(0, len(names), rows)],
+        'product': products[rng.randint(0, len(products), rows)],
+        'EACM_BIR_DT': rng.randint(-10000, 10000, rows).astype(float),
+        'hosp19_num': rng.randint(0, 2, rows).astype(float)})
+
+
+def benchmark_decoder(rows=1000000):
+    frame = synthetic_member_frame(rows)
+    legacy, legacy_time = timed(legacy_decoder, frame.copy(deep=True))
+    current, current_time = timed(qbfunctions.decoder, frame.copy(deep=True))
+    assert legacy.equals(current)
+    print("decoder() on", rows, "rows:")
+    print("    per-cell decoder: {0:.2f}s".format(legacy_time))
+    print("    decoder():        {0:.2f}s ({1:.0f}x)".format(
+        current_time, legacy_time / current_time))
+
+
+# The per-cell row loop that hosp03_detail() used before write_rows(). The
+# column order and formats match the report body written by hosp03_detail().
+def legacy_hosp03_rows(ws, df, styles, startrow=0, startcol=0):
+    f = qbfunctions
+    df = f.blanks(df)
+    criteria = {
+        "COPD/CF with O2": ('dx2', 'dx3'),
+        "Substantial Risk of Death": ('proc', None)}
+    for i in range(0, len(df)):
+        currow = startrow + 3 + i
+        curcol = startcol
+        for column, fmt in [
+                ('EACM_LA_NM', styles.table_body),
+                ('EACM_FST_NM', styles.table_body),
+                ('EACM_BIR_DT', styles.table_body_date2),
+                ('EACAG_UNQ_MBR_ID', styles.table_body_date),
+                ('product', styles.table_body_date),
+                ('PRV_PAT_CL_NO', styles.table_body),
+                ('EAC_ADMM_DT', styles.table_body_date2),
+                ('EAC_DCG_DT', styles.table_body_date2)]:
+            curcol = f.itercol(ws, currow, curcol, 0, df[column].values[i], fmt)
+        curcol = f.itercol(ws, currow, curcol, 0, str(
+            df['EAC_SRCSY_ASND_CLM_NO'].values[i]), styles.table_body)
+        curcol = f.itercol(
+            ws, currow, curcol, 0, df['EACFBT_CD'].values[i], styles.table_body)
+        curcol = f.itercol(
+            ws, currow, curcol, 0, df['description'].values[i], styles.table_body)
+        first, second = criteria.get(df['description'].values[i], ('dx', None))
+        for prefix in [first, second]:
+            for suffix, fmt in [('_code', styles.table_body),
+                                ('_svce_dt', styles.table_body_date2),
+                                ('_eac_srcsy_asnd_clm_no', styles.table_body)]:
+                if prefix is None:
+                    ws.write(currow, curcol, "", styles.table_body)
+                else:
+                    ws.write(currow, curcol, df[prefix + suffix].values[i], fmt)
+                curcol = curcol + 1
+        ais = "Y" if df['ais'].values[i] == 1 else ""
+        curcol = f.itercol(ws, currow, curcol, 0, ais, styles.table_body)
+        for column, fmt in [('pall_care_code', styles.table_body),
+                            ('pall_care_svce_dt', styles.table_body_date2),
+                            ('pall_care_eac_srcsy_asnd_clm_no', styles.table_body)]:
+            curcol = f.itercol(ws, currow, curcol, 0, df[column].values[i], fmt)
+        numerator = 1 if df['hosp03_num'].values[i] == 1 else ""
+        f.itercol(ws, currow, curcol, 0, numerator, styles.table_body)
+
+
+# Build a hosp03 detail frame with the columns the report reads
+def synthetic_hosp03_frame(rows=100000, seed=0):
+    rng = np.random.RandomState(seed)
+    descriptions = np.array(
+        ["COPD/CF with O2", "Substantial Risk of Death", "Metastatic Cancer"],
+        dtype=object)
+    frame = {}
+    for column in qbfunctions.detail_columns['hosp03']:
+        if column in qbfunctions.date_columns['hosp03']:
+            values = rng.randint(40000, 45000, rows).astype(float)
+            values[rng.rand(rows) < 0.2] = np.nan
+        elif column in ['ais', 'hosp03_num', 'hosp03_den']:
+            values = rng.randint(0, 2, rows).astype(float)
+        elif column == 'description':
+            values = descriptions[rng.randint(0, len(descriptions), rows)]
+        else:
+            values = np.array(["{0}{1}".format(column, i) for i in
+                               rng.randint(0, 5000, rows)], dtype=object)
+        frame[column] = values
+    return pd.DataFrame(frame)
+
+
+# Time one detail writer, called with the worksheet, the frame and the
+# workbook's styles, into a streamed workbook in a scratch directory
+def write_detail(writer, df):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        workbook = xlsxwriter.Workbook(
+            os.path.join(tmpdir, "detail.xlsx"),
+            {'nan_inf_to_errors': True, 'constant_memory': True})
+        styles = qbfunctions.highmark_styles(workbook)
+        ws = workbook.add_worksheet("HOSP03")
+        with contextlib.redirect_stdout(io.StringIO()):
+            _, elapsed = timed(writer, ws, df, styles)
+        workbook.close()
+    return elapsed
+
+
+# Write the body of a hosp03 detail sheet as hosp03_detail() does, without
+# its title and header rows, to compare with legacy_hosp03_rows()
+def hosp03_rows(ws, df, styles, startrow=0, startcol=0):
+    plan = qbfunctions.detail_plan('hosp03', False, startrow, startcol)
+    qbfunctions.write_rows(ws, startrow + 3, startcol, qbfunctions.detail_body(
+        qbfunctions.blanks(df), plan, styles))
+
+
+# The cells a worksheet holds in memory, (row, column, cell type, value and
+# format) in order. Only workbooks without constant_memory keep their cells.
+def sheet_cells(ws):
+    cells = []
+    for row in sorted(ws.table):
+        for col in sorted(ws.table[row]):
+            cell = ws.table[row][col]
+            cells.append((row, col, type(cell).__name__) + tuple(cell))
+    return cells
+
+
+def benchmark_detail_rows(rows=100000):
+    frame = synthetic_hosp03_frame(rows)
+    legacy_time = write_detail(legacy_hosp03_rows, frame)
+    current_time = write_detail(hosp03_rows, frame)
+
+    # Regression check: both write the same cells with the same formats
+    with tempfile.TemporaryDirectory() as tmpdir:
+        workbook = xlsxwriter.Workbook(os.path.join(tmpdir, "detail.xlsx"),
+                                       {'nan_inf_to_errors': True})
+        styles = qbfunctions.highmark_styles(workbook)
+        legacy = workbook.add_worksheet("LEGACY")
+        current = workbook.add_worksheet("CURRENT")
+        with contextlib.redirect_stdout(io.StringIO()):
+            legacy_hosp03_rows(legacy, frame.iloc[:5000], styles)
+            hosp03_rows(current, frame.iloc[:5000], styles)
+        assert sheet_cells(legacy) == sheet_cells(current)
+        workbook.close()
+
+    print("hosp03_detail() body on", rows, "rows:")
+    print("    per-cell writes: {0:.2f}s".format(legacy_time))
+    print("    write_rows():    {0:.2f}s ({1:.1f}x)".format(
+        current_time, legacy_time / current_time))
+
+
+# Write a hosp03 detail sheet with the body written by write_rows() or
+# streamed by stream_rows()
+def write_hosp03(ws, df, styles):
+    qbfunctions.hosp03_detail(ws, df, styles=styles)
+
+
+def stream_hosp03(ws, df, styles):
+    qbfunctions.hosp03_detail(ws, df, styles=styles, stream=True)
+
+
+# The sheet XML one detail writer writes into a streamed workbook
+def detail_xml(writer, df):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "detail.xlsx")
+        workbook = xlsxwriter.Workbook(
+            path, {'nan_inf_to_errors': True, 'constant_memory': True})
+        styles = qbfunctions.highmark_styles(workbook)
+        ws = workbook.add_worksheet("HOSP03")
+        with contextlib.redirect_stdout(io.StringIO()):
+            writer(ws, df, styles)
+        workbook.close()
+        with zipfile.ZipFile(path) as xlsx:
+            return xlsx.read("xl/worksheets/sheet1.xml")
+
+
+def benchmark_detail_stream(rows=500000):
+    frame = synthetic_hosp03_frame(rows)
+    rows_time = write_detail(write_hosp03, frame)
+    stream_time = write_detail(stream_hosp03, frame)
+
+    # Regression check: the streamed sheet XML is byte for byte the XML that
+    # write_rows() gives, including strings that need escaping or keep their
+    # whitespace, and a formula write() makes of a string starting with "="
+    sample = frame.iloc[:3000].copy()
+    column = sample.columns.get_loc('EACM_LA_NM')
+    sample.iloc[0, column] = "  O'Brien & <Co>"
+    sample.iloc[1, column] = "Smith\r"
+    sample.iloc[2, column] = "\xa0Jones"
+    sample.iloc[3, column] = "Doe\x0b"
+    sample.iloc[2500, column] = "=1+1"
+    assert xlsxwriter.__version__ in qbfunctions.stream_xlsxwriter_versions, \
+        "stream_rows() has not been checked on xlsxwriter " + \
+        xlsxwriter.__version__
+    assert detail_xml(write_hosp03, sample) == \
+        detail_xml(stream_hosp03, sample)
+
+    print("hosp03_detail() body on", rows, "rows:")
+    print("    write_rows():  {0:.2f}s".format(rows_time))
+    print("    stream_rows(): {0:.2f}s ({1:.1f}x)".format(
+        stream_time, rows_time / stream_time))
+
+
+def benchmark_detail_export(rows=100000):
+    # The frame as loadsas(typed=True) gives it, with "string" columns, and
+    # case keys that are missing on some rows
+    frame = synthetic_hosp03_frame(rows)
+    frame = frame.astype({i: "string" for i in frame.columns
+                          if frame[i].dtype == object})
+    missing = np.arange(rows) % 10 == 0
+    frame.loc[missing, 'description'] = pd.NA
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "hosp03")
+        exported, elapsed = timed(qbfunctions.export_detail, frame, 'hosp03',
+                                  path, ['parquet', 'csv'])
+        assert os.path.exists(path + ".parquet")
+        assert os.path.exists(path + ".csv")
+
+    # Regression check: a missing key matches no case, so those rows take the
+    # default criteria and leave the COPD columns missing
+    criteria = exported['Denominator Criteria - Code']
+    copd = exported['Denominator Criteria - Code 2']
+    assert (criteria[missing] == frame['dx_code'][missing]).all()
+    assert copd[missing].isna().all()
+    assert (copd[~missing].notna() == (
+        frame['description'][~missing] == "COPD/CF with O2")).all()
+
+    print("export_detail() on", rows, "typed rows with missing case keys:")
+    print("    parquet and csv: {0:.2f}s".format(elapsed))
+
+
+# The Points Available and Points Earned cascades that cqm() and readm() used
+# before score_tiers(). readm() scores lower rates as better and a missing
+# rate as 0; cqm() picks the direction from the benchmarks.
+def legacy_points(df, measure_cd, readmission=False):
+    benchmark = qbfunctions.cqmbenchmarks[measure_cd]
+    df = df.copy()
+    df['Points Available'] = df['Denominator'].apply(
+        lambda x: benchmark['points'] if x >= 25 else 0)
+    if readmission:
+        # readm() started from an int 0, which pandas 3 will not upcast
+        df['Points Earned'] = 0.0
+        df.loc[df['Rate'] <= benchmark['min'],
+               'Points Earned'] = benchmark['pointsmin']
+        df.loc[df['Rate'] <= benchmark['mid'],
+               'Points Earned'] = benchmark['pointsmid']
+        df.loc[df['Rate'] <= benchmark['max'],
+               'Points Earned'] = benchmark['points']
+    elif benchmark['max'] > benchmark['min']:
+        df.loc[df['Rate'] < benchmark['min'], 'Points Earned'] = 0
+        df.loc[df['Rate'] >= benchmark['min'],
+               'Points Earned'] = benchmark['pointsmin']
+        df.loc[df['Rate'] >= benchmark['mid'],
+               'Points Earned'] = benchmark['pointsmid']
+        df.loc[df['Rate'] >= benchmark['max'],
+               'Points Earned'] = benchmark['points']
+    else:
+        df.loc[df['Rate'] > benchmark['min'], 'Points Earned'] = 0
+        df.loc[df['Rate'] <= benchmark['min'],
+               'Points Earned'] = benchmark['pointsmin']
+        df.loc[df['Rate'] <= benchmark['mid'],
+               'Points Earned'] = benchmark['pointsmid']
+        df.loc[df['Rate'] <= benchmark['max'],
+               'Points Earned'] = benchmark['points']
+    return qbfunctions.pointsavailable(df)
+
+
+# Build hospital rates for the scored measures around their benchmarks, with
+# rates exactly on each benchmark, missing rates (0/0), infinite rates (n/0)
+# and denominators on both sides of 25
+def synthetic_scores_frame(rows=100000, seed=0):
+    rng = np.random.RandomState(seed)
+    measures = [i for i in qbfunctions.cqmbenchmarks if i != 'title' and
+                qbfunctions.cqmbenchmarks[i]['max'] !=
+                qbfunctions.cqmbenchmarks[i]['min']]
+    measure = np.array(measures, dtype=object)[
+        rng.randint(0, len(measures), rows)]
+    benchmarks = pd.DataFrame(qbfunctions.cqmbenchmarks)[measure].T
+    low = benchmarks[['max', 'min']].min(axis=1).values.astype(float)
+    high = benchmarks[['max', 'min']].max(axis=1).values.astype(float)
+    rate = rng.uniform(low * 0.8, high * 1.2)
+    exact = rng.randint(0, 4, rows)
+    for i, name in enumerate(['max', 'mid', 'min']):
+        rate[exact == i] = benchmarks[name].values[exact == i]
+    rate[rng.rand(rows) < 0.02] = np.nan
+    rate[rng.rand(rows) < 0.02] = np.inf
+    return pd.DataFrame({'Measure': measure, 'Rate': rate,
+                         'Denominator': rng.randint(0, 60, rows)})
+
+
+def benchmark_score_tiers(rows=100000):
+    frame = synthetic_scores_frame(rows)
+    measures = frame['Measure'].unique()
+    start = time.perf_counter()
+    for readmission in [False, True]:
+        for measure_cd in measures:
+            legacy_points(frame[frame['Measure'] == measure_cd], measure_cd,
+                          readmission)
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    available, earned = qbfunctions.score_tiers(
+        frame['Rate'].values, frame['Denominator'].values,
+        frame['Measure'].values)
+    current_time = time.perf_counter() - start
+
+    # Regression check: the same points as the cascades for every measure
+    for measure_cd in measures:
+        rows_cd = (frame['Measure'] == measure_cd).values
+        legacy = legacy_points(frame[rows_cd], measure_cd)
+        assert np.array_equal(legacy['Points Available'].values,
+                              available[rows_cd])
+        assert np.array_equal(legacy['Points Earned'].values,
+                              earned[rows_cd], equal_nan=True)
+        if qbfunctions.cqmbenchmarks[measure_cd]['max'] < \
+                qbfunctions.cqmbenchmarks[measure_cd]['min']:
+            legacy = legacy_points(frame[rows_cd], measure_cd, True)
+            _, readm_earned = qbfunctions.score_tiers(
+                frame['Rate'].values[rows_cd],
+                frame['Denominator'].values[rows_cd], measure_cd, missing=0)
+            assert np.array_equal(legacy['Points Earned'].values,
+                                  readm_earned)
+    print("Points for", rows, "hospital rates over", len(measures),
+          "measures:")
+    print("    per-measure cascades: {0:.3f}s".format(legacy_time))
+    print("    score_tiers():        {0:.3f}s ({1:.0f}x)".format(
+        current_time, legacy_time / current_time))
+
+
+# The join that cqm() and readm() used before Crossreference.remap()
+def legacy_remap(df, xref):
+    df = df.set_index('Hospital ID').join(
+        xref.set_index('Hospital ID'), rsuffix="_XREF")
+    df.reset_index(inplace=True)
+    return np.where(pd.isnull(df['XRef ID']), df['Hospital ID'],
+                    df['XRef ID'])
+
+
+def benchmark_crossreference(rows=1000000, hospitals=5000):
+    rng = np.random.RandomState(0)
+    ids = np.array(["{0:0>9}".format(i) for i in range(hospitals)],
+                   dtype=object)
+    combined = ids[::10]
+    xref = pd.DataFrame({'Hospital ID': combined,
+                         'XRef ID': ids[rng.randint(0, hospitals,
+                                                    len(combined))]})
+    frame = pd.DataFrame({'Hospital ID': ids[rng.randint(0, hospitals, rows)],
+                          'Numerator': rng.randint(0, 10, rows)})
+    legacy, legacy_time = timed(legacy_remap, frame, xref)
+    current, current_time = timed(
+        lambda: qbfunctions.Crossreference(xref).remap(frame['Hospital ID']))
+    assert np.array_equal(legacy, current)
+    # An empty crossreference keeps every Hospital ID
+    empty = pd.DataFrame({'Hospital ID': [], 'XRef ID': []}, dtype=object)
+    assert np.array_equal(
+        qbfunctions.Crossreference(empty).remap(frame['Hospital ID']),
+        legacy_remap(frame, empty))
+    print("Crossreference remap of", rows, "rows:")
+    print("    set_index/join: {0:.3f}s".format(legacy_time))
+    print("    remap():        {0:.3f}s ({1:.0f}x)".format(
+        current_time, legacy_time / current_time))
+
+
+# The row by row score_bundle() that bundle_points() replaced
+def legacy_score_bundle(df, star_rating, dictionary):
+    df2 = df.copy(deep=True)
+    df2["Points Available"] = df2[star_rating].apply(
+        lambda x: dictionary['max']['points'] if x >= 1 else 0)
+    df2["Points Earned"] = 0
+    df2["Points Earned"] = df2[star_rating].apply(lambda x: dictionary['bonus5']['points'] if x >= dictionary['bonus5']['score']
+                                                  else dictionary['bonus2']['points'] if x >= dictionary['bonus2']['score'] else dictionary['max']['points'] if x == dictionary['max']['score']
+                                                  else dictionary['mid']['points'] if x >= dictionary['mid']['score'] else dictionary['min']['points'] if x >= dictionary['min']['score'] else 0)
+    return df2.copy(deep=True)
+
+
+# Build star ratings with missing ratings and ratings exactly on every tier
+# score, and what-if bundle dictionaries with shuffled tier scores
+def synthetic_bundle_scenarios(rows=100000, scenarios=20, seed=0):
+    rng = np.random.RandomState(seed)
+    ratings = np.round(rng.uniform(0, 5, rows), 2)
+    scores = [qbfunctions.qbbenchmarks[i]['score']
+              for i in qbfunctions.bundle_tiers]
+    exact = rng.rand(rows) < 0.2
+    ratings[exact] = np.array(scores)[rng.randint(0, len(scores),
+                                                  exact.sum())]
+    ratings[rng.rand(rows) < 0.02] = np.nan
+    dictionaries = [qbfunctions.qbbenchmarks]
+    for i in range(1, scenarios):
+        dictionary = dict(qbfunctions.qbbenchmarks)
+        for j, score in zip(qbfunctions.bundle_tiers,
+                            rng.permutation(scores) + rng.choice(
+                                [0, 0.25], len(scores))):
+            dictionary[j] = dict(dictionary[j], score=score)
+        dictionaries.append(dictionary)
+    return pd.DataFrame({'Star Rating': ratings}), dictionaries
+
+
+def benchmark_score_bundle(rows=100000):
+    frame, dictionaries = synthetic_bundle_scenarios(rows)
+    legacy_time = 0
+    current_time = 0
+    for dictionary in dictionaries:
+        legacy, seconds = timed(legacy_score_bundle, frame, 'Star Rating',
+                                dictionary)
+        legacy_time = legacy_time + seconds
+        current, seconds = timed(qbfunctions.score_bundle, frame,
+                                 'Star Rating', dictionary)
+        current_time = current_time + seconds
+        pd.testing.assert_frame_equal(legacy, current)
+    print("score_bundle() on", rows, "ratings in", len(dictionaries),
+          "scenarios:")
+    print("    row by row lambda: {0:.2f}s".format(legacy_time))
+    print("    bundle_points():   {0:.2f}s ({1:.0f}x)".format(
+        current_time, legacy_time / current_time))
+
+
+# Build a score_measures() frame for every scored measure of a number of
+# hospitals, and what-if scenarios that move each measure's cutpoints by up
+# to 10% and its points tiers by up to a point. The first scenario keeps the
+# current benchmarks.
+def synthetic_scenarios(hospitals=200, scenarios=10000, seed=0):
+    rng = np.random.RandomState(seed)
+    frame = synthetic_scores_frame(hospitals * 10, seed)
+    frame = frame[np.isfinite(frame['Rate'].values) |
+                  np.isnan(frame['Rate'].values)]
+    long = pd.DataFrame({
+        'Hospital ID': ["{0:0>9}".format(i % hospitals)
+                        for i in range(len(frame))],
+        'measure_cd': frame['Measure'].values,
+        'Denominator': frame['Denominator'].values.astype(float),
+        'Numerator': frame['Rate'].values * frame['Denominator'].values,
+        'Expected Numerator': frame['Denominator'].values * 0.1,
+        'market_expected': 0.1})
+    scores = qbfunctions.score_measures(
+        long, pd.DataFrame({'Hospital ID': [], 'XRef ID': []}))
+    columns = {}
+    for measure_cd in scores['measure_cd'].unique():
+        benchmark = qbfunctions.cqmbenchmarks[measure_cd]
+        for field in qbfunctions.tier_fields:
+            scale = 0.1 if field in ['max', 'mid', 'min'] else 0
+            values = benchmark[field] * rng.uniform(
+                1 - scale, 1 + scale, scenarios)
+            if scale == 0:
+                values = values + rng.randint(-1, 2, scenarios)
+            values[0] = benchmark[field]
+            columns[(measure_cd, field)] = values
+    return scores, pd.DataFrame(columns)
+
+
+def benchmark_simulator(hospitals=200, scenarios=10000):
+    scores, frame = synthetic_scenarios(hospitals, scenarios)
+    (ids, earned, available), elapsed = timed(
+        qbfunctions.scenario_totals, scores, frame)
+
+    # Regression check: the current benchmarks give score_measures() totals,
+    # and other scenarios match score_tiers() under the same benchmarks
+    totals = scores.groupby('Hospital ID')['points_earned'].sum()
+    assert np.array_equal(earned[0], totals.reindex(ids).values)
+    benchmarks = qbfunctions.cqmbenchmarks
+    missing = np.where(scores['measure_cd'].isin(['rrama', 'rracomm']),
+                       0, np.nan)
+    try:
+        for i in [1, scenarios // 2, scenarios - 1]:
+            qbfunctions.cqmbenchmarks = dict(benchmarks)
+            for measure_cd, field in frame.columns:
+                qbfunctions.cqmbenchmarks[measure_cd] = dict(
+                    qbfunctions.cqmbenchmarks[measure_cd],
+                    **{field: frame[(measure_cd, field)].values[i]})
+            _, points = qbfunctions.score_tiers(
+                scores['rate'].values, scores['denominator'].values,
+                scores['measure_cd'].values)
+            points = np.where(np.isnan(points), missing, points)
+            points[points > _] = 0
+            totals = pd.Series(np.nan_to_num(points)).groupby(
+                scores['Hospital ID'].values).sum()
+            assert np.allclose(earned[i], totals.reindex(ids).values,
+                               rtol=0, atol=1e-9)
+    finally:
+        qbfunctions.cqmbenchmarks = benchmarks
+    summary = qbfunctions.simulate_benchmarks(scores, frame)
+    assert len(summary) == hospitals
+    print("scenario_totals() for", scenarios, "scenarios x", hospitals,
+          "hospitals x", scores['measure_cd'].nunique(),
+          "measures: {0:.2f}s".format(elapsed))
+
+
+# Build a month of long stack_measures() inputs, several rows per hospital
+# and measure as they come from the measure workbooks and SAS files
+def synthetic_month(rows=100000, hospitals=2000, seed=0):
+    rng = np.random.RandomState(seed)
+    measures = np.array([i for i in qbfunctions.cqmbenchmarks
+                         if i != 'title'], dtype=object)
+    measure = measures[rng.randint(0, len(measures), rows)]
+    readmission = np.isin(measure, ['rrama', 'rracomm'])
+    den = rng.randint(0, 15, rows).astype(float)
+    df = pd.DataFrame({
+        'Hospital ID': ["{0:0>9}".format(i)
+                        for i in rng.randint(0, hospitals, rows)],
+        'measure_cd': measure,
+        'Denominator': den,
+        'Numerator': np.floor(den * rng.uniform(0, 1, rows))})
+    df['Expected Numerator'] = np.where(
+        readmission, den * rng.uniform(0.05, 0.2, rows), np.nan)
+    df['market_expected'] = np.where(readmission, 0.12, np.nan)
+    return df
+
+
+def benchmark_store(months=12, rows=100000):
+    frames = [synthetic_month(rows, seed=i) for i in range(months)]
+    xref = pd.DataFrame({'Hospital ID': [], 'XRef ID': []}, dtype=object)
+    path = os.path.join(tempfile.mkdtemp(), 'store')
+    for month in range(1, months):
+        qbfunctions.update_store(path, frames[month - 1], 2019, month,
+                                 xref_frame=xref)
+    ytd = pd.concat(frames, ignore_index=True)
+    legacy, legacy_time = timed(qbfunctions.score_measures, ytd, xref)
+
+    def add_month():
+        qbfunctions.update_store(path, frames[-1], 2019, months,
+                                 xref_frame=xref)
+        return qbfunctions.store_scores(path, 2019, months)
+    current, current_time = timed(add_month)
+
+    # Regression check: the same scores as the year-to-date inputs; the
+    # market rate is the same constant either way
+    assert legacy['Hospital ID'].equals(current['Hospital ID'])
+    assert legacy['measure_cd'].equals(current['measure_cd'])
+    for i in ['denominator', 'numerator', 'points_earned',
+              'points_available', 'tier']:
+        assert legacy[i].equals(current[i]), i
+    for i in ['rate', 'expected']:
+        assert np.allclose(legacy[i], current[i], rtol=1e-12, atol=0,
+                           equal_nan=True), i
+    print("Month", months, "of", rows, "rows a month:")
+    print("    score_measures() year to date: {0:.3f}s".format(legacy_time))
+    print("    update_store()/store_scores(): {0:.3f}s ({1:.0f}x)".format(
+        current_time, legacy_time / current_time))
+
+
+# Build a readmission hospital file as the readmission SAS program writes it,
+# then MEMBER_RRAMA rows that add up to it: each hospital's stays, its
+# readmissions among them, expected probabilities that sum to its expected
+# numerator and its market rate, plus excluded stays outside the
+# denominator. Hospitals combined by the crossreference are in different
+# markets about half the time. Returns the member rows, the hospital file and
+# the crossreference.
+def synthetic_readmission_members(hospitals=2000, seed=0):
+    rng = np.random.RandomState(seed)
+    ids = np.array(["{0:0>9}".format(i) for i in range(hospitals)],
+                   dtype=object)
+    xref = pd.DataFrame({'Hospital ID': ids[1::10],
+                         'XRef ID': ids[::10][:len(ids[1::10])]})
+    hospital_file = pd.DataFrame({
+        'PROV_NBR': ids,
+        'PROV_REGION2': 'West',
+        'denominator': rng.randint(0, 1000, hospitals).astype(float),
+        'expected': rng.uniform(0.05, 0.25, hospitals),
+        'market_expected': rng.choice([0.11, 0.13, 0.15], hospitals)})
+    hospital_file['numerator'] = np.floor(
+        hospital_file['denominator'] * rng.uniform(0, 0.3, hospitals))
+
+    den = hospital_file['denominator'].values.astype(int)
+    hospital = np.repeat(np.arange(hospitals), den)
+    rank = np.arange(len(hospital)) - np.repeat(np.cumsum(den) - den, den)
+    weights = rng.uniform(0.2, 1.8, len(hospital))
+    exp = hospital_file['expected'].values[hospital] * weights * \
+        den[hospital] / np.bincount(hospital, weights=weights)[hospital]
+    excluded = rng.randint(0, hospitals, len(hospital) // 20)
+    hospital = np.concatenate([hospital, excluded])
+    rows = len(hospital)
+    df = pd.DataFrame({
+        'hospital_id2': ids[hospital],
+        'quality_blue_id': qbfunctions.Crossreference(xref).remap(
+            ids[hospital]),
+        'MDC_Description': np.array(
+            ["MDC {0:0>2}".format(i) for i in range(25)],
+            dtype=object)[rng.randint(0, 25, rows)],
+        'DRG_Description': np.array(
+            ["DRG {0:0>3}".format(i) for i in range(700)],
+            dtype=object)[rng.randint(0, 700, rows)],
+        'DIAG_I_1': np.array(
+            ["D{0:0>4}".format(i) for i in range(5000)],
+            dtype=object)[rng.randint(0, 5000, rows)],
+        'rrama_den': np.concatenate([np.ones(len(rank)),
+                                     np.zeros(len(excluded))]),
+        'rrama_num': np.concatenate([
+            (rank < hospital_file['numerator'].values[
+                hospital[:len(rank)]]).astype(float),
+            np.zeros(len(excluded))]),
+        'rrama_exp': np.concatenate([exp, rng.uniform(0.02, 0.4,
+                                                      len(excluded))]),
+        'rrama_mkt': hospital_file['market_expected'].values[hospital]})
+    return df.sample(frac=1, random_state=seed).reset_index(drop=True), \
+        hospital_file, xref
+
+
+def benchmark_member_readm(hospitals=2000):
+    df, hospital_file, xref = synthetic_readmission_members(hospitals)
+    levels = qbfunctions.readmission_levels
+
+    # Each level summed on its own, as readm() aggregates its hospital files
+    def legacy():
+        frames = []
+        for level in levels:
+            member = pd.DataFrame({
+                level: df[level],
+                'Denominator': df['rrama_den'],
+                'Numerator': df['rrama_num'],
+                'Expected Numerator': df['rrama_exp'] * df['rrama_den'],
+                'Market Numerator': df['rrama_mkt'] * df['rrama_den']})
+            frames.append(member.groupby(level).agg({
+                'Denominator': np.sum,
+                'Numerator': np.sum,
+                'Expected Numerator': np.sum,
+                'Market Numerator': np.sum}))
+        return frames
+    _, legacy_time = timed(legacy)
+    rates, current_time = timed(qbfunctions.member_readm, df, 'rrama',
+                                levels, by='quality_blue_id')
+
+    # Regression check: the hospitals reconcile to the readm() scores of the
+    # hospital file. The market rate is the hospital file's market rates
+    # weighted by denominator, which is readm()'s mean wherever the combined
+    # hospitals share a market.
+    members = qbfunctions.member_readm(df, 'rrama', ['Hospital ID'],
+                                       xref_frame=xref)
+    scores = qbfunctions.score_measures(
+        qbfunctions.stack_measures({'rrama': hospital_file}), xref)
+    members = members.set_index('value').reindex(scores['Hospital ID'])
+    assert np.array_equal(members['Denominator'].values,
+                          scores['denominator'].values)
+    assert np.array_equal(members['Numerator'].values,
+                          scores['numerator'].values)
+    assert np.allclose(members['expected'].values, scores['expected'].values,
+                       rtol=1e-9, atol=0, equal_nan=True)
+
+    combined = qbfunctions.Crossreference(xref).remap(
+        hospital_file['PROV_NBR'])
+    markets = pd.DataFrame({
+        'market': hospital_file['market_expected'].values,
+        'weighted': hospital_file['market_expected'].values *
+        hospital_file['denominator'].values,
+        'den': hospital_file['denominator'].values}).groupby(combined).agg(
+            {'market': 'nunique', 'weighted': 'sum', 'den': 'sum'}).reindex(
+                scores['Hospital ID'])
+    weighted = (markets['weighted'] / markets['den']).values
+    assert np.allclose(members['market_expected'].values, weighted,
+                       rtol=1e-9, atol=0, equal_nan=True)
+    stays = (markets['den'] > 0).values
+    shared = stays & (markets['market'] == 1).values
+    mixed = stays & ~shared & \
+        ~np.isclose(weighted, scores['mkt_expected'].values)
+    assert shared.any() and mixed.any()
+    assert np.allclose(members['market_expected'].values[shared],
+                       scores['mkt_expected'].values[shared],
+                       rtol=1e-9, atol=0, equal_nan=True)
+    assert np.allclose(members['rate'].values[shared],
+                       scores['rate'].values[shared],
+                       rtol=1e-9, atol=0, equal_nan=True)
+    assert not np.allclose(members['rate'].values[mixed],
+                           scores['rate'].values[mixed])
+    _, points = qbfunctions.score_tiers(
+        members['rate'].values, members['Denominator'].values, 'rrama',
+        missing=0)
+    assert np.array_equal(points[shared],
+                          scores['points_earned'].values[shared])
+
+    for level in levels:
+        totals = rates[rates['level'] == level].groupby('quality_blue_id')[
+            ['Denominator', 'pct_tot_den']].sum()
+        assert totals['Denominator'].sum() == df['rrama_den'].sum()
+        # A hospital with only excluded stays has no shares
+        assert np.allclose(
+            totals['pct_tot_den'][totals['Denominator'] > 0], 1)
+    top5 = qbfunctions.readm_top5_frame(
+        rates[rates['quality_blue_id'] == df['quality_blue_id'][0]], 'mdc')
+    assert top5['pcr_den'].sum() > 0
+
+    print("Readmission rates of", len(df), "member rows at", len(levels),
+          "levels:")
+    print("    one groupby per level: {0:.3f}s".format(legacy_time))
+    print("    member_readm():        {0:.3f}s ({1:.1f}x)".format(
+        current_time, legacy_time / current_time))
+
+
+if __name__ == "__main__":
+    benchmark_decoder()
+    benchmark_detail_rows()
+    benchmark_detail_stream()
+    benchmark_detail_export()
+    benchmark_score_tiers()
+    benchmark_crossreference()
+    benchmark_score_bundle()
+    benchmark_simulator()
+    benchmark_store()
+    benchmark_member_readm()
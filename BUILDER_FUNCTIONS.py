@@ -1,8 +1,17 @@
+import concurrent.futures
+import hashlib
+import json
 import math
 import os
+import re
+import shutil
 import sys
+import tempfile
+import threading
+import traceback
 import pandas as pd
 import numpy as np
+import xlsxwriter
 from datetime import date
 import datetime
 
@@ -199,6 +208,316 @@ cqmbenchmarks = {
 }
 
 
+# Columns each dataset needs for the detail writers, the report filters and
+# the denominator and numerator totals. loadsas() reads only these columns
+# when it is given one of these lists.
+report_id_columns = ['hospital_id2', 'quality_blue_id', 'quality_blue_name']
+
+admission_columns = report_id_columns + [
+    'EACM_LA_NM', 'EACM_FST_NM', 'EACM_BIR_DT', 'EACAG_UNQ_MBR_ID', 'product',
+    'PRV_PAT_CL_NO', 'EAC_ADMM_DT', 'EAC_DCG_DT', 'EAC_SRCSY_ASND_CLM_NO',
+    'EACFBT_CD', 'description']
+
+pall_care_columns = admission_columns + [
+    'dx_code', 'dx_svce_dt', 'dx_eac_srcsy_asnd_clm_no',
+    'dx2_code', 'dx2_svce_dt', 'dx2_eac_srcsy_asnd_clm_no',
+    'dx3_code', 'dx3_svce_dt', 'dx3_eac_srcsy_asnd_clm_no',
+    'proc_code', 'proc_svce_dt', 'proc_eac_srcsy_asnd_clm_no',
+    'ais', 'pall_care_code', 'pall_care_svce_dt',
+    'pall_care_eac_srcsy_asnd_clm_no']
+
+ed_return_columns = report_id_columns + [
+    'EACM_LA_NM', 'EACM_FST_NM', 'EACM_BIR_DT', 'EACAG_UNQ_MBR_ID', 'product',
+    'PRV_PAT_CL_NO', 'SVCE_DT', 'EAC_SRCSY_ASND_CLM_NO', 'PRI_DIAG_CD',
+    'description_de', 'num_svce_dt', 'num_claim', 'num_diag',
+    'description_nu', 'num_provname']
+
+readmission_columns = report_id_columns + [
+    'MEM_LNAME', 'MEM_FNAME', 'eacm_bir_dt', 'UMI', 'product', 'PCN',
+    'ADM_DT2', 'IESD2', 'DIAG_I_1', 'dx_description', 'MDC_Description',
+    'DRG_Description', 'READMITDATE30', 'DIAG_I_1_30', 'dx_30_description',
+    'PRV_NM30readmit']
+
+preop_columns = report_id_columns + [
+    'EACM_LA_NM', 'EACM_FST_NM', 'EACM_BIR_DT', 'EACAG_UNQ_MBR_ID', 'product',
+    'PRV_PAT_CL_NO', 'svce_dt', 'EAC_SRCSY_ASND_CLM_NO']
+
+# Columns member_readm() reads besides the denominator and numerator flags:
+# each index stay's expected readmission probability and its market's
+# expected rate. The member files written by the readmission SAS programs do
+# not have them yet, they have to be added there to member_rrama and
+# member_rracomm under these names. The reports do not use them, so only
+# load_member_readm() reads them; until they are added it warns that they are
+# missing and member_readm() raises.
+def readmission_risk_columns(measure_cd):
+    return [measure_cd + '_exp', measure_cd + '_mkt']
+
+
+detail_columns = {
+    'provider': ['hospital_id2', 'hospital_name2', 'quality_blue_id',
+                 'quality_blue_name'],
+    'hosp03': pall_care_columns + ['hosp03_den', 'hosp03_num'],
+    'hosp04': pall_care_columns + ['hosp04_den', 'hosp04_num'],
+    'hosp19': ed_return_columns + ['hosp19_den', 'hosp19_num'],
+    'hosp20': ed_return_columns + ['hosp20_den', 'hosp20_num'],
+    'hosp21': admission_columns + [
+        'CMN_EACDRG_CD', 'EACDS_CD', 'follow_up_svce_dt', 'follow_up_clm_no',
+        'follow_up_description', 'follow_up_proc_code',
+        'hosp21_den', 'hosp21_num'],
+    'rrama': readmission_columns + ['rrama_den', 'rrama_num'],
+    'rracomm': readmission_columns + ['rracomm_den', 'rracomm_num'],
+    'hosp22': preop_columns + ['hosp22_den', 'hosp22_num'],
+    'hosp23': preop_columns + ['hosp23_den', 'hosp23_num'],
+    'hosp24': preop_columns + ['hosp24_den', 'hosp24_num'],
+    'cqm_mbr_detail': report_id_columns + [
+        'practice_id', 'practice_name', 'physician_npi', 'physician_name',
+        'mbr_last_nm', 'mbr_frst_nm', 'mbr_bir_dt', 'umi',
+        'hosp03_den', 'hosp03_num', 'hosp04_den', 'hosp04_num',
+        'hosp19_den', 'hosp19_num', 'hosp20_den', 'hosp20_num',
+        'rrama_den', 'rrama_num', 'rracomm_den', 'rracomm_num',
+        'hosp21_den', 'hosp21_num', 'hosp22_den', 'hosp22_num',
+        'hosp23_den', 'hosp23_num', 'hosp24_den', 'hosp24_num',
+        'LAST_PCP_VISIT_DATE']
+}
+
+# Date columns of each dataset. SAS dates count days from 01/01/1960 and Excel
+# dates count days from 12/30/1899, sas_to_excel_dates() shifts these columns
+# from one to the other.
+sas_excel_offset = 21916
+
+admission_dates = ['EACM_BIR_DT', 'EAC_ADMM_DT', 'EAC_DCG_DT']
+pall_care_dates = admission_dates + [
+    'dx_svce_dt', 'dx2_svce_dt', 'dx3_svce_dt', 'proc_svce_dt',
+    'pall_care_svce_dt']
+ed_return_dates = ['EACM_BIR_DT', 'SVCE_DT', 'num_svce_dt']
+readmission_dates = ['eacm_bir_dt', 'ADM_DT2', 'IESD2', 'READMITDATE30']
+preop_dates = ['EACM_BIR_DT', 'svce_dt']
+
+date_columns = {
+    'hosp03': pall_care_dates,
+    'hosp04': pall_care_dates,
+    'hosp19': ed_return_dates,
+    'hosp20': ed_return_dates,
+    'hosp21': admission_dates + ['follow_up_svce_dt'],
+    'rrama': readmission_dates,
+    'rracomm': readmission_dates,
+    'hosp22': preop_dates,
+    'hosp23': preop_dates,
+    'hosp24': preop_dates,
+    'cqm_mbr_detail': ['mbr_bir_dt', 'LAST_PCP_VISIT_DATE']
+}
+
+# Column specs of the member detail sheets, rendered by render_detail(). Each
+# column is (header, source, width, format) with an optional header format
+# (default 'header'); a width of 0 hides the column. Formats are named, so a
+# spec works with any workbook's styles. A source is either a column name or
+# one of:
+#   ('text', column)                     the column cast to text
+#   ('flag', column, value)              value where the column is 1, else blank
+#   ('case', column, {match: source}, default, blank_format)
+#                                        picks the source column by the value
+#                                        of column; rows with no source
+#                                        (default None) are blank and take
+#                                        blank_format when it is given
+# groups are (first, last, label) header groups over the body columns, with an
+# optional format (default 'headerwrap_group'). A title of None takes the
+# title passed to the writer. hospital_detail_columns are put in front of the
+# body columns on the all-hospital sheets.
+hospital_detail_columns = [
+    ("Hospital ID  ", 'quality_blue_id', 10, 'table_body'),
+    ("Hospital Name  ", 'quality_blue_name', 30, 'table_body')]
+
+member_detail_columns = [
+    ("Member Last Name  ", 'EACM_LA_NM', 20, 'table_body'),
+    ("Member First Name  ", 'EACM_FST_NM', 20, 'table_body'),
+    ("Birth Date  ", 'EACM_BIR_DT', 10, 'table_body_date2'),
+    ("Unique Member ID  ", 'EACAG_UNQ_MBR_ID', 20, 'table_body_date'),
+    ("Product  ", 'product', 20, 'table_body_date')]
+
+pall_care_detail_criteria = {
+    "COPD/CF with O2": 'dx2',
+    "Substantial Risk of Death": 'proc'}
+
+
+def pall_care_detail_columns(numerator):
+    def criteria(suffix):
+        return ('case', 'description', {
+            match: prefix + suffix for match, prefix
+            in pall_care_detail_criteria.items()}, 'dx' + suffix, None)
+
+    def copd(suffix, blank_format=None):
+        return ('case', 'description', {"COPD/CF with O2": 'dx3' + suffix},
+                None, blank_format)
+
+    return member_detail_columns + [
+        ("Patient Number  ", 'PRV_PAT_CL_NO', 15, 'table_body'),
+        ("Admission Date  ", 'EAC_ADMM_DT', 15, 'table_body_date2'),
+        ("Discharge Date  ", 'EAC_DCG_DT', 15, 'table_body_date2'),
+        ("Claim Number  ", ('text', 'EAC_SRCSY_ASND_CLM_NO'), 20,
+         'table_body'),
+        ("Type of Bill  ", 'EACFBT_CD', 10, 'table_body'),
+        ("Description  ", 'description', 25, 'table_body'),
+        ("Code  ", criteria('_code'), 6, 'table_body'),
+        ("Service Date  ", criteria('_svce_dt'), 12, 'table_body_date2'),
+        ("Claim Number  ", criteria('_eac_srcsy_asnd_clm_no'), 20,
+         'table_body'),
+        ("Code  ", copd('_code'), 6, 'table_body'),
+        ("Service Date  ", copd('_svce_dt', 'table_body'), 12,
+         'table_body_date2'),
+        ("Claim Number  ", copd('_eac_srcsy_asnd_clm_no'), 20, 'table_body'),
+        ("AIS  ", ('flag', 'ais', "Y"), 6, 'table_body'),
+        ("Code  ", 'pall_care_code', 6, 'table_body'),
+        ("Service Date  ", 'pall_care_svce_dt', 12, 'table_body_date2'),
+        ("Claim Number  ", 'pall_care_eac_srcsy_asnd_clm_no', 20,
+         'table_body'),
+        ("Numerator", ('flag', numerator, 1), 0, 'table_body')]
+
+
+def preop_detail_columns(numerator):
+    return member_detail_columns + [
+        ("Patient Number  ", 'PRV_PAT_CL_NO', 15, 'table_body'),
+        ("Service Date  ", 'svce_dt', 15, 'table_body_date2'),
+        ("Claim Number  ", ('text', 'EAC_SRCSY_ASND_CLM_NO'), 20,
+         'table_body'),
+        ("Indicator", ('flag', numerator, 1), 20, 'table_body')]
+
+
+pall_care_detail_groups = [
+    (5, 9, "Index Admission  "),
+    (10, 16, "Denominator Criteria  "),
+    (17, 20, "Numerator Criteria")]
+
+preop_detail_groups = [
+    (5, 7, "Denominator Criteria"),
+    (8, 8, "Numerator Criteria", 'header')]
+
+cqm_mbr_detail_measures = [
+    'hosp03', 'hosp04', 'hosp19', 'hosp20', 'rrama', 'rracomm', 'hosp21',
+    'hosp22', 'hosp23', 'hosp24']
+
+detail_specs = {
+    'hosp03': {
+        'title': cqmbenchmarks['hosp03']['title'],
+        'groups': pall_care_detail_groups,
+        'columns': pall_care_detail_columns('hosp03_num')
+    },
+    'hosp04': {
+        'title': cqmbenchmarks['hosp04']['title'],
+        'groups': pall_care_detail_groups,
+        'columns': pall_care_detail_columns('hosp04_num')
+    },
+    'hosp19': {
+        'title': None,
+        'groups': [(5, 9, "Index ED Visit"), (10, 14, "Return ED Visit  ")],
+        'columns': member_detail_columns[:3] + [
+            ("Unique Member ID  ", 'EACAG_UNQ_MBR_ID', 20, 'table_body'),
+            ("Product  ", 'product', 20, 'table_body_date'),
+            ("Patient Number  ", 'PRV_PAT_CL_NO', 20, 'table_body'),
+            ("Service Date  ", 'SVCE_DT', 10, 'table_body_date2'),
+            ("Claim Number  ", ('text', 'EAC_SRCSY_ASND_CLM_NO'), 15,
+             'table_body'),
+            ("Diagnosis  ", 'PRI_DIAG_CD', 10, 'table_body'),
+            ("Diagnosis Description  ", ('text', 'description_de'), 100,
+             'table_body'),
+            ("Service Date  ", 'num_svce_dt', 10, 'table_body_date2'),
+            ("Claim Number  ", ('text', 'num_claim'), 15, 'table_body'),
+            ("Diagnosis  ", 'num_diag', 10, 'table_body'),
+            ("Diagnosis Description  ", ('text', 'description_nu'), 100,
+             'table_body'),
+            ("Place of Capture  ", 'num_provname', 35, 'table_body')]
+    },
+    'hosp21': {
+        'title': cqmbenchmarks['hosp21']['title'],
+        'groups': [(5, 12, "Index Admission"), (13, 16, "Follow-up Visit")],
+        'header_height': 30,
+        'columns': [
+            ("Member Last Name", 'EACM_LA_NM', 20, 'table_body'),
+            ("Member First Name", 'EACM_FST_NM', 20, 'table_body'),
+            ("Birth Date", 'EACM_BIR_DT', 10, 'table_body_date2'),
+            ("Unique Member ID", 'EACAG_UNQ_MBR_ID', 20, 'table_body_date'),
+            ("Product", 'product', 20, 'table_body_date'),
+            ("Patient Number", 'PRV_PAT_CL_NO', 15, 'table_body'),
+            ("Admission Date", 'EAC_ADMM_DT', 10, 'table_body_date2'),
+            ("Discharge Date", 'EAC_DCG_DT', 10, 'table_body_date2'),
+            ("Claim Number", ('text', 'EAC_SRCSY_ASND_CLM_NO'), 20,
+             'table_body'),
+            ("Type of Bill", 'EACFBT_CD', 10, 'table_body'),
+            ("Description", 'description', 30, 'table_body'),
+            ("DRG", 'CMN_EACDRG_CD', 10, 'table_body'),
+            ("Discharge Status", 'EACDS_CD', 10, 'table_body', 'headerwrap'),
+            ("Service Date", 'follow_up_svce_dt', 10, 'table_body_date2',
+             'headerwrap'),
+            ("Claim Number", 'follow_up_clm_no', 20, 'table_body',
+             'headerwrap'),
+            ("Description", 'follow_up_description', 30, 'table_body'),
+            ("Code", 'follow_up_proc_code', 15, 'table_body')]
+    },
+    'reads': {
+        'title': None,
+        'groups': [(5, 11, "Index Admission"), (12, 15, "Readmission")],
+        'header_height': 30,
+        'columns': [
+            ("Member Last Name", 'MEM_LNAME', 20, 'table_body'),
+            ("Member First Name", 'MEM_FNAME', 20, 'table_body'),
+            ("Birth Date", 'eacm_bir_dt', 10, 'table_body_date2'),
+            ("Unique Member ID", 'UMI', 20, 'table_body'),
+            ("Product", 'product', 20, 'table_body'),
+            ("Patient Number", 'PCN', 15, 'table_body'),
+            ("Admission Date", 'ADM_DT2', 10, 'table_body_date2'),
+            ("IESD  ", 'IESD2', 10, 'table_body_date2'),
+            ("Diagnosis", 'DIAG_I_1', 10, 'table_body'),
+            ("Description", ('text', 'dx_description'), 100, 'table_body',
+             'headerwrap'),
+            ("MDC Description", ('text', 'MDC_Description'), 100,
+             'table_body', 'headerwrap'),
+            ("DRG Description", ('text', 'DRG_Description'), 100,
+             'table_body', 'headerwrap'),
+            ("Date", 'READMITDATE30', 10, 'table_body_date2', 'headerwrap'),
+            ("Diagnosis", 'DIAG_I_1_30', 10, 'table_body', 'headerwrap'),
+            ("Description", ('text', 'dx_30_description'), 100,
+             'table_body', 'headerwrap'),
+            ("Place of Capture", 'PRV_NM30readmit', 35, 'table_body',
+             'headerwrap')]
+    },
+    'hosp22': {
+        'title': cqmbenchmarks['hosp22']['title'],
+        'groups': preop_detail_groups,
+        'columns': preop_detail_columns('hosp22_num')
+    },
+    'hosp23': {
+        'title': cqmbenchmarks['hosp23']['title'],
+        'groups': preop_detail_groups,
+        'columns': preop_detail_columns('hosp23_num')
+    },
+    'hosp24': {
+        'title': cqmbenchmarks['hosp24']['title'],
+        'groups': preop_detail_groups,
+        'columns': preop_detail_columns('hosp24_num')
+    },
+    'cqm_mbr_detail': {
+        'title': "MEMBER SUMMARY",
+        'groups': [
+            (8 + 2 * i, 9 + 2 * i, cqmbenchmarks[measure]['title'])
+            for i, measure in enumerate(cqm_mbr_detail_measures)],
+        'columns': [
+            ("Practice ID", 'practice_id', 12, 'table_body'),
+            ("Practice Name", 'practice_name', 30, 'table_body'),
+            ("Physician NPI", 'physician_npi', 15, 'table_body'),
+            ("Physician Name", 'physician_name', 30, 'table_body'),
+            ("Member Last Name", 'mbr_last_nm', 27, 'table_body'),
+            ("Member First Name", 'mbr_frst_nm', 27, 'table_body'),
+            ("Birth Date", 'mbr_bir_dt', 27, 'table_body_date2'),
+            ("Unique Member ID", 'umi', 27, 'table_body')] + [
+            (header, measure + suffix, 27, 'table_body_center',
+             'header_center')
+            for measure in cqm_mbr_detail_measures
+            for header, suffix in [("Denominator  ", '_den'),
+                                   ("Numerator  ", '_num')]] + [
+            ("Last PCP Office Visit  ", 'LAST_PCP_VISIT_DATE', 25,
+             'table_body_date2', 'header_center')]
+    }
+}
+
 overallbenchmarks = {
 #   'max': .63,
 #   'mid': .51,
@@ -277,6 +596,54 @@ epibenchmarks = {
     
 }
 
+# The provider crossreference, which combines hospitals under one reporting
+# ID, as a hash map from Hospital ID to XRef ID built once from an xref frame.
+# A Hospital ID listed more than once keeps its first XRef ID and rows without
+# an XRef ID are ignored. remap() swaps every crossreferenced ID of an array
+# for its reporting ID in one vectorized lookup, and members() lists the
+# hospitals combined under each XRef ID.
+class Crossreference(object):
+
+    def __init__(self, frame):
+        self.frame = frame
+        frame = frame[pd.notnull(frame['XRef ID'])].drop_duplicates(
+            'Hospital ID')
+        self.ids = pd.Series(frame['XRef ID'].values,
+                             index=pd.Index(frame['Hospital ID'].values))
+        self.inverse = None
+
+    # Only the distinct IDs are looked up, a scoring input repeats a few
+    # thousand hospitals
+    def remap(self, ids):
+        codes, uniques = pd.factorize(np.asarray(ids, dtype=object),
+                                      use_na_sentinel=False)
+        uniques = np.asarray(uniques, dtype=object)
+        positions = self.ids.index.get_indexer(uniques)
+        found = positions >= 0
+        uniques[found] = self.ids.values[positions[found]]
+        return uniques.take(codes)
+
+    def members(self):
+        if self.inverse is None:
+            self.inverse = dict(
+                (i, sorted(j)) for i, j in
+                self.ids.index.groupby(self.ids.values).items())
+        return self.inverse
+
+
+# This function returns the Crossreference of an xref frame, by default the
+# module's xref. The last one is kept, so a run builds it only once.
+crossreferences = []
+
+
+def crossreference(frame=None):
+    if frame is None:
+        frame = xref
+    if not crossreferences or crossreferences[0].frame is not frame:
+        crossreferences[:] = [Crossreference(frame)]
+    return crossreferences[0]
+
+
 # This is a function used to set the score to 0 if the points available are 0
 
 
@@ -284,13 +651,73 @@ def pointsavailable(df):
     df.loc[df['Points Earned'] > df['Points Available'], 'Points Earned'] = 0
     return df
 
+
+# The cqmbenchmarks fields of a measure's tiers, in the order tier_points()
+# takes them
+tier_fields = ['max', 'mid', 'min', 'points', 'pointsmid', 'pointsmin']
+
+
+# This function is the tier scoring kernel of score_tiers() and
+# simulate_benchmarks(). tiers holds the tier_fields of each rate's measure
+# on its last axis and is broadcast against the rates, as is missing, so one
+# call can score every rate under many benchmark sets at once. A higher rate
+# is better when the max benchmark is above the min, and a lower rate
+# otherwise.
+def tier_points(rates, dens, tiers, missing=np.nan):
+    rates = np.asarray(rates, dtype=float)
+    maximum, middle, minimum, points, pointsmid, pointsmin = np.moveaxis(
+        np.asarray(tiers, dtype=float), -1, 0)
+    # Flip the sign of lower-is-better measures so every tier is a >= test
+    sign = np.where(maximum > minimum, 1.0, -1.0)
+    values = rates * sign
+    earned = np.select(
+        [values >= maximum * sign, values >= middle * sign,
+         values >= minimum * sign],
+        [points, pointsmid, pointsmin], 0.0)
+    earned = np.where(np.isnan(rates), missing, earned)
+
+    available = np.where(np.asarray(dens) >= 25, points, 0)
+    earned[earned > available] = 0
+    return available, earned
+
+
+# This function scores rates against the cqmbenchmarks tiers of their measures
+# in one vectorized pass. measures is a measure code or an array of them the
+# length of rates, so any number of measures can be scored together. Returns
+# the points available, the measure's points when the denominator is at least
+# 25 and 0 otherwise, and the points earned: the points of the best tier the
+# rate reaches, 0 when it reaches none and missing for a missing rate. As in
+# pointsavailable(), points earned above the points available are set to 0.
+def score_tiers(rates, dens, measures, missing=np.nan):
+    rates = np.asarray(rates, dtype=float)
+    measures = np.broadcast_to(np.asarray(measures, dtype=object), rates.shape)
+    codes, uniques = pd.factorize(measures)
+    benchmarks = [cqmbenchmarks[i] for i in uniques]
+    for i, benchmark in zip(uniques, benchmarks):
+        if benchmark['max'] == benchmark['min']:
+            raise ValueError("The benchmarks for " + i + " are not right")
+
+    tiers = np.array([[i[j] for j in tier_fields] for i in benchmarks],
+                     dtype=float).reshape(-1, len(tier_fields))
+    available, earned = tier_points(rates, dens, tiers[codes], missing)
+    # Whole points stay integers, as they were with the per-row apply
+    points = np.array([i['points'] for i in benchmarks])
+    return available.astype(points.dtype), earned
+
+
 # This function processes readmissions sas datasets from James Trang
 
 
-def readm(filename, measure_cd):
+def readm(filename, measure_cd, store=None):
     # Load Commercial Readmissions
     df = loadsas(filename)
 
+    # With store=(path, year, month) the file holds that month's own figures,
+    # which are also added to the aggregate store (update_store())
+    if store is not None:
+        path, year, month = store
+        update_store(path, stack_measures({measure_cd: df}), year, month)
+
     # Clean Commercial Readmissions
     # When SAS files are read turned into pandas, character variables are loaded as a UTF8 encoded byte string.
     # Decode the byte strings into normal strings with the lambda function
@@ -304,22 +731,9 @@ def readm(filename, measure_cd):
                                   ['exp']] * df['Denominator']
     df['market_expected'] = df[cqmbenchmarks[measure_cd]['market']]
 
-    # Set the index to Hospital ID and then join the Provider Crossreference
-    # dataset.
-    df = df.set_index('Hospital ID').join(
-        xref.set_index('Hospital ID'), rsuffix="_XREF")
-    # Reset to the default index
-    df.reset_index(inplace=True)
-
-    # If the Xref ID is blank, then set the "Keep Hospital ID" indicator to
-    # True
-    df['Keep Hospital ID'] = pd.isnull(df['XRef ID'])
-    # Now , if Keep Hospital ID is True, use the Hospital ID from the original
-    # dataset, else use the XRef ID from the Crossreference Dataset
-    df['Hospital ID'] = np.where(
-        df['Keep Hospital ID'],
-        df['Hospital ID'],
-        df['XRef ID'])
+    # Use the XRef ID from the Provider Crossreference for hospitals that
+    # have one, else keep the Hospital ID from the original dataset
+    df['Hospital ID'] = crossreference().remap(df['Hospital ID'])
 
     # Aggregate the totals for hospitals that were combined in the crossreference
     # FIXME there may be a problem with using the mean market_expected, if two
@@ -340,22 +754,14 @@ def readm(filename, measure_cd):
     df.reset_index(inplace=True)
     # print(df)
     # Add Cutpoints
-    df['Points Available'] = df["Denominator"].apply(
-        lambda x: cqmbenchmarks[measure_cd]['points'] if x >= 25 else 0)
     df['100% Points'] = cqmbenchmarks[measure_cd]['max']
     df['75% Points'] = cqmbenchmarks[measure_cd]['mid']
     df['50% Points'] = cqmbenchmarks[measure_cd]['min']
     df['Clinical Quality Metric'] = cqmbenchmarks[measure_cd]['title']
     df['Rate'] = df['Risk_Adjusted_Rate']
-    # Determine Points Earned
-    df['Points Earned'] = 0
-    maxpoints = cqmbenchmarks[measure_cd]['points']
-    df.loc[df['Risk_Adjusted_Rate'] <= df['50% Points'],
-           'Points Earned'] = cqmbenchmarks[measure_cd]['pointsmin']
-    df.loc[df['Risk_Adjusted_Rate'] <= df['75% Points'],
-           'Points Earned'] = cqmbenchmarks[measure_cd]['pointsmid']
-    df.loc[df['Risk_Adjusted_Rate'] <=
-           df['100% Points'], 'Points Earned'] = maxpoints
+    # Determine Points Available and Points Earned, a missing rate earns 0
+    df['Points Available'], df['Points Earned'] = score_tiers(
+        df['Rate'].values, df['Denominator'].values, measure_cd, missing=0)
     # Filter the pandas dataframe to only the necessary columns
     df = df[['Hospital ID',
              'Clinical Quality Metric',
@@ -369,30 +775,141 @@ def readm(filename, measure_cd):
              '50% Points',
              'expected',
              'market_expected']]
-    df = pointsavailable(df)
     return df.copy(deep=True)
 
 
-def cqm(filename, measure_cd):
+# Grouping levels of member_readm(): the hospital, the Quality Blue hospital
+# and the index admission's MDC, DRG and primary diagnosis
+readmission_levels = ['hospital_id2', 'quality_blue_id', 'MDC_Description',
+                      'DRG_Description', 'DIAG_I_1']
+
+
+# This function computes readmission rates at every level at once from the
+# member rows of a readmission measure (load_member_readm()). Each
+# index stay has its denominator and numerator flags, its expected
+# readmission probability and its market's expected rate
+# (readmission_risk_columns()), so their sums over any group give the observed,
+# expected, market and risk-adjusted rates as readm() computes them from the
+# hospital files. The member rows are stacked once per level and every
+# group of every level is summed in one pass. The market rate is weighted by
+# denominator, where readm() averages it over combined hospitals. by scopes the
+# levels, e.g. by='quality_blue_id' gives each hospital's MDC, DRG and
+# diagnosis rates with their shares of the hospital's totals. A level or by
+# of 'Hospital ID' is hospital_id2 remapped through the crossreference, the
+# hospital readm() reports.
+def member_readm(df, measure_cd, levels=readmission_levels, by=None,
+                 xref_frame=None):
+    missing = [i for i in [measure_cd + '_den', measure_cd + '_num'] +
+               readmission_risk_columns(measure_cd) if i not in df.columns]
+    if missing:
+        raise ValueError("The member rows of " + measure_cd + " do not have " +
+                         ", ".join(missing) + ", see "
+                         "readmission_risk_columns()")
+
+    den = df[measure_cd + '_den'].fillna(0).values.astype(float)
+    num = df[measure_cd + '_num'].fillna(0).values.astype(float)
+    sums = {
+        'Denominator': den,
+        'Numerator': num,
+        'Expected Numerator': np.nan_to_num(
+            df[measure_cd + '_exp'].values.astype(float) * den),
+        'Market Numerator': np.nan_to_num(
+            df[measure_cd + '_mkt'].values.astype(float) * den)}
+
+    def factorize(column):
+        if column == 'Hospital ID' and column not in df.columns:
+            return pd.factorize(
+                crossreference(xref_frame).remap(df['hospital_id2']))
+        return pd.factorize(df[column])
+
+    # The values of every level are factorized into one code space and
+    # combined with the codes of by, so each (level, by, value) group is one
+    # integer and every sum is one bincount over the stacked member rows
+    codes, level, value = [], [], []
+    for i in levels:
+        level_codes, uniques = factorize(i)
+        offset = sum(len(j) for j in value)
+        codes.append(np.where(level_codes < 0, -1, level_codes + offset))
+        level.append(np.repeat(np.array([i], dtype=object), len(uniques)))
+        value.append(np.asarray(uniques, dtype=object))
+    codes = np.concatenate(codes)
+    level, value = np.concatenate(level), np.concatenate(value)
+    if by is None:
+        by_codes, by_values = np.zeros(len(df), dtype=int), [None]
+    else:
+        by_codes, by_values = factorize(by)
+    stacked_by = np.tile(by_codes, len(levels))
+    codes = np.where((codes < 0) | (stacked_by < 0), -1,
+                     codes * len(by_values) + stacked_by)
+    rows = codes >= 0
+    groups, cells = pd.factorize(codes[rows])
+    cells, cells_by = np.divmod(cells, len(by_values))
+
+    rates = pd.DataFrame({'level': level[cells]})
+    if by is not None:
+        rates[by] = by_values.take(cells_by)
+    rates['value'] = value[cells]
+    for i, j in sums.items():
+        rates[i] = np.bincount(groups, weights=np.tile(j, len(levels))[rows],
+                               minlength=len(cells))
+
+    rates['observed'] = rates['Numerator'] / rates['Denominator']
+    rates['expected'] = rates['Expected Numerator'] / rates['Denominator']
+    rates['market_expected'] = rates['Market Numerator'] / \
+        rates['Denominator']
+    rates['rate'] = rates['observed'] / rates['expected'] * \
+        rates['market_expected']
+    # The shares of the totals of each value of by
+    valid = by_codes >= 0
+    for i, j in [('pct_tot_den', 'Denominator'), ('pct_tot_num', 'Numerator')]:
+        totals = np.bincount(by_codes[valid], weights=sums[j][valid],
+                             minlength=len(by_values))
+        # A value of by with no stays or readmissions has no shares
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rates[i] = rates[j].values / totals[cells_by]
+    return rates
+
+
+# The member_readm() levels of the readm_top5() categories
+readm_top5_levels = {
+    'mdc': 'MDC_Description',
+    'drg': 'DRG_Description',
+    'dx': 'DIAG_I_1'}
+
+
+# This function picks one category of member_readm() rates and names its
+# columns as readm_top5() reads them, e.g. one hospital's MDC rates with
+# readm_top5_frame(rates[rates['quality_blue_id'] == i], 'mdc')
+def readm_top5_frame(rates, category):
+    df = rates[rates['level'] == readm_top5_levels[category]]
+    return df.rename(columns={
+        'value': category + '_description',
+        'Denominator': 'pcr_den',
+        'Numerator': 'pcr_num',
+        'observed': 'observed_rate',
+        'expected': 'expected_rate',
+        'market_expected': 'reg_observed_rate',
+        'rate': 'risk_adjust_rate'}).reset_index(drop=True)
+
+
+def cqm(filename, measure_cd, store=None):
     xlsx = loadxl(filename)
 
     # df
     df = sheet(xlsx, cqmbenchmarks[measure_cd]['sheet'])
+
+    # With store=(path, year, month) the file holds that month's own figures,
+    # which are also added to the aggregate store (update_store())
+    if store is not None:
+        path, year, month = store
+        update_store(path, stack_measures({measure_cd: df}), year, month)
     # print(df)
     df['Hospital ID'] = df[cqmbenchmarks[measure_cd][
         'hospital_id']].apply(lambda x: '{0:0>9}'.format(x))
     df['Denominator'] = df[cqmbenchmarks[measure_cd]['den']]
     df['Numerator'] = df[cqmbenchmarks[measure_cd]['num']]
 
-    df = df.set_index('Hospital ID').join(
-        xref.set_index('Hospital ID'), rsuffix="_XREF")
-    df.reset_index(inplace=True)
-
-    df['Keep Hospital ID'] = pd.isnull(df['XRef ID'])
-    df['Hospital ID'] = np.where(
-        df['Keep Hospital ID'],
-        df['Hospital ID'],
-        df['XRef ID'])
+    df['Hospital ID'] = crossreference().remap(df['Hospital ID'])
 
     df_groups = df.groupby('Hospital ID')
     df = df_groups.agg({
@@ -403,34 +920,17 @@ def cqm(filename, measure_cd):
     df = df.fillna(0)
 
     df['Rate'] = df['Numerator'] / df['Denominator']
-    df['Points Available'] = df['Denominator'].apply(
-        lambda x: cqmbenchmarks[measure_cd]['points'] if x >= 25 else 0)
     df['100% Points'] = cqmbenchmarks[measure_cd]['max']
     df['75% Points'] = cqmbenchmarks[measure_cd]['mid']
     df['50% Points'] = cqmbenchmarks[measure_cd]['min']
 
-    if cqmbenchmarks[measure_cd]['max'] > cqmbenchmarks[measure_cd]['min']:
-        df.loc[df['Rate'] < df['50% Points'], 'Points Earned'] = 0
-        df.loc[df['Rate'] >= df['50% Points'],
-               'Points Earned'] = cqmbenchmarks[measure_cd]['pointsmin']
-        df.loc[df['Rate'] >= df['75% Points'],
-               'Points Earned'] = cqmbenchmarks[measure_cd]['pointsmid']
-        df.loc[df['Rate'] >= df['100% Points'],
-               'Points Earned'] = cqmbenchmarks[measure_cd]['points']
-    elif cqmbenchmarks[measure_cd]['max'] < cqmbenchmarks[measure_cd]['min']:
-        df.loc[df['Rate'] > df['50% Points'], 'Points Earned'] = 0
-        df.loc[df['Rate'] <= df['50% Points'],
-               'Points Earned'] = cqmbenchmarks[measure_cd]['pointsmin']
-        df.loc[df['Rate'] <= df['75% Points'],
-               'Points Earned'] = cqmbenchmarks[measure_cd]['pointsmid']
-        df.loc[df['Rate'] <= df['100% Points'],
-               'Points Earned'] = cqmbenchmarks[measure_cd]['points']
-    else:
+    try:
+        df['Points Available'], df['Points Earned'] = score_tiers(
+            df['Rate'].values, df['Denominator'].values, measure_cd)
+    except ValueError:
         print("ERROR: The benchmarks for", measure_cd, "are not right")
         quit()
 
-    df.fillna(0)
-
     df['Clinical Quality Metric'] = cqmbenchmarks[measure_cd]['title']
 
     df = df[['Hospital ID',
@@ -443,31 +943,471 @@ def cqm(filename, measure_cd):
              '100% Points',
              '75% Points',
              '50% Points']]
-    df = pointsavailable(df)
 
     return df.copy(deep=True)
 
 
-def decoder(df):
-    columns = list(df.columns.values)
-    for i in columns:
-        for j in range(0, len(df[i])):
+# This function stacks the hospital-level inputs of several measures, as they
+# are read from their workbooks and SAS files ({measure_cd: df}), into the
+# long frame that score_measures() takes. Each measure's columns are found
+# through its cqmbenchmarks entry, the readmission measures (the ones with an
+# expected rate) also bring their Expected Numerator and market_expected.
+def stack_measures(frames):
+    stacked = []
+    for measure_cd, df in frames.items():
+        benchmark = cqmbenchmarks[measure_cd]
+        ids = df[benchmark['hospital_id']]
+        if 'exp' in benchmark:
+            ids = ids.map(lambda x: x.decode("utf-8")
+                          if isinstance(x, bytes) else x)
+        else:
+            ids = ids.map('{0:0>9}'.format)
+        long = pd.DataFrame({
+            'Hospital ID': ids.values,
+            'measure_cd': measure_cd,
+            'Denominator': df[benchmark['den']].values,
+            'Numerator': df[benchmark['num']].values})
+        if 'exp' in benchmark:
+            long['Expected Numerator'] = df[benchmark['exp']].values * \
+                long['Denominator'].values
+            long['market_expected'] = df[benchmark['market']].values
+        stacked.append(long)
+    return pd.concat(stacked, ignore_index=True, sort=False)
+
+
+# This function aggregates a long frame from stack_measures() to one row per
+# hospital and measure. Hospitals are remapped through the crossreference of
+# xref_frame (xref by default) and summed with one groupby over Hospital ID
+# and measure; market_expected is averaged as in readm(). The counts are
+# summed by pandas, Expected Numerator and market_expected with np.sum and
+# np.mean as readm() does, so the rates agree with it to the last bit.
+# np.sum and np.mean are called once per group, so with exact=False they are
+# summed and averaged by pandas too, which agrees up to rounding and is much
+# faster with many hospitals.
+def aggregate_measures(df, xref_frame=None, exact=True):
+    df = df.copy()
+    for i in ['Expected Numerator', 'market_expected']:
+        if i not in df.columns:
+            df[i] = np.nan
+
+    df['Hospital ID'] = crossreference(xref_frame).remap(df['Hospital ID'])
+
+    groups = df.groupby(['Hospital ID', 'measure_cd'], sort=False)
+    sums = groups[['Denominator', 'Numerator']].sum()
+    readmission = df['Expected Numerator'].notna() | \
+        df['market_expected'].notna()
+    if readmission.any():
+        expected = df[readmission].groupby(
+            ['Hospital ID', 'measure_cd'], sort=False).agg({
+                'Expected Numerator': np.sum if exact else 'sum',
+                'market_expected': np.mean if exact else 'mean'
+            })
+        sums = sums.join(expected)
+    else:
+        sums = sums.assign(**{'Expected Numerator': np.nan,
+                              'market_expected': np.nan})
+    return sums.reset_index().fillna(0)
+
+
+# This function scores aggregated measures, one row per measure and value of
+# keys (Hospital ID by default), with every rate in one score_tiers() call.
+# Readmission measures are scored on the risk-adjusted rate, as readm() does.
+# Profiled measures (hosp22 to hosp24) keep their rates with 0 points
+# available and earned and no tier.
+# Returns the rows in cqmbenchmarks order with the columns cqmtable() and
+# cqm_monthly() render, the totals are summed over each value of keys.
+def score_aggregates(df, keys=['Hospital ID']):
+    df = df.copy()
+    measures = [i for i in cqmbenchmarks if i != 'title']
+    readmission = df['measure_cd'].isin(
+        [i for i in measures if 'exp' in cqmbenchmarks[i]]).values
+    df['observed'] = df['Numerator'] / df['Denominator']
+    df['expected'] = df['Expected Numerator'] / df['Denominator']
+    adjusted = df['observed'] / df['expected'] * df['market_expected']
+    df['rate'] = np.where(readmission, adjusted, df['observed'])
+    # Profiled measures (equal max and min benchmarks) are reported unscored
+    scored = df['measure_cd'].map(dict(
+        (i, cqmbenchmarks[i]['max'] != cqmbenchmarks[i]['min'])
+        for i in measures)).values.astype(bool)
+    available = np.zeros(len(df), dtype=int)
+    earned = np.zeros(len(df))
+    if scored.any():
+        scored_available, earned[scored] = score_tiers(
+            df['rate'].values[scored], df['Denominator'].values[scored],
+            df['measure_cd'].values[scored])
+        available = available.astype(scored_available.dtype)
+        available[scored] = scored_available
+    df['points_available'], df['points_earned'] = available, earned
+    df.loc[readmission & df['points_earned'].isna().values,
+           'points_earned'] = 0
+
+    # The tier each rate reaches, whatever its denominator
+    tiers = np.array([[cqmbenchmarks[i][j] for j in ['max', 'mid', 'min']] +
+                      [3, 2, 1] for i in measures])
+    _, tier = tier_points(
+        df['rate'].values, 25,
+        tiers[df['measure_cd'].map(dict((j, i) for i, j in enumerate(
+            measures))).values.astype(int)])
+    df['tier'] = np.where(scored, np.array(['Zero', 'Min', 'Mid', 'Max', ''])[
+        np.nan_to_num(tier, nan=4).astype(int)], '')
+
+    for i in ['max', 'mid', 'min']:
+        df[i] = df['measure_cd'].map(
+            dict((j, cqmbenchmarks[j][i]) for j in measures))
+    groups = df.groupby(keys)
+    df['total_points_earned'] = groups['points_earned'].transform('sum')
+    df['total_points_available'] = groups[
+        'points_available'].transform('sum')
+    df['order'] = df['measure_cd'].map(
+        dict((j, i) for i, j in enumerate(measures)))
+    df = df.sort_values(keys + ['order'], kind='stable')
+    df = df.rename(columns={'Denominator': 'denominator',
+                            'Numerator': 'numerator',
+                            'market_expected': 'mkt_expected'})
+    return df[keys + [
+        'measure_cd', 'denominator', 'numerator', 'rate', 'points_earned',
+        'points_available', 'max', 'mid', 'min', 'total_points_earned',
+        'total_points_available', 'observed', 'expected', 'mkt_expected',
+        'tier']].reset_index(drop=True)
+
+
+# This function scores every measure of a long frame from stack_measures() at
+# once, see aggregate_measures() and score_aggregates()
+def score_measures(df, xref_frame=None):
+    return score_aggregates(aggregate_measures(df, xref_frame))
+
+
+# The aggregate store keeps the partial sums of every hospital and measure by
+# month in a directory with one Parquet file per month, so a new month is
+# added to it instead of the year being processed again. Each row holds one
+# month's increments. The market rate is kept as Market Numerator
+# (market_expected times Denominator), so a year-to-date market rate is
+# weighted by denominator.
+store_keys = ['Hospital ID', 'measure_cd', 'year', 'month']
+store_sums = ['Denominator', 'Numerator', 'Expected Numerator',
+              'Market Numerator']
+
+
+def store_file(path, year, month):
+    return os.path.join(path, "{0}_{1:0>2}.parquet".format(year, month))
+
+
+# This function returns the (year, month) of every month in the store in order
+def store_months(path):
+    months = []
+    if os.path.isdir(path):
+        for i in os.listdir(path):
+            name, ext = os.path.splitext(i)
+            parts = name.split("_")
+            if ext == ".parquet" and len(parts) == 2 and \
+                    parts[0].isdigit() and parts[1].isdigit():
+                months.append((int(parts[0]), int(parts[1])))
+    return sorted(months)
+
+
+# This function loads the store rows of the given (year, month) pairs, every
+# stored month by default. Months that are not stored are skipped.
+def load_store(path, months=None):
+    if months is None:
+        months = store_months(path)
+    frames = [pd.read_parquet(store_file(path, year, month))
+              for year, month in months
+              if os.path.exists(store_file(path, year, month))]
+    if not frames:
+        return pd.DataFrame(dict(
+            [(i, pd.Series([], dtype=object)) for i in store_keys[:2]] +
+            [(i, pd.Series([], dtype='int64')) for i in store_keys[2:]] +
+            [(i, pd.Series([], dtype=float)) for i in store_sums]))
+    return pd.concat(frames, ignore_index=True)
+
+
+def save_store(path, year, month, store):
+    os.makedirs(path, exist_ok=True)
+    month_file = store_file(path, year, month)
+    tmp_file = month_file + "." + str(os.getpid()) + ".tmp"
+    store.to_parquet(tmp_file, index=False)
+    os.replace(tmp_file, month_file)
+
+
+# This function adds a month to the store from a long frame of stack_measures()
+# inputs holding that month's own figures, not year-to-date ones. Only the
+# month's file is read and written: the measures in df replace the ones
+# already stored for the month, other measures and months are left as they
+# are. Returns the month's rows.
+def update_store(path, df, year, month, xref_frame=None):
+    sums = aggregate_measures(df, xref_frame, exact=False)
+    sums['Market Numerator'] = sums['market_expected'] * sums['Denominator']
+    sums['year'] = year
+    sums['month'] = month
+    sums = sums[store_keys + store_sums]
+
+    store = load_store(path, [(year, month)])
+    store = store[~store['measure_cd'].isin(sums['measure_cd'])]
+    if len(store):
+        sums = pd.concat([store, sums], ignore_index=True)
+    sums = sums.sort_values(store_keys).reset_index(drop=True)
+    save_store(path, year, month, sums)
+    return sums
+
+
+# This function turns summed store rows back into aggregated measures
+def store_aggregates(df):
+    df = df.copy()
+    df['market_expected'] = (
+        df['Market Numerator'] / df['Denominator']).fillna(0)
+    return df
+
+
+# This function scores the year-to-date figures of every hospital and measure
+# through a month from the store, as score_measures() would from that
+# month's year-to-date inputs
+def store_scores(path, year, month):
+    store = load_store(path, [(year, i) for i in range(1, month + 1)])
+    df = store.groupby(['Hospital ID', 'measure_cd'], sort=False)[
+        store_sums].sum().reset_index()
+    return score_aggregates(store_aggregates(df))
+
+
+# This function returns the year-to-date trend of every stored month, one row
+# per hospital, measure and month with the year and month, rates and tier
+# that cqm_monthly() renders. hospital_id limits it to one hospital.
+def store_trend(path, hospital_id=None):
+    store = load_store(path)
+    months = store[['year', 'month']].drop_duplicates()
+    if hospital_id is not None:
+        store = store[store['Hospital ID'] == hospital_id]
+    # Every hospital and measure gets a row in each stored month of the year,
+    # so one with nothing new in a month keeps its year-to-date figures. Rows
+    # before its first stored month are dropped.
+    store = store[['Hospital ID', 'measure_cd', 'year']].drop_duplicates(
+        ).merge(months, on='year').merge(
+            store.assign(stored=1), on=store_keys, how='left')
+    store = store.fillna(0).sort_values(store_keys).reset_index(drop=True)
+    df = store[store_keys].join(store.groupby(
+        ['Hospital ID', 'measure_cd', 'year'])[
+            store_sums + ['stored']].cumsum())
+    df = df[df['stored'] > 0].drop(columns='stored')
+    return score_aggregates(store_aggregates(df),
+                            keys=['Hospital ID', 'year', 'month'])
+
+
+# This function scores the hospital rates of a score_measures() frame under
+# many what-if benchmark sets at once. scenarios has one row per scenario and
+# (measure_cd, field) columns for the tier_fields to change, e.g.
+# ('hosp19', 'max') or ('rrama', 'pointsmid'); fields left out keep their
+# cqmbenchmarks value. Each chunk of scenarios is scored against every
+# hospital and measure as one array. Returns the hospital IDs and the total
+# points earned and available by scenario (rows) and hospital (columns).
+def scenario_totals(scores, scenarios, chunksize=1000):
+    codes, measures = pd.factorize(scores['measure_cd'])
+    hospitals, ids = np.unique(np.asarray(scores['Hospital ID'], dtype=object),
+                               return_inverse=True)
+    order = np.argsort(ids, kind='stable')
+    starts = np.searchsorted(ids[order], np.arange(len(hospitals)))
+    rates = scores['rate'].values[order]
+    dens = scores['denominator'].values[order]
+    codes = codes[order]
+    # Readmission measures earn 0 for a missing rate, as in score_measures()
+    missing = np.where(np.isin(measures[codes], [
+        i for i in cqmbenchmarks if i != 'title' and
+        'exp' in cqmbenchmarks[i]]), 0.0, np.nan)
+
+    tiers = np.empty((len(scenarios), len(measures), len(tier_fields)))
+    for j, measure_cd in enumerate(measures):
+        for k, field in enumerate(tier_fields):
+            if (measure_cd, field) in scenarios.columns:
+                tiers[:, j, k] = scenarios[(measure_cd, field)].values
+            else:
+                tiers[:, j, k] = cqmbenchmarks[measure_cd][field]
+
+    earned = np.zeros((len(scenarios), len(hospitals)))
+    available = np.zeros((len(scenarios), len(hospitals)))
+    for start in range(0, len(scenarios), chunksize):
+        stop = min(start + chunksize, len(scenarios))
+        points, points_earned = tier_points(
+            rates, dens, tiers[start:stop][:, codes], missing)
+        if len(starts):
+            earned[start:stop] = np.add.reduceat(
+                np.nan_to_num(points_earned), starts, axis=1)
+            available[start:stop] = np.add.reduceat(points, starts, axis=1)
+    return hospitals, earned, available
+
+
+# This function summarizes scenario_totals() by hospital: the total points
+# earned under the current cqmbenchmarks and the distribution of the total
+# over the scenarios, with the mean points available
+def simulate_benchmarks(scores, scenarios, chunksize=1000):
+    hospitals, earned, available = scenario_totals(scores, scenarios,
+                                                   chunksize)
+    current = scores.groupby('Hospital ID')['points_earned'].sum()
+    percentiles = [5, 25, 50, 75, 95]
+    quantiles = np.percentile(earned, percentiles, axis=0)
+    df = pd.DataFrame({
+        'Hospital ID': hospitals,
+        'current': current.reindex(hospitals).values,
+        'mean': earned.mean(axis=0),
+        'std': earned.std(axis=0),
+        'min': earned.min(axis=0)})
+    for i, values in zip(percentiles, quantiles):
+        df[str(i) + '%'] = values
+    df['max'] = earned.max(axis=0)
+    df['mean_available'] = available.mean(axis=0)
+    return df
+
+
+# This function decodes the UTF8 byte string columns that pd.read_sas creates.
+# Each byte string column is found once and decoded through its distinct
+# values, so the work scales with the number of unique values rather than the
+# number of cells. Numeric columns are left alone. dtype can be "category",
+# "string" or "arrow" to convert the decoded columns.
+def decoder(df, dtype=None):
+    for i in df.columns:
+        if df[i].dtype != object:
+            continue
+        kind = pd.api.types.infer_dtype(df[i], skipna=True)
+        if kind not in ("bytes", "mixed"):
+            continue
+        codes, uniques = pd.factorize(df[i])
+        decoded = np.empty(len(uniques), dtype=object)
+        for j, value in enumerate(uniques):
             try:
-                df[i].values[j] = df[i].values[j].decode("utf-8")
-                #df[i] = df[i].apply(lambda x: x.decode("utf-8"))
+                decoded[j] = value.decode("utf-8")
             except BaseException:
-                continue
+                decoded[j] = value
+        values = decoded.take(codes)
+        # factorize() marks missing values with -1, put them back
+        values[codes == -1] = df[i].values[codes == -1]
+        col = pd.Series(values, index=df.index, name=i)
+        if dtype == "category":
+            col = col.astype("category")
+        elif dtype == "string":
+            col = col.astype("string")
+        elif dtype == "arrow":
+            col = col.astype("string[pyarrow]")
+        df[i] = col
     return df
 
 # Load SAS datasets
-# This function loads SAS files as a pandas dataframe
+# Decoded SAS datasets are cached as Parquet files in this directory so reruns
+# can skip pd.read_sas. Set QB_SAS_CACHE to an empty string to turn it off.
+sas_cache_dir = os.environ.get("QB_SAS_CACHE", os.path.join(
+    os.path.expanduser("~"), ".qb_sas_cache"))
+
+
+# This function returns the cache file for a SAS dataset. The name is keyed on
+# the dataset (path, decoding and columns) and on its version (size and
+# modification time) so a changed file is never reused.
+def sas_cache_path(filename, cache_dir, decode=False, columns=None):
+    stat = os.stat(filename)
+    dataset = "{0}|{1}|{2}".format(
+        os.path.abspath(filename),
+        decode,
+        ",".join(columns) if columns else "")
+    version = "{0}|{1}".format(stat.st_size, stat.st_mtime_ns)
+    name = os.path.splitext(os.path.basename(filename))[0]
+    return os.path.join(cache_dir, "{0}_{1}_{2}.parquet".format(
+        name,
+        hashlib.sha1(dataset.encode("utf-8")).hexdigest()[:16],
+        hashlib.sha1(version.encode("utf-8")).hexdigest()[:16]))
+
+
+# This function removes the cache files of the other versions of a cached
+# dataset, so each refresh of a SAS file replaces its cached copy instead of
+# adding another one
+def prune_sas_cache(cache_file):
+    prefix = os.path.basename(cache_file).rsplit("_", 1)[0] + "_"
+    cache_dir = os.path.dirname(cache_file)
+    for i in os.listdir(cache_dir):
+        if i.startswith(prefix) and i.endswith(".parquet") and \
+                i != os.path.basename(cache_file):
+            try:
+                os.remove(os.path.join(cache_dir, i))
+            except OSError:
+                print("WARNING: Unable to remove the stale cache file", i)
+
+
+# This function reads a SAS dataset. When a list of columns is given the file
+# is read in chunks and the other columns are dropped from each chunk, so peak
+# memory follows the columns that are kept rather than the whole file.
+# Requested columns the file does not have are listed in a warning.
+def projectsas(filename, columns=None, chunksize=100000):
+    if not columns:
+        return pd.read_sas(filename)
+    reader = pd.read_sas(filename, chunksize=chunksize)
+    try:
+        chunks = []
+        for chunk in reader:
+            if not chunks:
+                missing = [i for i in columns if i not in chunk.columns]
+                if missing:
+                    print("WARNING:", filename, "is missing the columns",
+                          ", ".join(missing))
+            chunks.append(chunk[[i for i in columns if i in chunk.columns]])
+    finally:
+        reader.close()
+    if not chunks:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(chunks, ignore_index=True)
+
+
+# This function reads a SAS dataset through the Parquet cache. A cache hit is
+# memory-mapped instead of parsed; a miss is parsed and written to the cache.
+def readsas(filename, cache_dir=None, decode=False, columns=None):
+    if not cache_dir:
+        df = projectsas(filename, columns)
+        return decoder(df) if decode else df
+
+    cache_file = sas_cache_path(filename, cache_dir, decode, columns)
+    if os.path.exists(cache_file):
+        try:
+            return pd.read_parquet(cache_file, memory_map=True)
+        except BaseException:
+            print("WARNING: Unable to read the cached copy", cache_file)
+
+    df = projectsas(filename, columns)
+    if decode:
+        df = decoder(df)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        # Write to a temporary file first so a failed write never leaves a
+        # partial cache file behind
+        tmp_file = cache_file + "." + str(os.getpid()) + ".tmp"
+        df.to_parquet(tmp_file, index=False)
+        os.replace(tmp_file, cache_file)
+        prune_sas_cache(cache_file)
+    except BaseException:
+        print("WARNING: Unable to cache", filename, "in", cache_dir)
+    return df
+
+
+# This function gives a loaded SAS dataset its missing value handling. By
+# default every missing value becomes "", which turns numeric columns with a
+# missing value into object columns. typed=True keeps numeric columns numeric
+# with NaN and stores text columns with the pandas string dtype instead.
+def missingsas(df, typed=False):
+    if not typed:
+        return df.fillna("")
+    for i in df.columns:
+        if df[i].dtype == object and \
+                pd.api.types.infer_dtype(df[i], skipna=True) == "string":
+            df[i] = df[i].astype("string")
+    return df
+
 
+# This function turns missing values into blank cells for the detail writers.
+# Columns are converted to object first so typed columns can hold "".
+def blanks(df):
+    return df.astype(object).where(df.notna(), "")
 
-def loadsas(filename):
+
+# This function loads SAS files as a pandas dataframe
+def loadsas(filename, cache_dir=sas_cache_dir, decode=False, columns=None,
+            typed=False):
     # Try to load the SAS dataset. If that doesn't work, print an error and
     # quit
     try:
-        sas7bdat = pd.read_sas(filename).fillna("")
+        sas7bdat = missingsas(
+            readsas(filename, cache_dir, decode, columns), typed)
         print(
             "The SAS dataset",
             filename,
@@ -482,9 +1422,180 @@ def loadsas(filename):
         tracebackerror()
         quit()
 
-        # This function loads excel files
+
+# This function loads one dataset for loadsas_parallel(). Errors are returned
+# rather than quitting so one bad file does not hide problems with the others.
+def loadsas_job(job):
+    name, filename, columns, cache_dir, decode, typed = job
+    try:
+        df = missingsas(readsas(filename, cache_dir, decode, columns), typed)
+        return name, df, None
+    except BaseException:
+        return name, None, filename + "\n" + traceback.format_exc()
+
+
+# This function loads several SAS datasets at once in a pool of worker
+# processes. datasets maps a name to a (filename, columns) pair and the
+# loaded dataframes come back in a dictionary under the same names. If any
+# file fails, every failure is printed together before quitting.
+def loadsas_parallel(datasets, workers=4, cache_dir=sas_cache_dir,
+                     decode=False, typed=False):
+    jobs = [(name, filename, columns, cache_dir, decode, typed)
+            for name, (filename, columns) in datasets.items()]
+    frames = {}
+    errors = {}
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        for name, df, error in pool.map(loadsas_job, jobs):
+            if error is None:
+                frames[name] = df
+                print("The SAS dataset", datasets[name][0],
+                      "was loaded successfully with", len(df), "rows")
+            else:
+                errors[name] = error
+
+    if errors:
+        print("ERROR:", len(errors), "of", len(jobs),
+              "SAS datasets could not be loaded:")
+        for name in errors:
+            print("-", name + ":", errors[name])
+        quit()
+    return frames
+
+
+# This function loads the member rows of a readmission measure for
+# member_readm(): the columns the reports load plus the
+# readmission_risk_columns(), which the report loads leave out
+def load_member_readm(filename, measure_cd, cache_dir=sas_cache_dir):
+    return loadsas(filename, cache_dir, decode=True, columns=detail_columns[
+        measure_cd] + readmission_risk_columns(measure_cd), typed=True)
 
 
+# This function converts SAS date columns to Excel date serial numbers in
+# place. Each column becomes a float column with NaN for missing dates, which
+# the detail writers show as blank cells.
+def sas_to_excel_dates(df, columns):
+    for i in columns:
+        if np.issubdtype(df[i].dtype, np.datetime64):
+            # pd.read_sas already turned formatted SAS dates into datetimes
+            df[i] = (df[i] - pd.Timestamp(1899, 12, 30)) / pd.Timedelta(days=1)
+        else:
+            df[i] = pd.to_numeric(df[i], errors='coerce') + sas_excel_offset
+    return df
+
+
+# This function indexes a dataframe by the values of col. The rows are sorted
+# once by value (keeping their original order within each value) and each
+# value maps to its block of row positions, so the rows for one hospital are
+# taken from the frame with a dictionary lookup rather than a scan of the
+# whole dataset, and no sorted copy of the frame is kept.
+def partition(df, col):
+    if len(df) == 0:
+        return {}
+    codes, uniques = pd.factorize(df[col])
+    order = np.argsort(codes, kind='mergesort')
+    codes = codes[order]
+    bounds = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1], True])
+    parts = {}
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        # factorize() gives missing values the code -1, leave them out
+        if codes[start] >= 0:
+            parts[uniques[codes[start]]] = order[start:stop]
+    return parts
+
+
+# The version of the report layout that the rendering code writes. Bump it
+# whenever a change to the writers alters the reports built from the same
+# inputs, so reports built by the older code are rebuilt.
+layout_version = 1
+
+
+# This function returns a hash of the contents of a list of dataframes and
+# any extra values, used to tell whether a report's inputs have changed since
+# the report was last built
+def content_hash(frames, *extra):
+    digest = hashlib.sha1()
+    for df in frames:
+        digest.update(",".join(str(i) for i in df.columns).encode("utf-8"))
+        digest.update(
+            pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    for i in extra:
+        digest.update(str(i).encode("utf-8"))
+    return digest.hexdigest()
+
+
+# These functions read and write a manifest of report file names and the hash
+# of the inputs each one was built from
+def load_manifest(filename):
+    try:
+        with open(filename) as manifest_file:
+            return json.load(manifest_file)
+    except BaseException:
+        return {}
+
+
+def save_manifest(filename, manifest):
+    tmp_file = filename + "." + str(os.getpid()) + ".tmp"
+    with open(tmp_file, "w") as manifest_file:
+        json.dump(manifest, manifest_file, indent=1, sort_keys=True)
+    os.replace(tmp_file, filename)
+
+
+# A bounded pool of background threads that copies finished report files from
+# a local scratch directory to their final location, usually on the network
+# filesystem, so the next report can be rendered while the last one is being
+# written out. Files are rendered at local(path) and handed over with
+# flush(path). Each copy is written next to the final file under a temporary
+# name and renamed into place, so a partial file is never seen there. flush()
+# waits while the backlog of pending copies is full.
+class Flusher(object):
+
+    def __init__(self, workers=2, backlog=None, scratch_dir=None):
+        self.scratch = tempfile.mkdtemp(prefix="qb_flush_", dir=scratch_dir)
+        self.pool = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+        self.slots = threading.BoundedSemaphore(backlog or 2 * workers)
+        self.futures = []
+
+    # The scratch path to write a file at before flushing it to path
+    def local(self, path):
+        local = os.path.join(self.scratch, os.path.abspath(path).lstrip(os.sep))
+        os.makedirs(os.path.dirname(local), exist_ok=True)
+        return local
+
+    # Copy a file rendered at local(path) to path in the background. Failures
+    # are reported by close() under key, the path by default.
+    def flush(self, path, key=None):
+        self.slots.acquire()
+        try:
+            future = self.pool.submit(self.copy, self.local(path), path)
+        except BaseException:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda x: self.slots.release())
+        self.futures.append((path if key is None else key, future))
+        return future
+
+    def copy(self, local, path):
+        tmp_file = path + "." + str(os.getpid()) + ".tmp"
+        shutil.copyfile(local, tmp_file)
+        os.replace(tmp_file, path)
+        os.remove(local)
+
+    # Wait for every copy and remove the scratch directory. Returns the
+    # tracebacks of failed copies by key.
+    def close(self):
+        self.pool.shutdown(wait=True)
+        errors = {}
+        for key, future in self.futures:
+            error = future.exception()
+            if error is not None:
+                errors[key] = errors.get(key, "") + "".join(
+                    traceback.format_exception(
+                        type(error), error, error.__traceback__))
+        shutil.rmtree(self.scratch, ignore_errors=True)
+        return errors
+
+
+# This function loads excel files
 def loadxl(filename):
     xlsx = pd.ExcelFile(filename)
     print("This Excel workbook contains the sheets", xlsx.sheet_names)
@@ -504,17 +1615,45 @@ def sheet(xlsx, sheetname):
         tracebackerror()
         quit()
 
+# The quality bundle tiers in the order a star rating is tested against them.
+# A rating earns the points of the first tier whose score it reaches, except
+# that 'max' is only met by a rating equal to its score.
+bundle_tiers = ['bonus5', 'bonus2', 'max', 'mid', 'min']
+
+
+# This function returns the bundle points available and earned for an array
+# of star ratings under a qbbenchmarks style dictionary. The tier scores are
+# sorted once and every rating is placed with one searchsorted() lookup, so a
+# what-if dictionary can be rescored cheaply. Tiers whose scores are out of
+# order are still tested in bundle_tiers order.
+def bundle_points(ratings, dictionary):
+    ratings = np.asarray(ratings, dtype=float)
+    ranks = np.array([i for i, name in enumerate(bundle_tiers)
+                      if name != 'max'])
+    scores = np.array([dictionary[bundle_tiers[i]]['score'] for i in ranks],
+                      dtype=float)
+    order = np.argsort(scores, kind='stable')
+    # The first tier reached by a rating at or above the n lowest scores
+    first = np.concatenate([[len(bundle_tiers)],
+                            np.minimum.accumulate(ranks[order])])
+    tiers = first[np.searchsorted(scores[order], ratings, side='right')]
+    maxtier = bundle_tiers.index('max')
+    tiers[(ratings == dictionary['max']['score']) & (tiers > maxtier)] = \
+        maxtier
+    tiers[np.isnan(ratings)] = len(bundle_tiers)
+
+    points = np.array([dictionary[i]['points'] for i in bundle_tiers] + [0])
+    available = np.where(ratings >= 1, dictionary['max']['points'], 0)
+    return available, points[tiers]
+
+
 # Calculate the points earned
 
 
 def score_bundle(df, star_rating, dictionary):
     df2 = df.copy(deep=True)
-    df2["Points Available"] = df2[star_rating].apply(
-        lambda x: dictionary['max']['points'] if x >= 1 else 0)
-    df2["Points Earned"] = 0
-    df2["Points Earned"] = df2[star_rating].apply(lambda x: dictionary['bonus5']['points'] if x >= dictionary['bonus5']['score']
-                                                  else dictionary['bonus2']['points'] if x >= dictionary['bonus2']['score'] else dictionary['max']['points'] if x == dictionary['max']['score']
-                                                  else dictionary['mid']['points'] if x >= dictionary['mid']['score'] else dictionary['min']['points'] if x >= dictionary['min']['score'] else 0)
+    df2["Points Available"], df2["Points Earned"] = bundle_points(
+        df2[star_rating].values, dictionary)
     return df2.copy(deep=True)
 
 
@@ -545,475 +1684,477 @@ red2 = '#e31b23'
 yellow1 = '#ffd100'
 
 
-# This function binds styles to an xlsxwriter workbook object. The styles must be defined before they can be used.
-# Because of the limitations of xlsxwriter, number formats have to be
+# Format properties of the report styles, in the order xlsxwriter applies
+# them. Because of the limitations of xlsxwriter, number formats have to be
 # applied in style.
+style_specs = {
+    'title1': {
+        'bold': True,
+        'font_color': blue3,
+        'border': 0,
+        'top': 0,
+        'bottom': 0,
+        'left': 0,
+        'right': 0,
+        'bg_color': white
+    },
+    'title2': {
+        'bold': True,
+        'font_color': black,
+        'border': 0,
+        'top': 0,
+        'bottom': 0,
+        'left': 0,
+        'right': 0,
+        'bg_color': white
+    },
+    'table_title': {
+        'bold': True,
+        'bg_color': blue3,
+        'font_color': white,
+        'border': 0,
+        'text_wrap': True
+    },
+    'table_title_dec': {
+        'bold': True,
+        'bg_color': blue3,
+        'font_color': white,
+        'border': 0,
+        'text_wrap': True,
+        'num_format': '#0.##'
+    },
+    'table_title_whole': {
+        'bold': True,
+        'bg_color': blue3,
+        'font_color': white,
+        'border': 0,
+        'text_wrap': True,
+        'num_format': '#0'
+    },
+    'header': {
+        'font_color': blue3,
+        'bg_color': white,
+        'bold': True,
+        'border': 0,
+        'bottom': 1,
+        'bottom_color': blue3
+    },
+    'headerwrap': {
+        'font_color': blue3,
+        'bg_color': white,
+        'bold': True,
+        'border': 0,
+        'bottom': 1,
+        'bottom_color': blue3,
+        'text_wrap': True
+    },
+    'headerwrap_num': {
+        'font_color': blue3,
+        'bg_color': white,
+        'bold': True,
+        'border': 0,
+        'bottom': 1,
+        'bottom_color': blue3,
+        'text_wrap': True,
+        'align': 'right'
+    },
+    'headerwrap_group': {
+        'font_color': blue3,
+        'bg_color': white,
+        'bold': True,
+        'border': 1,
+        'bottom': 1,
+        'border_color': blue3,
+        'text_wrap': True,
+        'align': 'center'
+    },
+    'header_num': {
+        'font_color': blue3,
+        'bg_color': white,
+        'bold': True,
+        'border': 0,
+        'bottom': 1,
+        'bottom_color': blue3,
+        'align': 'right'
+    },
+    'header_center': {
+        'font_color': blue3,
+        'bg_color': white,
+        'bold': True,
+        'border': 0,
+        'bottom': 1,
+        'bottom_color': blue3,
+        'align': 'center'
+    },
+    'table_body': {
+        'bold': False,
+        'font_color': black,
+        'bg_color': grey4,
+        'border': 0,
+        'bottom': 1,
+        'top': 1,
+        'bottom_color': grey2,
+        'top_color': grey2,
+        'num_format': '#,###'
+    },
+    'table_body_center': {
+        'bold': False,
+        'font_color': black,
+        'bg_color': grey4,
+        'border': 0,
+        'bottom': 1,
+        'top': 1,
+        'bottom_color': grey2,
+        'top_color': grey2,
+        'align': 'center'
+    },
+    'table_body_na': {
+        'bold': False,
+        'font_color': black,
+        'bg_color': grey3,
+        'border': 1,
+        'bottom': 1,
+        'top': 1,
+        'left': 1,
+        'right': 1,
+        'bottom_color': grey2,
+        'top_color': grey2,
+        'left_color': grey2,
+        'right_color': grey2
+    },
+    'table_body_date': {
+        'bold': False,
+        'font_color': black,
+        'bg_color': grey4,
+        'border': 0,
+        'bottom': 1,
+        'top': 1,
+        'bottom_color': grey2,
+        'top_color': grey2,
+        'num_format': 'mmmm-yy'
+    },
+    'table_body_date2': {
+        'bold': False,
+        'font_color': black,
+        'bg_color': grey4,
+        'border': 0,
+        'bottom': 1,
+        'top': 1,
+        'bottom_color': grey2,
+        'top_color': grey2,
+        'num_format': 'mm/dd/yyyy',
+        'align': 'center'
+    },
+    'current_score': {
+        'bold': False,
+        'font_color': black,
+        'bg_color': blue4,
+        'border': 1,
+        'border_color': blue3,
+        'num_format': '#0%'
+    },
+    'table_body_green': {
+        'bold': False,
+        'font_color': black,
+        'bg_color': green2,
+        'border': 0,
+        'bottom': 1,
+        'top': 1,
+        'bottom_color': grey2,
+        'top_color': grey2
+    },
+    'table_body_yellow': {
+        'bold': False,
+        'font_color': black,
+        'bg_color': yellow1,
+        'border': 0,
+        'bottom': 1,
+        'top': 1,
+        'bottom_color': grey2,
+        'top_color': grey2
+    },
+    'table_body_orange': {
+        'bold': False,
+        'font_color': black,
+        'bg_color': orange2,
+        'border': 0,
+        'bottom': 1,
+        'top': 1,
+        'bottom_color': grey2,
+        'top_color': grey2
+    },
+    'table_body_red': {
+        'bold': False,
+        'font_color': black,
+        'bg_color': red2,
+        'border': 0,
+        'bottom': 1,
+        'top': 1,
+        'bottom_color': grey2,
+        'top_color': grey2
+    },
+    'table_body_num': {
+        'bold': False,
+        'font_color': black,
+        'bg_color': grey4,
+        'border': 0,
+        'bottom': 1,
+        'top': 1,
+        'bottom_color': grey2,
+        'top_color': grey2,
+        'align': 'right'
+    },
+    'table_body_num2': {
+        'bold': False,
+        'font_color': black,
+        'bg_color': grey4,
+        'border': 0,
+        'bottom': 1,
+        'top': 1,
+        'bottom_color': grey2,
+        'top_color': grey2,
+        'align': 'right',
+        'num_format': '#0.##'
+    },
+    'table_body_pct': {
+        'bold': False,
+        'font_color': black,
+        'bg_color': grey4,
+        'border': 0,
+        'bottom': 1,
+        'top': 1,
+        'bottom_color': grey2,
+        'top_color': grey2,
+        'num_format': '#0%',
+        'align': 'right'
+    },
+    'table_body_pct_red': {
+        'bold': False,
+        'font_color': black,
+        'bg_color': red2,
+        'border': 0,
+        'bottom': 1,
+        'top': 1,
+        'bottom_color': grey2,
+        'top_color': grey2,
+        'num_format': '#0%',
+        'align': 'right'
+    },
+    'table_body_pct_yellow': {
+        'bold': False,
+        'font_color': black,
+        'bg_color': yellow1,
+        'border': 0,
+        'bottom': 1,
+        'top': 1,
+        'bottom_color': grey2,
+        'top_color': grey2,
+        'num_format': '#0%',
+        'align': 'right'
+    },
+    'table_body_pct_orange': {
+        'bold': False,
+        'font_color': black,
+        'bg_color': orange2,
+        'border': 0,
+        'bottom': 1,
+        'top': 1,
+        'bottom_color': grey2,
+        'top_color': grey2,
+        'num_format': '#0%',
+        'align': 'right'
+    },
+    'table_body_pct_green': {
+        'bold': False,
+        'font_color': black,
+        'bg_color': green2,
+        'border': 0,
+        'bottom': 1,
+        'top': 1,
+        'bottom_color': grey2,
+        'top_color': grey2,
+        'num_format': '#0%',
+        'align': 'right'
+    },
+    'table_body_dollar': {
+        'bold': False,
+        'font_color': black,
+        'bg_color': grey4,
+        'border': 0,
+        'bottom': 1,
+        'top': 1,
+        'bottom_color': grey2,
+        'top_color': grey2,
+        'num_format': '$#,##0.00'
+    },
+    'table_body_dollar_red': {
+        'bold': False,
+        'font_color': black,
+        'bg_color': red2,
+        'border': 0,
+        'bottom': 1,
+        'top': 1,
+        'bottom_color': grey2,
+        'top_color': grey2,
+        'num_format': '$#,##0.00'
+    },
+    'table_body_dollar_orange': {
+        'bold': False,
+        'font_color': black,
+        'bg_color': orange2,
+        'border': 0,
+        'bottom': 1,
+        'top': 1,
+        'bottom_color': grey2,
+        'top_color': grey2,
+        'num_format': '$#,##0.00'
+    },
+    'table_body_dollar_green': {
+        'bold': False,
+        'font_color': black,
+        'bg_color': green2,
+        'border': 0,
+        'bottom': 1,
+        'top': 1,
+        'bottom_color': grey2,
+        'top_color': grey2,
+        'num_format': '$#,##0.00'
+    },
+    'table_body_dollar_yellow': {
+        'bold': False,
+        'font_color': black,
+        'bg_color': yellow1,
+        'border': 0,
+        'bottom': 1,
+        'top': 1,
+        'bottom_color': grey2,
+        'top_color': grey2,
+        'num_format': '$#,##0.00'
+    },
+    'table_body_pct2': {
+        'bold': False,
+        'font_color': black,
+        'bg_color': grey4,
+        'border': 0,
+        'bottom': 1,
+        'top': 1,
+        'bottom_color': grey2,
+        'top_color': grey2,
+        'num_format': '#0.##%',
+        'align': 'right'
+    },
+    'table_body_pct2_red': {
+        'bold': False,
+        'font_color': black,
+        'bg_color': red2,
+        'border': 0,
+        'bottom': 1,
+        'top': 1,
+        'bottom_color': grey2,
+        'top_color': grey2,
+        'num_format': '#0.##%',
+        'align': 'right'
+    },
+    'table_body_pct2_yellow': {
+        'bold': False,
+        'font_color': black,
+        'bg_color': yellow1,
+        'border': 0,
+        'bottom': 1,
+        'top': 1,
+        'bottom_color': grey2,
+        'top_color': grey2,
+        'num_format': '#0.##%',
+        'align': 'right'
+    },
+    'table_body_pct2_orange': {
+        'bold': False,
+        'font_color': black,
+        'bg_color': orange2,
+        'border': 0,
+        'bottom': 1,
+        'top': 1,
+        'bottom_color': grey2,
+        'top_color': grey2,
+        'num_format': '#0.##%',
+        'align': 'right'
+    },
+    'table_body_pct2_green': {
+        'bold': False,
+        'font_color': black,
+        'bg_color': green2,
+        'border': 0,
+        'bottom': 1,
+        'top': 1,
+        'bottom_color': grey2,
+        'top_color': grey2,
+        'num_format': '#0.##%',
+        'align': 'right'
+    }
+}
+
+
+# A workbook's report styles. A format is added to the workbook the first time
+# it is asked for, by name (styles['header']) or as an attribute
+# (styles.header), so a report only creates the formats it uses. Each workbook
+# has its own registry and no module state is changed, so several workbooks
+# can be built at the same time in one process.
+class Styles(object):
+
+    def __init__(self, workbook):
+        self.workbook = workbook
+        self.formats = {}
+        workbook.formats[0].set_font_size(11)
+        workbook.formats[0].set_bg_color(white)
+        workbook.formats[0].set_border(0)
+        workbook.formats[0].set_font_color(grey1)
+        workbook.formats[0].set_text_wrap()
+
+    def __getitem__(self, name):
+        if name not in self.formats:
+            self.formats[name] = self.workbook.add_format(style_specs[name])
+        return self.formats[name]
+
+    def __getattr__(self, name):
+        if name in style_specs:
+            return self[name]
+        raise AttributeError(name)
+
+
+# This function returns the style registry of an xlsxwriter workbook. Every
+# writer is given its workbook's registry with styles=, so any number of
+# workbooks can be built at once.
 def highmark_styles(workbook):
+    return Styles(workbook)
+
+
+# This function returns the styles a writer was given. There is no module-wide
+# default, a writer called without styles= raises rather than writing with
+# another workbook's formats.
+def bound_styles(styles=None):
+    if styles is None:
+        raise ValueError(
+            "No styles were given, pass styles=highmark_styles(workbook)")
+    return styles
+
 
-    workbook.formats[0].set_font_size(11)
-    workbook.formats[0].set_bg_color(white)
-    workbook.formats[0].set_border(0)
-    workbook.formats[0].set_font_color(grey1)
-    workbook.formats[0].set_text_wrap()
-
-    global title1
-    title1 = workbook.add_format()
-    title1.set_bold(True)
-    title1.set_font_color(blue3)
-    title1.set_border(0)
-    title1.set_top(0)
-    title1.set_bottom(0)
-    title1.set_left(0)
-    title1.set_right(0)
-    title1.set_bg_color(white)
-
-    global title2
-    title2 = workbook.add_format()
-    title2.set_bold(True)
-    title2.set_font_color(black)
-    title2.set_border(0)
-    title2.set_top(0)
-    title2.set_bottom(0)
-    title2.set_left(0)
-    title2.set_right(0)
-    title2.set_bg_color(white)
-
-    global table_title
-    table_title = workbook.add_format()
-    table_title.set_bold(True)
-    table_title.set_bg_color(blue3)
-    table_title.set_font_color(white)
-    table_title.set_border(0)
-    table_title.set_text_wrap(True)
-
-    global table_title_dec
-    table_title_dec = workbook.add_format()
-    table_title_dec.set_bold(True)
-    table_title_dec.set_bg_color(blue3)
-    table_title_dec.set_font_color(white)
-    table_title_dec.set_border(0)
-    table_title_dec.set_text_wrap(True)
-    table_title_dec.set_num_format('#0.##')
-
-    global table_title_whole
-    table_title_whole = workbook.add_format()
-    table_title_whole.set_bold(True)
-    table_title_whole.set_bg_color(blue3)
-    table_title_whole.set_font_color(white)
-    table_title_whole.set_border(0)
-    table_title_whole.set_text_wrap(True)
-    table_title_whole.set_num_format('#0')
-
-    global header
-    header = workbook.add_format()
-    header.set_font_color(blue3)
-    header.set_bg_color(white)
-    header.set_bold(True)
-    header.set_border(0)
-    header.set_bottom(1)
-    header.set_bottom_color(blue3)
-
-    global headerwrap
-    headerwrap = workbook.add_format()
-    headerwrap.set_font_color(blue3)
-    headerwrap.set_bg_color(white)
-    headerwrap.set_bold(True)
-    headerwrap.set_border(0)
-    headerwrap.set_bottom(1)
-    headerwrap.set_bottom_color(blue3)
-    headerwrap.set_text_wrap(True)
-
-    global headerwrap_num
-    headerwrap_num = workbook.add_format()
-    headerwrap_num.set_font_color(blue3)
-    headerwrap_num.set_bg_color(white)
-    headerwrap_num.set_bold(True)
-    headerwrap_num.set_border(0)
-    headerwrap_num.set_bottom(1)
-    headerwrap_num.set_bottom_color(blue3)
-    headerwrap_num.set_text_wrap(True)
-    headerwrap_num.set_align('right')
-
-    global headerwrap_group
-    headerwrap_group = workbook.add_format()
-    headerwrap_group.set_font_color(blue3)
-    headerwrap_group.set_bg_color(white)
-    headerwrap_group.set_bold(True)
-    headerwrap_group.set_border(1)
-    headerwrap_group.set_bottom(1)
-    headerwrap_group.set_border_color(blue3)
-    headerwrap_group.set_text_wrap(True)
-    headerwrap_group.set_align('center')
-
-    global header_num
-    header_num = workbook.add_format()
-    header_num.set_font_color(blue3)
-    header_num.set_bg_color(white)
-    header_num.set_bold(True)
-    header_num.set_border(0)
-    header_num.set_bottom(1)
-    header_num.set_bottom_color(blue3)
-    header_num.set_align('right')
-
-    global header_center
-    header_center = workbook.add_format()
-    header_center.set_font_color(blue3)
-    header_center.set_bg_color(white)
-    header_center.set_bold(True)
-    header_center.set_border(0)
-    header_center.set_bottom(1)
-    header_center.set_bottom_color(blue3)
-    header_center.set_align('center')
-
-    global table_body
-    table_body = workbook.add_format()
-    table_body.set_bold(False)
-    table_body.set_font_color(black)
-    table_body.set_bg_color(grey4)
-    table_body.set_border(0)
-    table_body.set_bottom(1)
-    table_body.set_top(1)
-    table_body.set_bottom_color(grey2)
-    table_body.set_top_color(grey2)
-    table_body.set_num_format('#,###')
-
-    global table_body_center
-    table_body_center = workbook.add_format()
-    table_body_center.set_bold(False)
-    table_body_center.set_font_color(black)
-    table_body_center.set_bg_color(grey4)
-    table_body_center.set_border(0)
-    table_body_center.set_bottom(1)
-    table_body_center.set_top(1)
-    table_body_center.set_bottom_color(grey2)
-    table_body_center.set_top_color(grey2)
-    table_body_center.set_align('center')
-
-    global table_body_na
-    table_body_na = workbook.add_format()
-    table_body_na.set_bold(False)
-    table_body_na.set_font_color(black)
-    table_body_na.set_bg_color(grey3)
-    table_body_na.set_border(1)
-    table_body_na.set_bottom(1)
-    table_body_na.set_top(1)
-    table_body_na.set_left(1)
-    table_body_na.set_right(1)
-    table_body_na.set_bottom_color(grey2)
-    table_body_na.set_top_color(grey2)
-    table_body_na.set_left_color(grey2)
-    table_body_na.set_right_color(grey2)
-
-    global table_body_date
-    table_body_date = workbook.add_format()
-    table_body_date.set_bold(False)
-    table_body_date.set_font_color(black)
-    table_body_date.set_bg_color(grey4)
-    table_body_date.set_border(0)
-    table_body_date.set_bottom(1)
-    table_body_date.set_top(1)
-    table_body_date.set_bottom_color(grey2)
-    table_body_date.set_top_color(grey2)
-    table_body_date.set_num_format('mmmm-yy')
-
-    global table_body_date2
-    table_body_date2 = workbook.add_format()
-    table_body_date2.set_bold(False)
-    table_body_date2.set_font_color(black)
-    table_body_date2.set_bg_color(grey4)
-    table_body_date2.set_border(0)
-    table_body_date2.set_bottom(1)
-    table_body_date2.set_top(1)
-    table_body_date2.set_bottom_color(grey2)
-    table_body_date2.set_top_color(grey2)
-    table_body_date2.set_num_format('mm/dd/yyyy')
-    table_body_date2.set_align('center')
-
-    global current_score
-    current_score = workbook.add_format()
-    current_score.set_bold(False)
-    current_score.set_font_color(black)
-    current_score.set_bg_color(blue4)
-    current_score.set_border(1)
-    current_score.set_border_color(blue3)
-    current_score.set_num_format('#0%')
-
-    global table_body_green
-    table_body_green = workbook.add_format()
-    table_body_green.set_bold(False)
-    table_body_green.set_font_color(black)
-    table_body_green.set_bg_color(green2)
-    table_body_green.set_border(0)
-    table_body_green.set_bottom(1)
-    table_body_green.set_top(1)
-    table_body_green.set_bottom_color(grey2)
-    table_body_green.set_top_color(grey2)
-
-    global table_body_yellow
-    table_body_yellow = workbook.add_format()
-    table_body_yellow.set_bold(False)
-    table_body_yellow.set_font_color(black)
-    table_body_yellow.set_bg_color(yellow1)
-    table_body_yellow.set_border(0)
-    table_body_yellow.set_bottom(1)
-    table_body_yellow.set_top(1)
-    table_body_yellow.set_bottom_color(grey2)
-    table_body_yellow.set_top_color(grey2)
-
-    global table_body_orange
-    table_body_orange = workbook.add_format()
-    table_body_orange.set_bold(False)
-    table_body_orange.set_font_color(black)
-    table_body_orange.set_bg_color(orange2)
-    table_body_orange.set_border(0)
-    table_body_orange.set_bottom(1)
-    table_body_orange.set_top(1)
-    table_body_orange.set_bottom_color(grey2)
-    table_body_orange.set_top_color(grey2)
-
-    global table_body_red
-    table_body_red = workbook.add_format()
-    table_body_red.set_bold(False)
-    table_body_red.set_font_color(black)
-    table_body_red.set_bg_color(red2)
-    table_body_red.set_border(0)
-    table_body_red.set_bottom(1)
-    table_body_red.set_top(1)
-    table_body_red.set_bottom_color(grey2)
-    table_body_red.set_top_color(grey2)
-
-    global table_body_num
-    table_body_num = workbook.add_format()
-    table_body_num.set_bold(False)
-    table_body_num.set_font_color(black)
-    table_body_num.set_bg_color(grey4)
-    table_body_num.set_border(0)
-    table_body_num.set_bottom(1)
-    table_body_num.set_top(1)
-    table_body_num.set_bottom_color(grey2)
-    table_body_num.set_top_color(grey2)
-    table_body_num.set_align('right')
-
-    global table_body_num2
-    table_body_num2 = workbook.add_format()
-    table_body_num2.set_bold(False)
-    table_body_num2.set_font_color(black)
-    table_body_num2.set_bg_color(grey4)
-    table_body_num2.set_border(0)
-    table_body_num2.set_bottom(1)
-    table_body_num2.set_top(1)
-    table_body_num2.set_bottom_color(grey2)
-    table_body_num2.set_top_color(grey2)
-    table_body_num2.set_align('right')
-    table_body_num2.set_num_format('#0.##')
-
-    global table_body_pct
-    table_body_pct = workbook.add_format()
-    table_body_pct.set_bold(False)
-    table_body_pct.set_font_color(black)
-    table_body_pct.set_bg_color(grey4)
-    table_body_pct.set_border(0)
-    table_body_pct.set_bottom(1)
-    table_body_pct.set_top(1)
-    table_body_pct.set_bottom_color(grey2)
-    table_body_pct.set_top_color(grey2)
-    table_body_pct.set_num_format('#0%')
-    table_body_pct.set_align('right')
-
-    global table_body_pct_red
-    table_body_pct_red = workbook.add_format()
-    table_body_pct_red.set_bold(False)
-    table_body_pct_red.set_font_color(black)
-    table_body_pct_red.set_bg_color(red2)
-    table_body_pct_red.set_border(0)
-    table_body_pct_red.set_bottom(1)
-    table_body_pct_red.set_top(1)
-    table_body_pct_red.set_bottom_color(grey2)
-    table_body_pct_red.set_top_color(grey2)
-    table_body_pct_red.set_num_format('#0%')
-    table_body_pct_red.set_align('right')
-
-    global table_body_pct_yellow
-    table_body_pct_yellow = workbook.add_format()
-    table_body_pct_yellow.set_bold(False)
-    table_body_pct_yellow.set_font_color(black)
-    table_body_pct_yellow.set_bg_color(yellow1)
-    table_body_pct_yellow.set_border(0)
-    table_body_pct_yellow.set_bottom(1)
-    table_body_pct_yellow.set_top(1)
-    table_body_pct_yellow.set_bottom_color(grey2)
-    table_body_pct_yellow.set_top_color(grey2)
-    table_body_pct_yellow.set_num_format('#0%')
-    table_body_pct_yellow.set_align('right')
-
-    global table_body_pct_orange
-    table_body_pct_orange = workbook.add_format()
-    table_body_pct_orange.set_bold(False)
-    table_body_pct_orange.set_font_color(black)
-    table_body_pct_orange.set_bg_color(orange2)
-    table_body_pct_orange.set_border(0)
-    table_body_pct_orange.set_bottom(1)
-    table_body_pct_orange.set_top(1)
-    table_body_pct_orange.set_bottom_color(grey2)
-    table_body_pct_orange.set_top_color(grey2)
-    table_body_pct_orange.set_num_format('#0%')
-    table_body_pct_orange.set_align('right')
-
-    global table_body_pct_green
-    table_body_pct_green = workbook.add_format()
-    table_body_pct_green.set_bold(False)
-    table_body_pct_green.set_font_color(black)
-    table_body_pct_green.set_bg_color(green2)
-    table_body_pct_green.set_border(0)
-    table_body_pct_green.set_bottom(1)
-    table_body_pct_green.set_top(1)
-    table_body_pct_green.set_bottom_color(grey2)
-    table_body_pct_green.set_top_color(grey2)
-    table_body_pct_green.set_num_format('#0%')
-    table_body_pct_green.set_align('right')
-
-    global table_body_dollar
-    table_body_dollar = workbook.add_format()
-    table_body_dollar.set_bold(False)
-    table_body_dollar.set_font_color(black)
-    table_body_dollar.set_bg_color(grey4)
-    table_body_dollar.set_border(0)
-    table_body_dollar.set_bottom(1)
-    table_body_dollar.set_top(1)
-    table_body_dollar.set_bottom_color(grey2)
-    table_body_dollar.set_top_color(grey2)
-    table_body_dollar.set_num_format('$#,##0.00')
-
-    global table_body_dollar_red
-    table_body_dollar_red = workbook.add_format()
-    table_body_dollar_red.set_bold(False)
-    table_body_dollar_red.set_font_color(black)
-    table_body_dollar_red.set_bg_color(red2)
-    table_body_dollar_red.set_border(0)
-    table_body_dollar_red.set_bottom(1)
-    table_body_dollar_red.set_top(1)
-    table_body_dollar_red.set_bottom_color(grey2)
-    table_body_dollar_red.set_top_color(grey2)
-    table_body_dollar_red.set_num_format('$#,##0.00')
-
-    global table_body_dollar_orange
-    table_body_dollar_orange = workbook.add_format()
-    table_body_dollar_orange.set_bold(False)
-    table_body_dollar_orange.set_font_color(black)
-    table_body_dollar_orange.set_bg_color(orange2)
-    table_body_dollar_orange.set_border(0)
-    table_body_dollar_orange.set_bottom(1)
-    table_body_dollar_orange.set_top(1)
-    table_body_dollar_orange.set_bottom_color(grey2)
-    table_body_dollar_orange.set_top_color(grey2)
-    table_body_dollar_orange.set_num_format('$#,##0.00')
-
-    global table_body_dollar_green
-    table_body_dollar_green = workbook.add_format()
-    table_body_dollar_green.set_bold(False)
-    table_body_dollar_green.set_font_color(black)
-    table_body_dollar_green.set_bg_color(green2)
-    table_body_dollar_green.set_border(0)
-    table_body_dollar_green.set_bottom(1)
-    table_body_dollar_green.set_top(1)
-    table_body_dollar_green.set_bottom_color(grey2)
-    table_body_dollar_green.set_top_color(grey2)
-    table_body_dollar_green.set_num_format('$#,##0.00')
-
-    global table_body_dollar_yellow
-    table_body_dollar_yellow = workbook.add_format()
-    table_body_dollar_yellow.set_bold(False)
-    table_body_dollar_yellow.set_font_color(black)
-    table_body_dollar_yellow.set_bg_color(yellow1)
-    table_body_dollar_yellow.set_border(0)
-    table_body_dollar_yellow.set_bottom(1)
-    table_body_dollar_yellow.set_top(1)
-    table_body_dollar_yellow.set_bottom_color(grey2)
-    table_body_dollar_yellow.set_top_color(grey2)
-    table_body_dollar_yellow.set_num_format('$#,##0.00')
-
-    global table_body_pct2
-    table_body_pct2 = workbook.add_format()
-    table_body_pct2.set_bold(False)
-    table_body_pct2.set_font_color(black)
-    table_body_pct2.set_bg_color(grey4)
-    table_body_pct2.set_border(0)
-    table_body_pct2.set_bottom(1)
-    table_body_pct2.set_top(1)
-    table_body_pct2.set_bottom_color(grey2)
-    table_body_pct2.set_top_color(grey2)
-    table_body_pct2.set_num_format('#0.##%')
-    table_body_pct2.set_align('right')
-
-    global table_body_pct2_red
-    table_body_pct2_red = workbook.add_format()
-    table_body_pct2_red.set_bold(False)
-    table_body_pct2_red.set_font_color(black)
-    table_body_pct2_red.set_bg_color(red2)
-    table_body_pct2_red.set_border(0)
-    table_body_pct2_red.set_bottom(1)
-    table_body_pct2_red.set_top(1)
-    table_body_pct2_red.set_bottom_color(grey2)
-    table_body_pct2_red.set_top_color(grey2)
-    table_body_pct2_red.set_num_format('#0.##%')
-    table_body_pct2_red.set_align('right')
-
-    global table_body_pct2_yellow
-    table_body_pct2_yellow = workbook.add_format()
-    table_body_pct2_yellow.set_bold(False)
-    table_body_pct2_yellow.set_font_color(black)
-    table_body_pct2_yellow.set_bg_color(yellow1)
-    table_body_pct2_yellow.set_border(0)
-    table_body_pct2_yellow.set_bottom(1)
-    table_body_pct2_yellow.set_top(1)
-    table_body_pct2_yellow.set_bottom_color(grey2)
-    table_body_pct2_yellow.set_top_color(grey2)
-    table_body_pct2_yellow.set_num_format('#0.##%')
-    table_body_pct2_yellow.set_align('right')
-
-    global table_body_pct2_orange
-    table_body_pct2_orange = workbook.add_format()
-    table_body_pct2_orange.set_bold(False)
-    table_body_pct2_orange.set_font_color(black)
-    table_body_pct2_orange.set_bg_color(orange2)
-    table_body_pct2_orange.set_border(0)
-    table_body_pct2_orange.set_bottom(1)
-    table_body_pct2_orange.set_top(1)
-    table_body_pct2_orange.set_bottom_color(grey2)
-    table_body_pct2_orange.set_top_color(grey2)
-    table_body_pct2_orange.set_num_format('#0.##%')
-    table_body_pct2_orange.set_align('right')
-
-    global table_body_pct2_green
-    table_body_pct2_green = workbook.add_format()
-    table_body_pct2_green.set_bold(False)
-    table_body_pct2_green.set_font_color(black)
-    table_body_pct2_green.set_bg_color(green2)
-    table_body_pct2_green.set_border(0)
-    table_body_pct2_green.set_bottom(1)
-    table_body_pct2_green.set_top(1)
-    table_body_pct2_green.set_bottom_color(grey2)
-    table_body_pct2_green.set_top_color(grey2)
-    table_body_pct2_green.set_num_format('#0.##%')
-    table_body_pct2_green.set_align('right')
-
-
-def legend(worksheet, startrow=1, startcol=9):
+def legend(worksheet, startrow=1, startcol=9, styles=None):
+    styles = bound_styles(styles)
     worksheet.merge_range(
         startrow,
         startcol,
         startrow,
         startcol + 1,
         "Legend:",
-        table_title)
-    worksheet.write(startrow + 1, startcol, " ", table_body_green)
-    worksheet.write(startrow + 2, startcol, " ", table_body_yellow)
-    worksheet.write(startrow + 3, startcol, " ", table_body_orange)
-    worksheet.write(startrow + 4, startcol, " ", table_body_red)
-    worksheet.write(startrow + 1, startcol + 1, "Max", table_body)
-    worksheet.write(startrow + 2, startcol + 1, "Mid", table_body)
-    worksheet.write(startrow + 3, startcol + 1, "Min", table_body)
-    worksheet.write(startrow + 4, startcol + 1, "Zero", table_body)
+        styles.table_title)
+    worksheet.write(startrow + 1, startcol, " ", styles.table_body_green)
+    worksheet.write(startrow + 2, startcol, " ", styles.table_body_yellow)
+    worksheet.write(startrow + 3, startcol, " ", styles.table_body_orange)
+    worksheet.write(startrow + 4, startcol, " ", styles.table_body_red)
+    worksheet.write(startrow + 1, startcol + 1, "Max", styles.table_body)
+    worksheet.write(startrow + 2, startcol + 1, "Mid", styles.table_body)
+    worksheet.write(startrow + 3, startcol + 1, "Min", styles.table_body)
+    worksheet.write(startrow + 4, startcol + 1, "Zero", styles.table_body)
 
 
 def epitables(
@@ -1111,7 +2252,9 @@ def epitables(
         PNEUScoring_Flag,
         MBPScoring_Flag,
         SFUSScoring_Flag,
-        STROKEScoring_Flag):
+        STROKEScoring_Flag,
+        styles=None):
+    styles = bound_styles(styles)
     print("************************worksheet.merge_range( IN DEF EPITABLES********************************************")
     print("************************worksheet.merge_range( IN DEF EPITABLES********************************************")
     print("************************worksheet.merge_range( IN DEF EPITABLES********************************************")
@@ -1121,19 +2264,19 @@ def epitables(
         startrow,
         14,
         'EPISODES OF CARE',
-        table_title)
-    worksheet.merge_range(startrow + 1, 0, startrow + 1, 3, "Episode", header)
-    worksheet.write(startrow + 1, 4, 'Available', header_num)
-    worksheet.write(startrow + 1, 5, 'Earned', header_center)
-    worksheet.write(startrow + 1, 6, 'Percentile', header_center)
-    worksheet.merge_range(startrow + 1, 7, startrow + 1, 8, 'Improvement', header_num)
-    worksheet.merge_range(startrow + 1,9,startrow + 1,10,'Point Weight',header_num)
-    worksheet.merge_range(startrow + 1,11,startrow + 1,12,'Tot Qualified $',header_num)
-    worksheet.merge_range(startrow + 1,13,startrow + 1,14,'Percent Spend',header_num)
-    worksheet.merge_range(startrow, 16,startrow,25,'THRESHOLDS',table_title)
-    worksheet.merge_range(startrow + 1,16,startrow + 1,17,'100% Points (Max)',header_num)
-    worksheet.merge_range(startrow + 1,18,startrow + 1,21,'75% Points (Mid)',header_num)
-    worksheet.merge_range(startrow + 1,22,startrow + 1,25,'25-75% Points (Min)',header_num)
+        styles.table_title)
+    worksheet.merge_range(startrow + 1, 0, startrow + 1, 3, "Episode", styles.header)
+    worksheet.write(startrow + 1, 4, 'Available', styles.header_num)
+    worksheet.write(startrow + 1, 5, 'Earned', styles.header_center)
+    worksheet.write(startrow + 1, 6, 'Percentile', styles.header_center)
+    worksheet.merge_range(startrow + 1, 7, startrow + 1, 8, 'Improvement', styles.header_num)
+    worksheet.merge_range(startrow + 1,9,startrow + 1,10,'Point Weight',styles.header_num)
+    worksheet.merge_range(startrow + 1,11,startrow + 1,12,'Tot Qualified $',styles.header_num)
+    worksheet.merge_range(startrow + 1,13,startrow + 1,14,'Percent Spend',styles.header_num)
+    worksheet.merge_range(startrow, 16,startrow,25,'THRESHOLDS',styles.table_title)
+    worksheet.merge_range(startrow + 1,16,startrow + 1,17,'100% Points (Max)',styles.header_num)
+    worksheet.merge_range(startrow + 1,18,startrow + 1,21,'75% Points (Mid)',styles.header_num)
+    worksheet.merge_range(startrow + 1,22,startrow + 1,25,'25-75% Points (Min)',styles.header_num)
     #worksheet.merge_range(startrow + 2,16,startrow + 2,17,'=75th Percentile',header_num)
     #worksheet.merge_range(startrow + 2,18,startrow + 2,19,'=4% Improvement',header_num)
     #worksheet.merge_range(startrow + 2,20,startrow + 2,21,'=0.5% Improvement',header_num)
@@ -1157,53 +2300,53 @@ def epitables(
             row,
             3,
             epibenchmarks[measure_cd]['title'],
-            table_body)
-        worksheet.write(row, 4, points, table_body)
+            styles.table_body)
+        worksheet.write(row, 4, points, styles.table_body)
         if points != 0 and earned == 0:
-            worksheet.write(row, 5, earned, table_body_red)
+            worksheet.write(row, 5, earned, styles.table_body_red)
         if earned != 0 or points == 0:
-            worksheet.write(row, 5, earned, table_body)
-        worksheet.write(row, 6, math.floor(pctl * 100), table_body)
+            worksheet.write(row, 5, earned, styles.table_body)
+        worksheet.write(row, 6, math.floor(pctl * 100), styles.table_body)
         if scoring_flag == 'Not Qualified':
-            worksheet.merge_range(row, 4, row, 6, 'Not Qualified', table_body)
+            worksheet.merge_range(row, 4, row, 6, 'Not Qualified', styles.table_body)
         if scoring_flag == ' ':
-            worksheet.merge_range(row, 4, row, 6, 'Not Qualified', table_body)
+            worksheet.merge_range(row, 4, row, 6, 'Not Qualified', styles.table_body)
         if scoring_flag == 'Profiled':
-            worksheet.merge_range(row, 4, row, 6, 'Profiled', table_body)
-        worksheet.merge_range(row, 7, row, 8, improvement, table_body_pct2)
-        worksheet.merge_range(row, 9, row, 10, ptweight, table_body_pct)
-        worksheet.merge_range(row, 11, row, 12, cost, table_body_dollar)
-        worksheet.merge_range(row, 13, row, 14, pctspend, table_body_pct2)
+            worksheet.merge_range(row, 4, row, 6, 'Profiled', styles.table_body)
+        worksheet.merge_range(row, 7, row, 8, improvement, styles.table_body_pct2)
+        worksheet.merge_range(row, 9, row, 10, ptweight, styles.table_body_pct)
+        worksheet.merge_range(row, 11, row, 12, cost, styles.table_body_dollar)
+        worksheet.merge_range(row, 13, row, 14, pctspend, styles.table_body_pct2)
         if earned == points and points != 0:
-            worksheet.merge_range(row,16,row,17,u'\u226575th Percentile',table_body_pct_green)
+            worksheet.merge_range(row,16,row,17,u'\u226575th Percentile',styles.table_body_pct_green)
             #worksheet.merge_range(row, 18, row, 19, str(points) + " Points", table_body_pct_green)
-            worksheet.write(row, 10, math.floor(pctl * 100), table_body_green)
+            worksheet.write(row, 10, math.floor(pctl * 100), styles.table_body_green)
         else:
-            worksheet.merge_range(row,16,row,17,u'\u226575th Percentile',table_body_pct)
+            worksheet.merge_range(row,16,row,17,u'\u226575th Percentile',styles.table_body_pct)
             #worksheet.merge_range(row,18,row,19,str(points) + " Points",table_body_pct)
         if earned == points * .75 and points != 0:
             if hospital_size == 'Large':
-                worksheet.merge_range(row,18,row,21,u'\u22652% Improvement',table_body_pct_yellow)
+                worksheet.merge_range(row,18,row,21,u'\u22652% Improvement',styles.table_body_pct_yellow)
             elif hospital_size == 'Medium':
-                worksheet.merge_range(row,18,row,21,u'\u22653% Improvement',table_body_pct_yellow)
+                worksheet.merge_range(row,18,row,21,u'\u22653% Improvement',styles.table_body_pct_yellow)
             else:
-                worksheet.merge_range(row,18,row,21,u'\u22654% Improvement',table_body_pct_yellow)
+                worksheet.merge_range(row,18,row,21,u'\u22654% Improvement',styles.table_body_pct_yellow)
             #worksheet.merge_range(row, 22, row, 23, str(points * .75) + " Points", table_body_pct_yellow)
-            worksheet.write(row, 12, improvement, table_body_pct2_yellow)
+            worksheet.write(row, 12, improvement, styles.table_body_pct2_yellow)
         else:
             if hospital_size == 'Large':
-        	  	  worksheet.merge_range(row,18,row,21,u'\u22652% Improvement',table_body_pct)
+        	  	  worksheet.merge_range(row,18,row,21,u'\u22652% Improvement',styles.table_body_pct)
             elif hospital_size == 'Medium':
-                worksheet.merge_range(row,18,row,21,u'\u22653% Improvement',table_body_pct_yellow)
+                worksheet.merge_range(row,18,row,21,u'\u22653% Improvement',styles.table_body_pct_yellow)
             else:
-        	  	  worksheet.merge_range(row,18,row,21,u'\u22654% Improvement',table_body_pct)
+        	  	  worksheet.merge_range(row,18,row,21,u'\u22654% Improvement',styles.table_body_pct)
             #worksheet.merge_range(row, 22, row, 23, str(points * .75) + " Points", table_body_pct)
         if earned == points * .5 and points != 0:
-            worksheet.merge_range(row,22,row,25,u'\u2265.5% Improvement',table_body_pct_orange)
+            worksheet.merge_range(row,22,row,25,u'\u2265.5% Improvement',styles.table_body_pct_orange)
             #worksheet.merge_range(row, 26, row, 27, str(points * .5) + " Points", table_body_pct_orange)
-            worksheet.write(row, 12, improvement, table_body_pct2_orange)
+            worksheet.write(row, 12, improvement, styles.table_body_pct2_orange)
         else:
-            worksheet.merge_range(row,22,row,25,u'\u2265.5% Improvement',table_body_pct)
+            worksheet.merge_range(row,22,row,25,u'\u2265.5% Improvement',styles.table_body_pct)
             #worksheet.merge_range(row, 26, row, 27, str(points * .5) + " Points", table_body_pct)
 
     epirow(
@@ -1333,11 +2476,11 @@ def epitables(
         startrow + 12,
         3,
         'TOTAL',
-        table_title)
-    worksheet.write(startrow + 12, 4, epi_available, table_title)
-    worksheet.write(startrow + 12, 5, epi_earned, table_title_dec)
-    worksheet.merge_range(startrow + 12, 6, startrow + 12, 14, '', table_title)
-    worksheet.merge_range(startrow + 12, 16, startrow + 12, 25, '', table_title)
+        styles.table_title)
+    worksheet.write(startrow + 12, 4, epi_available, styles.table_title)
+    worksheet.write(startrow + 12, 5, epi_earned, styles.table_title_dec)
+    worksheet.merge_range(startrow + 12, 6, startrow + 12, 14, '', styles.table_title)
+    worksheet.merge_range(startrow + 12, 16, startrow + 12, 25, '', styles.table_title)
 
 
 # FIXME - Rewrite to use itercols function
@@ -1350,7 +2493,9 @@ def qbtables(
         qb_points=0,
         qb_earned=0,
         score=True,
-        thresholds=True):
+        thresholds=True,
+        styles=None):
+    styles = bound_styles(styles)
 
     # If score
     print("************************IF SCORE IN DEF QBTABLES********************************************")
@@ -1363,35 +2508,35 @@ def qbtables(
             startrow,
             startcol + 3,
             'QUALITY BUNDLE',
-            table_title)
+            styles.table_title)
         worksheet.merge_range(
             startrow + 1,
             startcol,
             startrow + 1,
             2,
             "Measure",
-            header)
-        worksheet.write(startrow + 1, startcol + 3, 'Score', header_num)
+            styles.header)
+        worksheet.write(startrow + 1, startcol + 3, 'Score', styles.header_num)
         worksheet.merge_range(
             startrow + 2,
             startcol,
             startrow + 2,
             startcol + 2,
             'Star Rating',
-            table_body)
+            styles.table_body)
         worksheet.write(
             startrow + 2,
             startcol + 3,
             qb_star_rating,
-            table_body_num2)
+            styles.table_body_num2)
         worksheet.merge_range(
             startrow + 3,
             startcol,
             startrow + 3,
             startcol + 2,
             'POINTS EARNED',
-            table_title)
-        worksheet.write(startrow + 3, startcol + 3, qb_earned, table_title)
+            styles.table_title)
+        worksheet.write(startrow + 3, startcol + 3, qb_earned, styles.table_title)
     elif score == False:
         startcol = startcol - 5
 
@@ -1402,42 +2547,42 @@ def qbtables(
             startrow,
             startcol + 8,
             "THRESHOLDS",
-            table_title)
+            styles.table_title)
         worksheet.merge_range(
             startrow + 1,
             startcol + 5,
             startrow + 1,
             startcol + 6,
             "Points",
-            header)
+            styles.header)
         worksheet.merge_range(
             startrow + 1,
             startcol + 7,
             startrow + 1,
             startcol + 8,
             "Criteria",
-            header)
+            styles.header)
         if qb_earned == qbbenchmarks['bonus5']['points']:
             if score:
                 worksheet.write(
                     startrow + 2,
                     startcol + 3,
                     qb_star_rating,
-                    table_body_green)
+                    styles.table_body_green)
             worksheet.merge_range(
                 startrow + 2,
                 startcol + 5,
                 startrow + 2,
                 startcol + 6,
                 qbbenchmarks['bonus5']['title'],
-                table_body_green)
+                styles.table_body_green)
             worksheet.merge_range(startrow +
                                   2, startcol +
                                   7, startrow +
                                   2, startcol +
                                   8, u"\u2265" +
                                   str(qbbenchmarks['bonus5']['score']) +
-                                  " Stars", table_body_green)
+                                  " Stars", styles.table_body_green)
         else:
             worksheet.merge_range(
                 startrow + 2,
@@ -1445,35 +2590,35 @@ def qbtables(
                 startrow + 2,
                 startcol + 6,
                 qbbenchmarks['bonus5']['title'],
-                table_body)
+                styles.table_body)
             worksheet.merge_range(startrow +
                                   2, startcol +
                                   7, startrow +
                                   2, startcol +
                                   8, u"\u2265" +
                                   str(qbbenchmarks['bonus5']['score']) +
-                                  " Stars", table_body)
+                                  " Stars", styles.table_body)
         if qb_earned == qbbenchmarks['bonus2']['points']:
             if score:
                 worksheet.write(
                     startrow + 2,
                     startcol + 3,
                     qb_star_rating,
-                    table_body_green)
+                    styles.table_body_green)
             worksheet.merge_range(
                 startrow + 3,
                 startcol + 5,
                 startrow + 3,
                 startcol + 6,
                 qbbenchmarks['bonus2']['title'],
-                table_body_green)
+                styles.table_body_green)
             worksheet.merge_range(startrow +
                                   3, startcol +
                                   7, startrow +
                                   3, startcol +
                                   8, u"\u2265" +
                                   str(qbbenchmarks['bonus2']['score']) +
-                                  " Stars", table_body_green)
+                                  " Stars", styles.table_body_green)
         else:
             worksheet.merge_range(
                 startrow + 3,
@@ -1481,130 +2626,130 @@ def qbtables(
                 startrow + 3,
                 startcol + 6,
                 qbbenchmarks['bonus2']['title'],
-                table_body)
+                styles.table_body)
             worksheet.merge_range(startrow +
                                   3, startcol +
                                   7, startrow +
                                   3, startcol +
                                   8, u"\u2265" +
                                   str(qbbenchmarks['bonus2']['score']) +
-                                  " Stars", table_body)
+                                  " Stars", styles.table_body)
         if qb_earned == qbbenchmarks['max']['points']:
             if score:
                 worksheet.write(
                     startrow + 2,
                     3,
                     qb_star_rating,
-                    table_body_green)
+                    styles.table_body_green)
             worksheet.merge_range(startrow +
                                   4, startcol +
                                   5, startrow +
                                   4, startcol +
                                   6, str(qbbenchmarks['max']['points']) +
-                                  " Points", table_body_green)
+                                  " Points", styles.table_body_green)
             worksheet.merge_range(startrow +
                                   4, startcol +
                                   7, startrow +
                                   4, startcol +
                                   8, u"\u2265" +
                                   str(qbbenchmarks['max']['score']) +
-                                  " Stars", table_body_green)
+                                  " Stars", styles.table_body_green)
         else:
             worksheet.merge_range(startrow +
                                   4, startcol +
                                   5, startrow +
                                   4, startcol +
                                   6, str(qbbenchmarks['max']['points']) +
-                                  " Points", table_body)
+                                  " Points", styles.table_body)
             worksheet.merge_range(startrow +
                                   4, startcol +
                                   7, startrow +
                                   4, startcol +
                                   8, u"\u2265" +
                                   str(qbbenchmarks['max']['score']) +
-                                  " Stars", table_body)
+                                  " Stars", styles.table_body)
         if qb_earned == qbbenchmarks['mid']['points']:
             if score:
                 worksheet.write(
                     startrow + 2,
                     startcol + 3,
                     qb_star_rating,
-                    table_body_yellow)
+                    styles.table_body_yellow)
             worksheet.merge_range(startrow +
                                   5, startcol +
                                   5, startrow +
                                   5, startcol +
                                   6, str(qbbenchmarks['mid']['points']) +
-                                  " Points", table_body_yellow)
+                                  " Points", styles.table_body_yellow)
             worksheet.merge_range(startrow +
                                   5, startcol +
                                   7, startrow +
                                   5, startcol +
                                   8, u"\u2265" +
                                   str(qbbenchmarks['mid']['score']) +
-                                  " Stars", table_body_yellow)
+                                  " Stars", styles.table_body_yellow)
         else:
             worksheet.merge_range(startrow +
                                   5, startcol +
                                   5, startrow +
                                   5, startcol +
                                   6, str(qbbenchmarks['mid']['points']) +
-                                  " Points", table_body)
+                                  " Points", styles.table_body)
             worksheet.merge_range(startrow +
                                   5, startcol +
                                   7, startrow +
                                   5, startcol +
                                   8, u"\u2265" +
                                   str(qbbenchmarks['mid']['score']) +
-                                  " Stars", table_body)
+                                  " Stars", styles.table_body)
         if qb_earned == qbbenchmarks['min']['points']:
             if score:
                 worksheet.write(
                     startrow + 2,
                     startcol + 3,
                     qb_star_rating,
-                    table_body_orange)
+                    styles.table_body_orange)
             worksheet.merge_range(startrow +
                                   6, startcol +
                                   5, startrow +
                                   6, startcol +
                                   6, str(qbbenchmarks['min']['points']) +
-                                  " Points", table_body_orange)
+                                  " Points", styles.table_body_orange)
             worksheet.merge_range(startrow +
                                   6, startcol +
                                   7, startrow +
                                   6, startcol +
                                   8, u"\u2265" +
                                   str(qbbenchmarks['min']['score']) +
-                                  " Stars", table_body_orange)
+                                  " Stars", styles.table_body_orange)
         else:
             worksheet.merge_range(startrow +
                                   6, startcol +
                                   5, startrow +
                                   6, startcol +
                                   6, str(qbbenchmarks['min']['points']) +
-                                  " Points", table_body)
+                                  " Points", styles.table_body)
             worksheet.merge_range(startrow +
                                   6, startcol +
                                   7, startrow +
                                   6, startcol +
                                   8, u"\u2265" +
                                   str(qbbenchmarks['min']['score']) +
-                                  " Stars", table_body)
+                                  " Stars", styles.table_body)
         if qb_earned == 0 and qb_points != 0:
             if score:
                 worksheet.write(
                     startrow + 2,
                     startcol + 3,
                     qb_star_rating,
-                    table_body_red)
+                    styles.table_body_red)
         worksheet.merge_range(
             startrow + 7,
             startcol + 5,
             startrow + 7,
             startcol + 8,
             "",
-            table_title)
+            styles.table_title)
 
 
 def itercol(
@@ -1647,6 +2792,391 @@ def itercol(
         return startcol + length + 1
 
 
+# This function writes a block of table rows. columns is a list with one
+# (values, format) pair per sheet column, where values holds one entry per
+# row. The column arrays are zipped into row tuples up front, and each run of
+# neighbouring columns that share a format is written with one write_row()
+# call per row instead of a write() per cell. A column whose format changes
+# from row to row can pass an array with one format per row instead.
+def write_rows(ws, startrow, startcol, columns):
+    runs = []
+    for col, (values, fmt) in enumerate(columns):
+        if runs and runs[-1][1] is fmt and not isinstance(fmt, np.ndarray):
+            runs[-1][2].append(values)
+        else:
+            runs.append((startcol + col, fmt, [values]))
+    runs = [(col, fmt, list(zip(*arrays))) for col, fmt, arrays in runs]
+    length = len(columns[0][0]) if columns else 0
+    for i in range(0, length):
+        for col, fmt, rows in runs:
+            if isinstance(fmt, np.ndarray):
+                ws.write(startrow + i, col, rows[i][0], fmt[i])
+            else:
+                ws.write_row(startrow + i, col, rows[i], fmt)
+    return startrow + length
+
+
+# This function tells whether ws.write() writes value as a string. The
+# worksheet's strings_to_* options turn some strings into formulas, URLs or
+# numbers instead, which stream_cells() leaves to xlsxwriter.
+def plain_string(ws, value):
+    if ws.strings_to_formulas and value.startswith("="):
+        return False
+    if value.startswith("{=") and value.endswith("}"):
+        return False
+    if ":" in value and ws.strings_to_urls and re.match(
+            "(ftp|http)s?://|mailto:|(in|ex)ternal:|file://", value):
+        return False
+    if ws.strings_to_numbers:
+        try:
+            float(value)
+            return False
+        except ValueError:
+            pass
+    return True
+
+
+# This function serializes a column of cell values to the XML that follows
+# each cell reference, the way xlsxwriter writes them in constant_memory mode:
+# strings inline, numbers as values and "" as a formatted blank cell. It
+# returns None for any other value, and for strings write() would not write as
+# strings, which stream_rows() leaves to xlsxwriter.
+def stream_cells(ws, values, fmt):
+    if isinstance(fmt, np.ndarray):
+        styles = [' s="{0}"'.format(i._get_xf_index()) if i is not None and
+                  i._get_xf_index() else "" for i in fmt]
+    else:
+        style = ""
+        if fmt is not None and fmt._get_xf_index():
+            style = ' s="{0}"'.format(fmt._get_xf_index())
+        styles = [style] * len(values)
+    cells = []
+    for value, style in zip(values, styles):
+        if isinstance(value, str):
+            if value == "":
+                cells.append(style + "/>" if style else None)
+                continue
+            if not plain_string(ws, value):
+                return None
+            value = ws._escape_control_characters(value[:ws.xls_strmax])
+            if value.startswith("<r>") and value.endswith("</r>"):
+                return None
+            space = ""
+            if xlsxwriter.utility._preserve_whitespace(value):
+                space = ' xml:space="preserve"'
+            cells.append('{0} t="inlineStr"><is><t{1}>{2}</t></is></c>'.format(
+                style, space, ws._escape_data(value)))
+        elif isinstance(value, (int, float, np.integer, np.floating)) and \
+                not isinstance(value, (bool, np.bool_)) and \
+                math.isfinite(value):
+            cells.append("{0}><v>{1:.16G}</v></c>".format(style, value))
+        elif value is None:
+            cells.append(style + "/>" if style else None)
+        else:
+            return None
+    return cells
+
+
+# The xlsxwriter versions whose worksheet internals stream_rows() writes to
+# have been checked against, benchmark_detail_stream() compares its sheet XML
+# with write_rows(). Any other version falls back to write_rows().
+stream_xlsxwriter_versions = ['3.2.9']
+
+
+# This function is a fast path for write_rows() on constant_memory
+# worksheets. It writes the rows' sheet XML straight to the worksheet's row
+# data file from the column arrays, instead of creating a cell object per
+# value, and leaves the worksheet as if the rows had been written with
+# write_row(). Formats come from the workbook, so the rest of the workbook is
+# unchanged. Other worksheets, and any rows with values it cannot serialize,
+# are written with write_rows(), as is everything on an xlsxwriter version
+# that is not in stream_xlsxwriter_versions.
+def stream_rows(ws, startrow, startcol, columns, chunksize=10000):
+    length = len(columns[0][0]) if columns else 0
+    if xlsxwriter.__version__ not in stream_xlsxwriter_versions or \
+            not ws.constant_memory or startrow < ws.previous_row or \
+            ws.excel_version != 2007 or \
+            ws.default_row_height != ws.original_row_height or \
+            startrow + length > ws.xls_rowmax:
+        return write_rows(ws, startrow, startcol, columns)
+
+    # Flush the rows already written, the last header row is still pending
+    ws._write_single_row(startrow)
+    refs = [colnum_string(startcol + i) for i in range(0, len(columns))]
+    for start in range(0, length, chunksize):
+        stop = min(start + chunksize, length)
+        cells = []
+        for values, fmt in columns:
+            if isinstance(fmt, np.ndarray):
+                fmt = fmt[start:stop]
+            cells.append(stream_cells(ws, values[start:stop], fmt))
+            if cells[-1] is None:
+                break
+        if cells and cells[-1] is None:
+            stream_dimensions(ws, startrow, startcol, start, len(columns))
+            rest = [(values[start:], fmt[start:] if isinstance(
+                fmt, np.ndarray) else fmt) for values, fmt in columns]
+            return write_rows(ws, startrow + start, startcol, rest)
+        rows = []
+        for i, row in enumerate(zip(*cells), start=startrow + start + 1):
+            rows.append('<row r="{0}">'.format(i))
+            for ref, cell in zip(refs, row):
+                if cell is not None:
+                    rows.append('<c r="{0}{1}"{2}'.format(ref, i, cell))
+            rows.append("</row>")
+        ws.fh.write("".join(rows))
+    stream_dimensions(ws, startrow, startcol, length, len(columns))
+    return startrow + length
+
+
+# This function records rows written by stream_rows() in the worksheet's
+# dimensions, as xlsxwriter does for each cell it writes
+def stream_dimensions(ws, startrow, startcol, length, width):
+    if length == 0 or width == 0:
+        return
+    ws._check_dimensions(startrow, startcol)
+    ws._check_dimensions(startrow + length - 1, startcol + width - 1)
+    ws.previous_row = startrow + length
+
+
+# This function returns a column that holds value where mask is True and
+# blank everywhere else
+def flagcol(mask, value, blank=""):
+    values = np.full(len(mask), blank, dtype=object)
+    values[mask] = value
+    return values
+
+
+# This function compiles a detail_specs source into a function that takes the
+# report frame and returns the column values, with a mask of the rows that
+# have a source for 'case' columns (None for the others). Sources are resolved
+# here once so rendering a sheet only runs whole column operations. With
+# export=True the column keeps the frame's types and missing values for the
+# machine-readable exports instead of the text the sheet shows.
+def detail_source(source):
+    if isinstance(source, str):
+        return lambda df, export=False: (df[source].values, None)
+    elif source[0] == 'text':
+        column = source[1]
+        return lambda df, export=False: (df[column].astype(
+            "string" if export else str).values, None)
+    elif source[0] == 'flag':
+        _, column, value = source
+        return lambda df, export=False: (flagcol(
+            df[column].values == 1, value, None if export else ""), None)
+    elif source[0] == 'case':
+        _, column, cases, default, blank_style = source
+        matches = list(cases.keys())
+        sources = list(cases.values())
+
+        def case(df, export=False):
+            # A missing key matches no case. Typed string columns compare to
+            # <NA> there, which np.select() does not take as a condition.
+            keys = df[column]
+            conditions = [keys.eq(match).fillna(False).to_numpy(bool)
+                          for match in matches]
+            choices = [df[i].values for i in sources]
+            if default is None:
+                values = np.select(
+                    conditions, choices, None if export else "")
+            else:
+                values = np.select(conditions, choices, df[default].values)
+            return values, np.logical_or.reduce(conditions)
+        return case
+    raise ValueError("Unknown detail source: " + repr(source))
+
+
+# Compiled detail_specs plans, keyed by (name, hospital, startrow, startcol)
+detail_plans = {}
+
+
+# This function compiles a detail_specs entry into a writer plan: the header
+# cells and column settings with their final sheet positions and the column
+# functions for the body. Plans are built once per layout and reused for
+# every hospital.
+def detail_plan(name, hospital=False, startrow=0, startcol=0):
+    key = (name, hospital, startrow, startcol)
+    if key in detail_plans:
+        return detail_plans[key]
+    spec = detail_specs[name]
+    columns = list(spec['columns'])
+    bodycol = startcol
+    if hospital:
+        columns = hospital_detail_columns + columns
+        bodycol = startcol + len(hospital_detail_columns)
+
+    layout = []
+    groups = [None] * len(columns)
+    for group in spec.get('groups', []):
+        first, last, label = group[0:3]
+        style = group[3] if len(group) > 3 else 'headerwrap_group'
+        for i in range(first, last + 1):
+            groups[bodycol - startcol + i] = label.strip()
+        if first == last:
+            layout.append(
+                ('write', (startrow + 1, bodycol + first, label), style))
+        else:
+            layout.append(('merge_range', (
+                startrow + 1, bodycol + first, startrow + 1, bodycol + last,
+                label), style))
+    if 'header_height' in spec:
+        layout.append(
+            ('set_row', (startrow + 2, spec['header_height']), 'headerwrap'))
+    body = []
+    labels = []
+    for i, column in enumerate(columns):
+        label, source, width, style = column[0:4]
+        labels.append(label.strip() if groups[i] is None else
+                      groups[i] + " - " + label.strip())
+        header_style = column[4] if len(column) > 4 else 'header'
+        layout.append(
+            ('write', (startrow + 2, startcol + i, label), header_style))
+        if width == 0:
+            layout.append(('set_column', (
+                startcol + i, startcol + i, None, None, {'hidden': 1}), None))
+        else:
+            layout.append(
+                ('set_column', (startcol + i, startcol + i, width), None))
+        blank_style = None
+        if not isinstance(source, str) and source[0] == 'case':
+            blank_style = source[4]
+        body.append((detail_source(source), style, blank_style))
+
+    plan = {
+        'title': spec['title'],
+        'lastcol': startcol + len(columns) - 1,
+        'layout': layout,
+        'body': body,
+        'labels': labels}
+    detail_plans[key] = plan
+    return plan
+
+
+# This function replays worksheet calls given as (method, args, style name)
+# operations, e.g. ('write', (0, 0, "Title"), 'title1'), with the named styles
+# of the workbook. A report can build the operations for the parts of its
+# sheets that do not change between hospitals once and stamp them into every
+# workbook it writes.
+def stamp(ws, template, styles=None):
+    styles = bound_styles(styles)
+    for method, args, style in template:
+        if style is not None:
+            args = args + (getattr(styles, style),)
+        getattr(ws, method)(*args)
+
+
+# This function evaluates the body columns of a detail_plan() on a blanked
+# dataframe as the (values, formats) pairs write_rows() and stream_rows() take
+def detail_body(df, plan, styles):
+    columns = []
+    for source, style, blank_style in plan['body']:
+        values, matched = source(df)
+        if blank_style is None:
+            columns.append((values, getattr(styles, style)))
+        else:
+            columns.append((values, np.where(
+                matched, getattr(styles, style),
+                getattr(styles, blank_style))))
+    return columns
+
+
+# This function renders a member detail sheet from its detail_specs entry. The
+# title and header rows are written first and the body follows with
+# write_rows(), so the sheet is written top to bottom and can be streamed with
+# the constant_memory workbook option. With stream=True the body is written
+# with stream_rows() instead. Rows past the sheet's row limit go on to
+# continuation sheets, "HOSP19 (2)" and so on, which are added at the end of
+# the workbook and rendered the same way from their first row.
+def render_detail(ws, df, name, startrow=0, startcol=0, title='',
+                  hospital=False, styles=None, stream=False):
+    styles = bound_styles(styles)
+    rows = ws.xls_rowmax - startrow - 3
+    if len(df) > rows:
+        currow = render_detail(ws, df.iloc[:rows], name, startrow, startcol,
+                               title, hospital, styles, stream)
+        for sheet, start in enumerate(
+                range(rows, len(df), ws.xls_rowmax - 3), start=2):
+            suffix = " ({0})".format(sheet)
+            continuation = styles.workbook.add_worksheet(
+                ws.name[:31 - len(suffix)] + suffix)
+            currow = render_detail(
+                continuation, df.iloc[start:start + ws.xls_rowmax - 3], name,
+                0, startcol, title, hospital, styles, stream)
+        return currow
+
+    plan = detail_plan(name, hospital, startrow, startcol)
+    df = blanks(df)
+
+    ws.autofilter(
+        startrow + 2,
+        startcol,
+        startrow + 2 + len(df),
+        plan['lastcol'])
+    ws.freeze_panes(startrow + 3, 0)
+    ws.merge_range(
+        startrow,
+        startcol,
+        startrow,
+        plan['lastcol'],
+        title if plan['title'] is None else plan['title'],
+        styles.table_title)
+    stamp(ws, plan['layout'], styles)
+
+    columns = detail_body(df, plan, styles)
+    if stream:
+        return stream_rows(ws, startrow + 3, startcol, columns)
+    return write_rows(ws, startrow + 3, startcol, columns)
+
+
+# This function converts Excel date numbers back to dates
+def excel_dates(values):
+    return pd.to_datetime(
+        pd.to_numeric(pd.Series(values), errors="coerce"),
+        unit="D", origin="1899-12-30")
+
+
+# This function returns the member rows of a detail sheet as a typed frame for
+# the machine-readable exports. It has the sheet's columns, named
+# "Group - Header" and numbered when a name repeats, with missing values kept
+# and the date columns as dates.
+def detail_frame(df, name, hospital=False):
+    plan = detail_plan(name, hospital)
+    frame = {}
+    for label, (source, style, blank_style) in zip(
+            plan['labels'], plan['body']):
+        values, matched = source(df, export=True)
+        if style == 'table_body_date2':
+            values = excel_dates(values).values
+        column = label
+        count = 1
+        while column in frame:
+            count = count + 1
+            column = label + " " + str(count)
+        frame[column] = values
+    return pd.DataFrame(frame).convert_dtypes()
+
+
+# Formats export_detail() can write
+export_formats = ['parquet', 'csv']
+
+
+# This function writes the member rows of a detail sheet next to its workbook,
+# as path + '.parquet' and/or path + '.csv'. Each file is written to a
+# temporary name first so a reader never sees a partial export.
+def export_detail(df, name, path, formats, hospital=False):
+    frame = detail_frame(df, name, hospital)
+    for i in formats:
+        if i not in export_formats:
+            raise ValueError("Unknown export format: " + str(i))
+        tmp = path + "." + i + ".tmp"
+        if i == 'parquet':
+            frame.to_parquet(tmp, index=False)
+        else:
+            frame.to_csv(tmp, index=False)
+        os.replace(tmp, path + "." + i)
+    return frame
+
+
 def colnum_string(n):
     string = ""
     n = n + 1
@@ -1789,8 +3319,10 @@ def matrix(
         EPI_available_TOTAL4,
         epi_points_earned_total4,
         comment_desc_TOTAL4,
-        hospsize):
+        hospsize,
+        styles=None):
 
+    styles = bound_styles(styles)
     print("********************************PRINT START MATRIX****************************************************")
     print("********************************PRINT START MATRIX****************************************************")
     print("********************************PRINT START MATRIX****************************************************")
@@ -2335,30 +3867,30 @@ def matrix(
     #print(epi_scores)
     #print(cqmlist)
 
-    worksheet.write(startrow, 0, "Legend:", header)
-    worksheet.write(startrow + 1, 0, " ", table_body_pct_red)
+    worksheet.write(startrow, 0, "Legend:", styles.header)
+    worksheet.write(startrow + 1, 0, " ", styles.table_body_pct_red)
     worksheet.write(startrow + 1, 1, "Zero Payout")
-    worksheet.write(startrow + 2, 0, " ", table_body_pct_orange)
+    worksheet.write(startrow + 2, 0, " ", styles.table_body_pct_orange)
     worksheet.write(startrow + 2, 1, "Min Payout")
-    worksheet.write(startrow + 1, 4, " ", table_body_pct_yellow)
+    worksheet.write(startrow + 1, 4, " ", styles.table_body_pct_yellow)
     worksheet.write(startrow + 1, 5, "Mid Payout")
-    worksheet.write(startrow + 2, 4, " ", table_body_pct_green)
+    worksheet.write(startrow + 2, 4, " ", styles.table_body_pct_green)
     worksheet.write(startrow + 2, 5, "Max Payout")
-    worksheet.write(startrow + 1, 8, " ", current_score)
+    worksheet.write(startrow + 1, 8, " ", styles.current_score)
     worksheet.write(startrow + 1, 9, "Current Score")
 
     # This is the row and column where we will start our matrix.
     startrow = startrow + 3
     startcol = 0
-    worksheet.write(startrow, startcol, '', table_title)
-    worksheet.write(startrow + 1, startcol, '', table_title)
-    worksheet.write(startrow + 2, startcol, '', table_title)
-    worksheet.write(startrow + 3, startcol, "Episodes", table_title)
+    worksheet.write(startrow, startcol, '', styles.table_title)
+    worksheet.write(startrow + 1, startcol, '', styles.table_title)
+    worksheet.write(startrow + 2, startcol, '', styles.table_title)
+    worksheet.write(startrow + 3, startcol, "Episodes", styles.table_title)
     curcol = startcol + 1
-    worksheet.write(startrow, curcol, '', table_title)
-    worksheet.write(startrow + 1, curcol, '', table_title)
-    worksheet.write(startrow + 2, curcol, 'Quality', table_title)
-    worksheet.write(startrow + 3, curcol, "Bundle", table_title)
+    worksheet.write(startrow, curcol, '', styles.table_title)
+    worksheet.write(startrow + 1, curcol, '', styles.table_title)
+    worksheet.write(startrow + 2, curcol, 'Quality', styles.table_title)
+    worksheet.write(startrow + 3, curcol, "Bundle", styles.table_title)
     curcol = curcol + 1
     currow = startrow
     worksheet.merge_range(
@@ -2369,7 +3901,7 @@ def matrix(
         len(cqmlist) -
         1,
         "SCORING MATRIX",
-        table_title)
+        styles.table_title)
     currow = currow + 1
     worksheet.merge_range(
         currow,
@@ -2379,7 +3911,7 @@ def matrix(
         len(cqmlist) -
         1,
         "",
-        table_title)
+        styles.table_title)
     currow = currow + 1
     worksheet.merge_range(
         currow,
@@ -2387,11 +3919,11 @@ def matrix(
         currow,
         curcol + len(cqmlist) - 1,
         "Clinical Quality Metrics",
-        table_title)
+        styles.table_title)
     currow = currow + 1
 
     for k in range(len(cqmlist)):
-        worksheet.write(currow, curcol, cqmlist[k][0], header)
+        worksheet.write(currow, curcol, cqmlist[k][0], styles.header)
         cqmcomment = "Points:" + str(cqmlist[k][0]) + "\n Hosp03 Target: " + str(cqmlist[k][2] + hosp03_numerator) + "/" + str(
             hosp03_denominator) + ' (' + comment(cqmlist[k][2], "fewer Palliative Care Consults (MA)", "more Palliative Care Consults (MA)") + ') '
         cqmcomment = cqmcomment + "\n Hosp19 Target: " + str(
@@ -2429,7 +3961,7 @@ def matrix(
     for i in range(len(epi_scores2)):
         curcol = startcol
         for j in range(len(qblist)):
-            worksheet.write(currow, curcol, epi_scores2[i][0], header)
+            worksheet.write(currow, curcol, epi_scores2[i][0], styles.header)
 
             # print(epi_scores)
 
@@ -2471,12 +4003,12 @@ def matrix(
                 qbcomment = "Decrease Quality Bundle Star Rating by " + \
                     str(qblist[j][3])
 
-            worksheet.write(currow, curcol, qblist[j][1], header)
+            worksheet.write(currow, curcol, qblist[j][1], styles.header)
             if qblist[j][2] == 0:
                 qbcomment = "Current Score"
             if qb_points == 0:
                 qbcomment = "Not Scored"
-                worksheet.write(currow, curcol, "NS", header)
+                worksheet.write(currow, curcol, "NS", styles.header)
 
             worksheet.write_comment(currow, curcol, qbcomment)
 
@@ -2497,20 +4029,20 @@ def matrix(
 
                 if epi_scores2[i][0] == epi_earned and qblist[j][1] == qb_earned and cqmlist[k][0] == cqm_earned:
                     worksheet.write(
-                        currow, curcol, matrix_score, current_score)
+                        currow, curcol, matrix_score, styles.current_score)
                 else:
                     if matrix_score < overallbenchmarks[hospsize]['min']:
                         worksheet.write(
-                            currow, curcol, matrix_score, table_body_pct_red)
+                            currow, curcol, matrix_score, styles.table_body_pct_red)
                     elif matrix_score >= overallbenchmarks[hospsize]['min'] and matrix_score < overallbenchmarks[hospsize]['mid']:
                         worksheet.write(
-                            currow, curcol, matrix_score, table_body_pct_orange)
+                            currow, curcol, matrix_score, styles.table_body_pct_orange)
                     elif matrix_score >= overallbenchmarks[hospsize]['mid'] and matrix_score < overallbenchmarks[hospsize]['max']:
                         worksheet.write(
-                            currow, curcol, matrix_score, table_body_pct_yellow)
+                            currow, curcol, matrix_score, styles.table_body_pct_yellow)
                     elif matrix_score >= overallbenchmarks[hospsize]['max']:
                         worksheet.write(
-                            currow, curcol, matrix_score, table_body_pct_green)
+                            currow, curcol, matrix_score, styles.table_body_pct_green)
             curcol = startcol
             currow = currow + 1
 
@@ -2560,7 +4092,9 @@ def stars_history_graph(
         startcol=0,
         graph_title=None,
         x_scale=2,
-        y_scale=0.75):
+        y_scale=0.75,
+        styles=None):
+    styles = bound_styles(styles)
     try:
         df["aggr_star_rating"] = df["aggr_star_rating"].apply(
             lambda x: math.floor(x * 100) / 100)
@@ -2579,22 +4113,22 @@ def stars_history_graph(
         min_score = 1
     max_mo = int(df['Month'].where(df["Year"] == year).dropna().max())
 
-    curcol = itercol(ws, startrow, startcol, 0, "Month", header)
-    ws.write(startrow + 1, curcol - 1, "CY " + str(int(year)), header)
-    ws.write(startrow + 2, curcol - 1, "CY " + str(int(year - 1)), header)
-    ws.write(startrow + 3, curcol - 1, "Projected", header)
+    curcol = itercol(ws, startrow, startcol, 0, "Month", styles.header)
+    ws.write(startrow + 1, curcol - 1, "CY " + str(int(year)), styles.header)
+    ws.write(startrow + 2, curcol - 1, "CY " + str(int(year - 1)), styles.header)
+    ws.write(startrow + 3, curcol - 1, "Projected", styles.header)
     ws.write(startrow +
              4, curcol -
              1, str(qbbenchmarks["max"]["points"]) +
-             " Points", header)
+             " Points", styles.header)
     ws.write(startrow +
              5, curcol -
              1, str(qbbenchmarks["mid"]["points"]) +
-             " Points", header)
+             " Points", styles.header)
     ws.write(startrow +
              6, curcol -
              1, str(qbbenchmarks["min"]["points"]) +
-             " Points", header)
+             " Points", styles.header)
 
     # i <= max_mo or
     for i in range(int(min_mo), 16):
@@ -2618,11 +4152,11 @@ def stars_history_graph(
                              curcol,
                              0,
                              "=DATE(" + str(year) + ", " + str(i + 1) + ', 1)-1',
-                             table_body_date2)
+                             styles.table_body_date2)
             if cy != "":
-                ws.write(startrow + 1, curcol - 1, cy, table_body_num2)
+                ws.write(startrow + 1, curcol - 1, cy, styles.table_body_num2)
             if py != "":
-                ws.write(startrow + 2, curcol - 1, py, table_body_num2)
+                ws.write(startrow + 2, curcol - 1, py, styles.table_body_num2)
 
             if max_mo != 15 and proj_star_rating is not None and i >= max_mo:
                 if i == max_mo:
@@ -2631,28 +4165,28 @@ def stars_history_graph(
                     m = sr_diff / months
                     b = proj_star_rating - m * 15
                 y = m * i + b
-                ws.write(startrow + 3, curcol - 1, y, table_body_num2)
+                ws.write(startrow + 3, curcol - 1, y, styles.table_body_num2)
             if max_mo != 15 and proj_star_rating is not None and i == 15:
                 ws.write(
                     startrow + 3,
                     curcol - 1,
                     proj_star_rating,
-                    table_body_num2)
+                    styles.table_body_num2)
             ws.write(
                 startrow + 4,
                 curcol - 1,
                 qbbenchmarks["max"]["score"],
-                table_body_num2)
+                styles.table_body_num2)
             ws.write(
                 startrow + 5,
                 curcol - 1,
                 qbbenchmarks["mid"]["score"],
-                table_body_num2)
+                styles.table_body_num2)
             ws.write(
                 startrow + 6,
                 curcol - 1,
                 qbbenchmarks["min"]["score"],
-                table_body_num2)
+                styles.table_body_num2)
 
     series1 = '=' + "'" + ws.get_name() + "'" + '!' + colnum_string(startcol + 1) + \
         str(startrow + 1) + ':' + colnum_string(curcol - 1) + str(startrow + 1)
@@ -2773,21 +4307,22 @@ def na(testvalue, fmt, na_fmt):
             return(fmt)
 
 
-def bundle_formats(qb_earned=0, qb_points=0):
+def bundle_formats(qb_earned=0, qb_points=0, styles=None):
+    styles = bound_styles(styles)
     if qb_earned == qbbenchmarks['bonus5']['points']:
-        return table_body_green
+        return styles.table_body_green
     elif qb_earned == qbbenchmarks['bonus2']['points']:
-        return table_body_green
+        return styles.table_body_green
     elif qb_earned == qbbenchmarks['max']['points']:
-        return table_body_green
+        return styles.table_body_green
     elif qb_earned == qbbenchmarks['mid']['points']:
-        return table_body_yellow
+        return styles.table_body_yellow
     elif qb_earned == qbbenchmarks['min']['points']:
-        return table_body_orange
+        return styles.table_body_orange
     elif qb_earned == 0 and qb_points != 0:
-        return table_body_red
+        return styles.table_body_red
     else:
-        return table_body
+        return styles.table_body
 
 
 def stars_summary(
@@ -2806,7 +4341,9 @@ def stars_summary(
         min_prac_stars="",
         py_min_stars="",
         max_prac_stars="",
-        py_max_stars=""):
+        py_max_stars="",
+        styles=None):
+    styles = bound_styles(styles)
     columns = {
         'Attribute': 2,
         'Current YTD': 1,
@@ -2820,28 +4357,28 @@ def stars_summary(
         startcol,
         columns['Attribute'],
         "",
-        headerwrap)
+        styles.headerwrap)
     curcol = itercol(
         ws,
         startrow + 1,
         curcol,
         columns['Current YTD'],
         "Current YTD",
-        headerwrap_num)
+        styles.headerwrap_num)
     curcol = itercol(
         ws,
         startrow + 1,
         curcol,
         columns['Predicted Year End'],
         'Predicted Year End',
-        headerwrap_num)
+        styles.headerwrap_num)
     curcol = itercol(
         ws,
         startrow + 1,
         curcol,
         columns['Prior Year End'],
         'Prior Year End',
-        headerwrap_num)
+        styles.headerwrap_num)
     lastcol = curcol - 1
     ws.merge_range(
         startrow,
@@ -2849,7 +4386,7 @@ def stars_summary(
         startrow,
         lastcol,
         "QUALITY BUNDLE",
-        table_title)
+        styles.table_title)
 
     currow = startrow + 2
 
@@ -2859,7 +4396,7 @@ def stars_summary(
         startcol,
         columns['Attribute'],
         "Aggregate Star Rating",
-        table_body)
+        styles.table_body)
     curcol = itercol(
         ws,
         currow,
@@ -2868,21 +4405,21 @@ def stars_summary(
         current_star_rating,
         bundle_formats(
             points_earned,
-            points_available))
+            points_available, styles=styles))
     curcol = itercol(
         ws,
         currow,
         curcol,
         columns['Predicted Year End'],
         predicted_star_rating,
-        table_body_num2)
+        styles.table_body_num2)
     curcol = itercol(
         ws,
         currow,
         curcol,
         columns['Prior Year End'],
         py_star_rating,
-        table_body_num2)
+        styles.table_body_num2)
 
     currow = currow + 1
 
@@ -2892,28 +4429,28 @@ def stars_summary(
         startcol,
         columns['Attribute'],
         "Number of Practices",
-        table_body)
+        styles.table_body)
     curcol = itercol(
         ws,
         currow,
         curcol,
         columns['Current YTD'],
         prac_count,
-        table_body)
+        styles.table_body)
     curcol = itercol(
         ws,
         currow,
         curcol,
         columns['Predicted Year End'],
         "",
-        table_body)
+        styles.table_body)
     curcol = itercol(
         ws,
         currow,
         curcol,
         columns['Prior Year End'],
         py_prac_count,
-        table_body)
+        styles.table_body)
 
     currow = currow + 1
 
@@ -2923,28 +4460,28 @@ def stars_summary(
         startcol,
         columns['Attribute'],
         "Attributed MA Members",
-        table_body)
+        styles.table_body)
     curcol = itercol(
         ws,
         currow,
         curcol,
         columns['Current YTD'],
         attr_count,
-        table_body)
+        styles.table_body)
     curcol = itercol(
         ws,
         currow,
         curcol,
         columns['Predicted Year End'],
         "",
-        table_body)
+        styles.table_body)
     curcol = itercol(
         ws,
         currow,
         curcol,
         columns['Prior Year End'],
         py_attr_count,
-        table_body)
+        styles.table_body)
 
     currow = currow + 1
 
@@ -2954,28 +4491,28 @@ def stars_summary(
         startcol,
         columns['Attribute'],
         "Maximum Practice Rating",
-        table_body)
+        styles.table_body)
     curcol = itercol(
         ws,
         currow,
         curcol,
         columns['Current YTD'],
         max_prac_stars,
-        table_body)
+        styles.table_body)
     curcol = itercol(
         ws,
         currow,
         curcol,
         columns['Predicted Year End'],
         "",
-        table_body)
+        styles.table_body)
     curcol = itercol(
         ws,
         currow,
         curcol,
         columns['Prior Year End'],
         py_prac_count,
-        table_body)
+        styles.table_body)
 
     currow = currow + 1
 
@@ -2985,28 +4522,28 @@ def stars_summary(
         startcol,
         columns['Attribute'],
         "Minimum Practice Rating",
-        table_body)
+        styles.table_body)
     curcol = itercol(
         ws,
         currow,
         curcol,
         columns['Current YTD'],
         min_prac_stars,
-        table_body)
+        styles.table_body)
     curcol = itercol(
         ws,
         currow,
         curcol,
         columns['Predicted Year End'],
         "",
-        table_body)
+        styles.table_body)
     curcol = itercol(
         ws,
         currow,
         curcol,
         columns['Prior Year End'],
         py_prac_count,
-        table_body)
+        styles.table_body)
 
     currow = currow + 1
 
@@ -3016,28 +4553,28 @@ def stars_summary(
         startcol,
         columns['Attribute'],
         "POINTS EARNED:",
-        table_title)
+        styles.table_title)
     curcol = itercol(
         ws,
         currow,
         curcol,
         columns['Current YTD'],
         points_earned,
-        table_title)
+        styles.table_title)
     curcol = itercol(
         ws,
         currow,
         curcol,
         columns['Predicted Year End'],
         "",
-        table_title)
+        styles.table_title)
     curcol = itercol(
         ws,
         currow,
         curcol,
         columns['Prior Year End'],
         "",
-        table_title)
+        styles.table_title)
 
     qbtables(
         worksheet=ws,
@@ -3046,27 +4583,29 @@ def stars_summary(
         qb_star_rating=current_star_rating,
         qb_points=points_available,
         qb_earned=points_earned,
-        score=False)
+        score=False, styles=styles)
 
 
-def star_rating_fmt(star_rating):
+def star_rating_fmt(star_rating, styles=None):
+    styles = bound_styles(styles)
     if star_rating != "":
         if star_rating == 5:
-            return table_body_green
+            return styles.table_body_green
         if star_rating == 4:
-            return table_body_yellow
+            return styles.table_body_yellow
         if star_rating == 3:
-            return table_body_orange
+            return styles.table_body_orange
         if star_rating == 2:
-            return table_body_red
+            return styles.table_body_red
         if star_rating == 1:
-            return table_body_red
+            return styles.table_body_red
         if star_rating == "":
-            return table_body
+            return styles.table_body
 
 
-def stars_table(df, ws, startrow, startcol):
+def stars_table(df, ws, startrow, startcol, styles=None):
 
+    styles = bound_styles(styles)
     df.sort_values(by=['row'])
     df_temp = df[['Measure Code',
                   'Class',
@@ -3114,7 +4653,7 @@ def stars_table(df, ws, startrow, startcol):
         startcol,
         columns['Class'],
         "Class",
-        headerwrap)
+        styles.headerwrap)
     #ws.write(currow, startcol, "Class", header)
     #ws.merge_range(currow, startcol+1, currow, startcol+5, "Measure", header)
     curcol = itercol(
@@ -3123,142 +4662,142 @@ def stars_table(df, ws, startrow, startcol):
         curcol,
         columns['Measure'],
         "Measure",
-        headerwrap)
+        styles.headerwrap)
     curcol = itercol(
         ws,
         currow,
         curcol,
         columns['Weight'],
         "Weight",
-        headerwrap_num)
+        styles.headerwrap_num)
     curcol = itercol(
         ws,
         currow,
         curcol,
         columns['Denominator'],
         "Denominator",
-        headerwrap_num)
+        styles.headerwrap_num)
     curcol = itercol(
         ws,
         currow,
         curcol,
         columns['Numerator'],
         "Numerator",
-        headerwrap_num)
+        styles.headerwrap_num)
     curcol = itercol(
         ws,
         currow,
         curcol,
         columns['Gaps Addressed'],
         "Gaps Addressed",
-        headerwrap_num)
+        styles.headerwrap_num)
     curcol = itercol(
         ws,
         currow,
         curcol,
         columns['Beyond Remediation'],
         "Beyond Remediation",
-        headerwrap_num)
+        styles.headerwrap_num)
     curcol = itercol(
         ws,
         currow,
         curcol,
         columns['YTD Compliance'],
         "YTD Compliance",
-        headerwrap_num)
+        styles.headerwrap_num)
     curcol = itercol(
         ws,
         currow,
         curcol,
         columns['Trend Compliance'],
         "Trend Compliance",
-        headerwrap_num)
+        styles.headerwrap_num)
     curcol = itercol(
         ws,
         currow,
         curcol,
         columns['Star Rating'],
         "Star Rating",
-        headerwrap_num)
+        styles.headerwrap_num)
     curcol = itercol(
         ws,
         currow,
         curcol,
         columns['Maximum Potential Compliance'],
         "Maximum Potential Rate",
-        headerwrap_num)
+        styles.headerwrap_num)
     curcol = itercol(
         ws,
         currow,
         curcol,
         columns['4 Stars'],
         "4 Stars",
-        headerwrap_num)
+        styles.headerwrap_num)
     curcol = itercol(
         ws,
         currow,
         curcol,
         columns['needed4'],
         "4 Stars (Gaps Needed)",
-        headerwrap_num)
+        styles.headerwrap_num)
     curcol = itercol(
         ws,
         currow,
         curcol,
         columns['5 Stars'],
         "5 Stars",
-        headerwrap_num)
+        styles.headerwrap_num)
     curcol = itercol(
         ws,
         currow,
         curcol,
         columns['needed5'],
         "5 Stars (Gaps Needed)",
-        headerwrap_num)
+        styles.headerwrap_num)
     for i in range(0, len(df_temp)):
         currow = currow + 1
         curcol = 0
         if df["Measure Code"].values[i] in ['pcr', 'hpc']:
-            compliance_fmt = table_body_num2
+            compliance_fmt = styles.table_body_num2
         else:
-            compliance_fmt = table_body_pct
+            compliance_fmt = styles.table_body_pct
         curcol = itercol(
             ws,
             currow,
             curcol,
             columns['Class'],
             df["Class"].values[i],
-            table_body)
+            styles.table_body)
         curcol = itercol(
             ws,
             currow,
             curcol,
             columns['Measure'],
             df["Measure"].values[i],
-            table_body)
+            styles.table_body)
         curcol = itercol(
             ws, currow, curcol, columns['Weight'], df["Weight"].values[i], na(
-                df["Weight"].values[i], table_body, table_body_na))
+                df["Weight"].values[i], styles.table_body, styles.table_body_na))
         curcol = itercol(
             ws, currow, curcol, columns['Denominator'], df["Denominator"].values[i], na(
-                df["Denominator"].values[i], table_body, table_body_na))
+                df["Denominator"].values[i], styles.table_body, styles.table_body_na))
         curcol = itercol(
             ws, currow, curcol, columns['Numerator'], df["Numerator"].values[i], na(
-                df["Numerator"].values[i], table_body, table_body_na))
+                df["Numerator"].values[i], styles.table_body, styles.table_body_na))
         curcol = itercol(
             ws, currow, curcol, columns['Gaps Addressed'], df["Gaps Addressed"].values[i], na(
-                df["Gaps Addressed"].values[i], table_body, table_body_na))
+                df["Gaps Addressed"].values[i], styles.table_body, styles.table_body_na))
         curcol = itercol(ws,
                          currow,
                          curcol,
                          columns['Beyond Remediation'],
                          df["Beyond Remediation"].values[i],
                          na(df["Beyond Remediation"].values[i],
-                             table_body,
-                             table_body_na))
+                             styles.table_body,
+                             styles.table_body_na))
         curcol = itercol(
             ws, currow, curcol, columns['YTD Compliance'], df["YTD Compliance"].values[i], na(
-                df["YTD Compliance"].values[i], table_body_pct2, table_body_na))
+                df["YTD Compliance"].values[i], styles.table_body_pct2, styles.table_body_na))
         curcol = itercol(ws,
                          currow,
                          curcol,
@@ -3266,10 +4805,10 @@ def stars_table(df, ws, startrow, startcol):
                          df["Trend Compliance"].values[i],
                          na(df["Trend Compliance"].values[i],
                              compliance_fmt,
-                             table_body_na))
+                             styles.table_body_na))
         curcol = itercol(
             ws, currow, curcol, columns['Star Rating'], df["Star Rating"].values[i], na(
-                df["Star Rating"].values[i], table_body, table_body_na))
+                df["Star Rating"].values[i], styles.table_body, styles.table_body_na))
         curcol = itercol(ws,
                          currow,
                          curcol,
@@ -3277,19 +4816,19 @@ def stars_table(df, ws, startrow, startcol):
                          df["Maximum Potential Compliance"].values[i],
                          na(df["Maximum Potential Compliance"].values[i],
                              compliance_fmt,
-                             table_body_na))
+                             styles.table_body_na))
         curcol = itercol(
             ws, currow, curcol, columns['4 Stars'], df["4 Stars"].values[i], na(
-                df["4 Stars"].values[i], compliance_fmt, table_body_na))
+                df["4 Stars"].values[i], compliance_fmt, styles.table_body_na))
         curcol = itercol(
             ws, currow, curcol, columns['needed4'], df["needed4"].values[i], na(
-                df["needed4"].values[i], table_body, table_body_na))
+                df["needed4"].values[i], styles.table_body, styles.table_body_na))
         curcol = itercol(
             ws, currow, curcol, columns['5 Stars'], df["5 Stars"].values[i], na(
-                df["5 Stars"].values[i], compliance_fmt, table_body_na))
+                df["5 Stars"].values[i], compliance_fmt, styles.table_body_na))
         curcol = itercol(
             ws, currow, curcol, columns['needed5'], df["needed5"].values[i], na(
-                df["needed5"].values[i], table_body, table_body_na))
+                df["needed5"].values[i], styles.table_body, styles.table_body_na))
         if i == len(df_temp) - 1:
             ws.merge_range(
                 startrow,
@@ -3297,15 +4836,16 @@ def stars_table(df, ws, startrow, startcol):
                 startrow,
                 curcol - 1,
                 "STARS PERFORMANCE",
-                table_title)
+                styles.table_title)
     currow = currow + 1
     for i in range(0, len(footnotes)):
         ws.merge_range(currow, startcol, currow, curcol - 1, footnotes[i])
         currow = currow + 1
 
 
-def stars_measure_summary(df, ws, startrow, startcol):
+def stars_measure_summary(df, ws, startrow, startcol, styles=None):
 
+    styles = bound_styles(styles)
     df.sort_values(by=['row'])
     df_temp = df[['Measure Code',
                   'Measure',
@@ -3348,63 +4888,63 @@ def stars_measure_summary(df, ws, startrow, startcol):
         startcol,
         columns['Measure'],
         "Measure",
-        headerwrap)
+        styles.headerwrap)
     curcol = itercol(
         ws,
         currow,
         curcol,
         columns['Weight'],
         "Weight",
-        headerwrap_num)
+        styles.headerwrap_num)
     curcol = itercol(
         ws,
         currow,
         curcol,
         columns['Denominator'],
         "Denominator",
-        headerwrap_num)
+        styles.headerwrap_num)
     curcol = itercol(
         ws,
         currow,
         curcol,
         columns['YTD Compliance'],
         "YTD Compliance",
-        headerwrap_num)
+        styles.headerwrap_num)
     curcol = itercol(
         ws,
         currow,
         curcol,
         columns['Star Rating'],
         "Star Rating",
-        headerwrap_num)
+        styles.headerwrap_num)
     curcol = itercol(
         ws,
         currow,
         curcol,
         columns['Maximum Potential Star Rating'],
         "Maximum Potential Star Rating",
-        headerwrap_num)
+        styles.headerwrap_num)
     curcol = itercol(
         ws,
         currow,
         curcol,
         columns['Weighted Points Not Earned'],
         "Weighted Points Not Earned",
-        headerwrap_num)
+        styles.headerwrap_num)
     curcol = itercol(
         ws,
         currow,
         curcol,
         columns['Unearned Points Impact on Star Rating'],
         "Unearned Points Impact on Star Rating",
-        headerwrap_num)
+        styles.headerwrap_num)
     curcol = itercol(
         ws,
         currow,
         curcol,
         columns['Adjusted Bundle Rating (Max Potential)'],
         "Adjusted Bundle Rating (Max Potential)",
-        headerwrap_num)
+        styles.headerwrap_num)
 
     #curcol = itercol(ws, currow, curcol, columns['Gaps Needed to Reach Max Potential'], "Gaps Needed to Reach Max Potential", headerwrap_num)
     #curcol = itercol(ws, currow, curcol, columns['Gap Impact on Star Rating'], "Gap Value to Star Rating", headerwrap_num)
@@ -3412,9 +4952,9 @@ def stars_measure_summary(df, ws, startrow, startcol):
         currow = currow + 1
         curcol = startcol
         if df_temp["Measure Code"].values[i] in ['pcr', 'hpc']:
-            compliance_fmt = table_body_num2
+            compliance_fmt = styles.table_body_num2
         else:
-            compliance_fmt = table_body_pct
+            compliance_fmt = styles.table_body_pct
             'compliance', 'Star Rating', 'pot_star_rating', 'missing_points', 'adj_aggr_difference', 'needed', 'gap_worth'
         curcol = itercol(
             ws,
@@ -3422,13 +4962,13 @@ def stars_measure_summary(df, ws, startrow, startcol):
             curcol,
             columns['Measure'],
             df_temp["Measure"].values[i],
-            table_body)
+            styles.table_body)
         curcol = itercol(
             ws, currow, curcol, columns['Weight'], df_temp["Weight"].values[i], na(
-                df_temp["Weight"].values[i], table_body, table_body_na))
+                df_temp["Weight"].values[i], styles.table_body, styles.table_body_na))
         curcol = itercol(
             ws, currow, curcol, columns['Denominator'], df_temp["Denominator"].values[i], na(
-                df_temp["Denominator"].values[i], table_body, table_body_na))
+                df_temp["Denominator"].values[i], styles.table_body, styles.table_body_na))
         curcol = itercol(ws,
                          currow,
                          curcol,
@@ -3436,35 +4976,35 @@ def stars_measure_summary(df, ws, startrow, startcol):
                          df_temp["compliance"].values[i],
                          na(df_temp["compliance"].values[i],
                              compliance_fmt,
-                             table_body_na))
+                             styles.table_body_na))
         curcol = itercol(
             ws, currow, curcol, columns['Star Rating'], df_temp["Star Rating"].values[i], na(
                 df_temp["Star Rating"].values[i], star_rating_fmt(
-                    df_temp["Star Rating"].values[i]), table_body_na))
+                    df_temp["Star Rating"].values[i], styles=styles), styles.table_body_na))
         curcol = itercol(ws,
                          currow,
                          curcol,
                          columns['Maximum Potential Star Rating'],
                          df_temp["pot_star_rating"].values[i],
                          na(df_temp["pot_star_rating"].values[i],
-                             star_rating_fmt(df_temp["pot_star_rating"].values[i]),
-                             table_body_na))
+                             star_rating_fmt(df_temp["pot_star_rating"].values[i], styles=styles),
+                             styles.table_body_na))
         curcol = itercol(ws,
                          currow,
                          curcol,
                          columns['Weighted Points Not Earned'],
                          df_temp["missing_points"].values[i],
                          na(df_temp["missing_points"].values[i],
-                             table_body,
-                             table_body_na))
+                             styles.table_body,
+                             styles.table_body_na))
         curcol = itercol(ws,
                          currow,
                          curcol,
                          columns['Unearned Points Impact on Star Rating'],
                          df_temp["adj_aggr_difference"].values[i],
                          na(df_temp["adj_aggr_difference"].values[i],
-                             table_body_num2,
-                             table_body_na))
+                             styles.table_body_num2,
+                             styles.table_body_na))
         try:
             curcol = itercol(ws,
                              currow,
@@ -3472,12 +5012,12 @@ def stars_measure_summary(df, ws, startrow, startcol):
                              columns['Adjusted Bundle Rating (Max Potential)'],
                              math.floor(df_temp["adj_star_rating"].values[i] * 100) / 100,
                              na(df_temp["adj_star_rating"].values[i],
-                                 table_body_num2,
-                                 table_body_na))
+                                 styles.table_body_num2,
+                                 styles.table_body_na))
         except BaseException:
             curcol = itercol(
                 ws, currow, curcol, columns['Adjusted Bundle Rating (Max Potential)'], '', na(
-                    df_temp["adj_star_rating"].values[i], table_body_num2, table_body_na))
+                    df_temp["adj_star_rating"].values[i], styles.table_body_num2, styles.table_body_na))
         #curcol = itercol(ws, currow, curcol, columns['Gaps Needed to Reach Max Potential'], df_temp["needed"].values[i], na(df_temp["needed"].values[i], table_body, table_body_na))
         #curcol = itercol(ws, currow, curcol, columns['Gap Impact on Star Rating'], df_temp["gap_worth"].values[i], na(df_temp["gap_worth"].values[i], table_body, table_body_na))
 
@@ -3487,7 +5027,7 @@ def stars_measure_summary(df, ws, startrow, startcol):
         startrow,
         curcol - 1,
         "STARS MEASURE SUMMARY",
-        table_title)
+        styles.table_title)
     currow = currow + 1
     curcol = itercol(
         ws,
@@ -3495,7 +5035,7 @@ def stars_measure_summary(df, ws, startrow, startcol):
         startcol,
         columns['Measure'],
         "Total:",
-        table_title)
+        styles.table_title)
     curcol = itercol(
         ws,
         currow,
@@ -3503,21 +5043,21 @@ def stars_measure_summary(df, ws, startrow, startcol):
         columns['Weight'],
         df_temp["Weight"].where(
             df_temp["Weight"] != "").dropna().sum(),
-        table_title)
+        styles.table_title)
     curcol = itercol(
         ws,
         currow,
         curcol,
         columns['Denominator'],
         "",
-        table_title)
+        styles.table_title)
     curcol = itercol(
         ws,
         currow,
         curcol,
         columns['YTD Compliance'],
         "",
-        table_title)
+        styles.table_title)
     curcol = itercol(
         ws,
         currow,
@@ -3525,7 +5065,7 @@ def stars_measure_summary(df, ws, startrow, startcol):
         columns['Star Rating'],
         df_temp["trend_wt"].where(
             df_temp["trend_wt"] != "").dropna().sum(),
-        table_title)
+        styles.table_title)
     curcol = itercol(
         ws,
         currow,
@@ -3533,7 +5073,7 @@ def stars_measure_summary(df, ws, startrow, startcol):
         columns['Maximum Potential Star Rating'],
         df_temp["pot_trend_wt"].where(
             df_temp["pot_trend_wt"] != "").dropna().sum(),
-        table_title)
+        styles.table_title)
     curcol = itercol(
         ws,
         currow,
@@ -3541,7 +5081,7 @@ def stars_measure_summary(df, ws, startrow, startcol):
         columns['Weighted Points Not Earned'],
         df_temp["missing_points"].where(
             df_temp["missing_points"] != "").dropna().sum(),
-        table_title)
+        styles.table_title)
     #curcol = itercol(ws, currow, curcol, columns['Unearned Points Impact on Star Rating'], df_temp["adj_aggr_difference"].where(df_temp["adj_aggr_difference"]!="").dropna().sum(), table_title)
     # Left blank due to rounding error
     curcol = itercol(
@@ -3550,7 +5090,7 @@ def stars_measure_summary(df, ws, startrow, startcol):
         curcol,
         columns['Unearned Points Impact on Star Rating'],
         "",
-        table_title)
+        styles.table_title)
     curcol = itercol(
         ws,
         currow,
@@ -3563,10 +5103,11 @@ def stars_measure_summary(df, ws, startrow, startcol):
                 df_temp["Weight"] != "").dropna().sum() *
             100) /
         100,
-        table_title)
+        styles.table_title)
 
 
-def qb_practice_summary(ws, df, startrow=0, startcol=0):
+def qb_practice_summary(ws, df, startrow=0, startcol=0, styles=None):
+    styles = bound_styles(styles)
     print(df)
     df.sort_values(by=["practice_id2", "row"])
     print(df)
@@ -3582,7 +5123,7 @@ def qb_practice_summary(ws, df, startrow=0, startcol=0):
         startcol,
         1,
         "Practice ID",
-        headerwrap,
+        styles.headerwrap,
         endrow=startrow +
         4)
     curcol = itercol(
@@ -3591,7 +5132,7 @@ def qb_practice_summary(ws, df, startrow=0, startcol=0):
         curcol,
         4,
         "Practice Name",
-        headerwrap,
+        styles.headerwrap,
         endrow=startrow +
         4)
     curcol = itercol(
@@ -3600,7 +5141,7 @@ def qb_practice_summary(ws, df, startrow=0, startcol=0):
         curcol,
         1,
         "Attributed MA Members",
-        headerwrap_num,
+        styles.headerwrap_num,
         endrow=startrow + 4)
     curcol = itercol(
         ws,
@@ -3608,7 +5149,7 @@ def qb_practice_summary(ws, df, startrow=0, startcol=0):
         curcol,
         1,
         "Practice Star Rating",
-        headerwrap_num,
+        styles.headerwrap_num,
         endrow=startrow + 4)
 
     for i in range(0, len(measures)):
@@ -3618,7 +5159,7 @@ def qb_practice_summary(ws, df, startrow=0, startcol=0):
             curcol,
             7,
             measures["Measure"].values[i],
-            headerwrap_group,
+            styles.headerwrap_group,
             endrow=startrow + 3)
         ws.merge_range(
             startrow + 4,
@@ -3626,21 +5167,21 @@ def qb_practice_summary(ws, df, startrow=0, startcol=0):
             startrow + 4,
             curcol - 7,
             "Numerator",
-            header_num)
+            styles.header_num)
         ws.merge_range(
             startrow + 4,
             curcol - 6,
             startrow + 4,
             curcol - 5,
             "Denominator",
-            header_num)
+            styles.header_num)
         ws.merge_range(
             startrow + 4,
             curcol - 4,
             startrow + 4,
             curcol - 3,
             "Compliance",
-            header_num)
+            styles.header_num)
         ws.set_column(curcol - 8, curcol - 3, None, None,
                       {'level': 1, 'collapsed': True, 'hidden': True})
         ws.merge_range(
@@ -3649,7 +5190,7 @@ def qb_practice_summary(ws, df, startrow=0, startcol=0):
             startrow + 4,
             curcol - 1,
             "Star Rating",
-            header_num)
+            styles.header_num)
         currow = startrow + 5
 
     for j in range(0, len(practices)):
@@ -3661,29 +5202,29 @@ def qb_practice_summary(ws, df, startrow=0, startcol=0):
             startcol,
             1,
             practices["practice_id2"].values[j],
-            table_body)
+            styles.table_body)
         curcol = itercol(
             ws,
             currow,
             curcol,
             4,
             practices["Practice Name"].values[j],
-            table_body)
+            styles.table_body)
         curcol = itercol(
             ws,
             currow,
             curcol,
             1,
             practices["mbr_count"].values[j],
-            table_body)
+            styles.table_body)
         curcol = itercol(
             ws, currow, curcol, 1, practice_measures["aggr_star_rating"].values[0], na(
-                practice_measures["aggr_star_rating"].values[0], table_body_num2, table_body_na))
+                practice_measures["aggr_star_rating"].values[0], styles.table_body_num2, styles.table_body_na))
         for k in range(0, len(practice_measures)):
             if practice_measures["Measure Code"].values[k] in ['pcr', 'hpc']:
-                compliance_fmt = table_body_num2
+                compliance_fmt = styles.table_body_num2
             else:
-                compliance_fmt = table_body_pct
+                compliance_fmt = styles.table_body_pct
             if practice_measures["Measure Code"].values[k] in [
                     'cdc2', 'mah1a', 'mah2a', 'mah3a', 'hrm']:
                 numerator = "Gaps Addressed"
@@ -3693,2031 +5234,101 @@ def qb_practice_summary(ws, df, startrow=0, startcol=0):
                 numerator = "Numerator"
             curcol = itercol(
                 ws, currow, curcol, 1, practice_measures[numerator].values[k], na(
-                    practice_measures[numerator].values[k], table_body, table_body_na))
+                    practice_measures[numerator].values[k], styles.table_body, styles.table_body_na))
             curcol = itercol(
                 ws, currow, curcol, 1, practice_measures["Denominator"].values[k], na(
-                    practice_measures["Denominator"].values[k], table_body, table_body_na))
+                    practice_measures["Denominator"].values[k], styles.table_body, styles.table_body_na))
             curcol = itercol(
                 ws, currow, curcol, 1, practice_measures["compliance"].values[k], na(
-                    practice_measures["compliance"].values[k], compliance_fmt, table_body_na))
+                    practice_measures["compliance"].values[k], compliance_fmt, styles.table_body_na))
             curcol = itercol(
                 ws, currow, curcol, 1, practice_measures["Star Rating"].values[k], na(
                     practice_measures["Star Rating"].values[k], star_rating_fmt(
-                        practice_measures["Star Rating"].values[k]), table_body_na))
+                        practice_measures["Star Rating"].values[k], styles=styles), styles.table_body_na))
         currow = currow + 1
 
     # Doesnt currently work with merged cells
     #ws.autofilter(startrow+4, startcol, currow-1, curcol-1)
 
 
-def hosp03_detail(ws, df, startrow=0, startcol=0, hospital=False):
-    df = df.fillna("")
+def hosp03_detail(ws, df, startrow=0, startcol=0, hospital=False,
+                  styles=None, stream=False):
     print("HOSP03 DATAFRAME")
     print(df)
-    width = 20
-    length = len(df)
-    autostartcol = startcol
-    if hospital:
-        width = 22
-        ws.write(startrow + 2, startcol, "Hospital ID", header)
-        ws.set_column(startcol, startcol, 10)
-        ws.write(startrow + 2, startcol + 1, "Hospital Name", header)
-        ws.set_column(startcol + 1, startcol + 1, 30)
-        startcol = startcol + 2
+    render_detail(ws, df, 'hosp03', startrow, startcol, hospital=hospital,
+                  styles=styles, stream=stream)
 
-    ws.autofilter(
-        startrow + 2,
-        autostartcol,
-        startrow + 2 + length,
-        autostartcol + width)
-    ws.freeze_panes(startrow + 3, 0)
 
-    ws.merge_range(
-        startrow,
-        autostartcol,
-        startrow,
-        autostartcol + width,
-        cqmbenchmarks['hosp03']['title'],
-        table_title)
-    ws.write(startrow + 2, startcol, "Member Last Name  ", header)
-    ws.set_column(startcol, startcol, 20)
-    ws.write(startrow + 2, startcol + 1, "Member First Name  ", header)
-    ws.set_column(startcol + 1, startcol + 1, 20)
-    ws.write(startrow + 2, startcol + 2, "Birth Date  ", header)
-    ws.set_column(startcol + 2, startcol + 2, 10)
-    ws.write(startrow + 2, startcol + 3, "Unique Member ID  ", header)
-    ws.set_column(startcol + 3, startcol + 3, 20)
-    ws.write(startrow + 2, startcol + 4, "Product  ", header)
-    ws.set_column(startcol + 4, startcol + 4, 20)
+def hosp04_detail(ws, df, startrow=0, startcol=0, hospital=False,
+                  styles=None, stream=False):
+    print("HOSP04 DATAFRAME")
+    print(df)
+    render_detail(ws, df, 'hosp04', startrow, startcol, hospital=hospital,
+                  styles=styles, stream=stream)
 
-    ws.merge_range(
-        startrow + 1,
-        startcol + 5,
-        startrow + 1,
-        startcol + 9,
-        "Index Admission  ",
-        headerwrap_group)
-    ws.write(startrow + 2, startcol + 5, "Patient Number  ", header)
-    ws.set_column(startcol + 5, startcol + 5, 15)
-    ws.write(startrow + 2, startcol + 6, "Admission Date  ", header)
-    ws.set_column(startcol + 6, startcol + 6, 15)
-    ws.write(startrow + 2, startcol + 7, "Discharge Date  ", header)
-    ws.set_column(startcol + 7, startcol + 7, 15)
-    ws.write(startrow + 2, startcol + 8, "Claim Number  ", header)
-    ws.set_column(startcol + 8, startcol + 8, 20)
-    ws.write(startrow + 2, startcol + 9, "Type of Bill  ", header)
-    ws.set_column(startcol + 9, startcol + 9, 10)
 
-    ws.merge_range(
-        startrow + 1,
-        startcol + 10,
-        startrow + 1,
-        startcol + 16,
-        "Denominator Criteria  ",
-        headerwrap_group)
-    ws.write(startrow + 2, startcol + 10, "Description  ", header)
-    ws.set_column(startcol + 10, startcol + 10, 25)
-    ws.write(startrow + 2, startcol + 11, "Code  ", header)
-    ws.set_column(startcol + 11, startcol + 11, 6)
-    ws.write(startrow + 2, startcol + 12, "Service Date  ", header)
-    ws.set_column(startcol + 12, startcol + 12, 12)
-    ws.write(startrow + 2, startcol + 13, "Claim Number  ", header)
-    ws.set_column(startcol + 13, startcol + 13, 20)
-    ws.write(startrow + 2, startcol + 14, "Code  ", header)
-    ws.set_column(startcol + 14, startcol + 14, 6)
-    ws.write(startrow + 2, startcol + 15, "Service Date  ", header)
-    ws.set_column(startcol + 15, startcol + 15, 12)
-    ws.write(startrow + 2, startcol + 16, "Claim Number  ", header)
-    ws.set_column(startcol + 16, startcol + 16, 20)
+def hosp19_detail(ws, df, startrow=0, startcol=0, title='', hospital=False,
+                  styles=None, stream=False):
+    render_detail(ws, df, 'hosp19', startrow, startcol, title, hospital,
+                  styles, stream)
 
-    ws.merge_range(
-        startrow + 1,
-        startcol + 17,
-        startrow + 1,
-        startcol + 20,
-        "Numerator Criteria",
-        headerwrap_group)
-    ws.write(startrow + 2, startcol + 17, "AIS  ", header)
-    ws.set_column(startcol + 17, startcol + 17, 6)
-    ws.write(startrow + 2, startcol + 18, "Code  ", header)
-    ws.set_column(startcol + 18, startcol + 18, 6)
-    ws.write(startrow + 2, startcol + 19, "Service Date  ", header)
-    ws.set_column(startcol + 19, startcol + 19, 12)
-    ws.write(startrow + 2, startcol + 20, "Claim Number  ", header)
-    ws.set_column(startcol + 20, startcol + 20, 20)
-    ws.write(startrow + 2, startcol + 21, 'Numerator', header)
-    ws.set_column(startcol + 21, startcol + 2, None, None, {'hidden': 1})
-
-    currow = startrow + 3
-    for i in range(0, len(df)):
-        if hospital:
-            startcol = startcol - 2
-            curcol = itercol(
-                ws,
-                currow,
-                startcol,
-                0,
-                df['quality_blue_id'].values[i],
-                table_body)
-            curcol = itercol(
-                ws,
-                currow,
-                curcol,
-                0,
-                df['quality_blue_name'].values[i],
-                table_body)
-            startcol = startcol + 2
-        curcol = itercol(
-            ws,
-            currow,
-            startcol,
-            0,
-            df['EACM_LA_NM'].values[i],
-            table_body)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['EACM_FST_NM'].values[i],
-            table_body)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['EACM_BIR_DT'].values[i],
-            table_body_date2)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['EACAG_UNQ_MBR_ID'].values[i],
-            table_body_date)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['product'].values[i],
-            table_body_date)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['PRV_PAT_CL_NO'].values[i],
-            table_body)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['EAC_ADMM_DT'].values[i],
-            table_body_date2)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['EAC_DCG_DT'].values[i],
-            table_body_date2)
-        curcol = itercol(
-            ws, currow, curcol, 0, str(
-                df['EAC_SRCSY_ASND_CLM_NO'].values[i]), table_body)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['EACFBT_CD'].values[i],
-            table_body)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['description'].values[i],
-            table_body)
-        if df['description'].values[i] == "COPD/CF with O2":
-            ws.write(
-                currow,
-                startcol + 11,
-                df["dx2_code"].values[i],
-                table_body)
-            ws.write(
-                currow,
-                startcol + 12,
-                df["dx2_svce_dt"].values[i],
-                table_body_date2)
-            ws.write(
-                currow,
-                startcol + 13,
-                df["dx2_eac_srcsy_asnd_clm_no"].values[i],
-                table_body)
-            ws.write(
-                currow,
-                startcol + 14,
-                df["dx3_code"].values[i],
-                table_body)
-            ws.write(
-                currow,
-                startcol + 15,
-                df["dx3_svce_dt"].values[i],
-                table_body_date2)
-            ws.write(
-                currow,
-                startcol + 16,
-                df["dx3_eac_srcsy_asnd_clm_no"].values[i],
-                table_body)
-        elif df['description'].values[i] == "Substantial Risk of Death":
-            ws.write(
-                currow,
-                startcol + 11,
-                df["proc_code"].values[i],
-                table_body)
-            ws.write(
-                currow,
-                startcol + 12,
-                df["proc_svce_dt"].values[i],
-                table_body_date2)
-            ws.write(
-                currow,
-                startcol + 13,
-                df["proc_eac_srcsy_asnd_clm_no"].values[i],
-                table_body)
-            ws.write(currow, startcol + 14, "", table_body)
-            ws.write(currow, startcol + 15, "", table_body)
-            ws.write(currow, startcol + 16, "", table_body)
-        else:
-            ws.write(
-                currow,
-                startcol + 11,
-                df["dx_code"].values[i],
-                table_body)
-            ws.write(
-                currow,
-                startcol + 12,
-                df["dx_svce_dt"].values[i],
-                table_body_date2)
-            ws.write(
-                currow,
-                startcol + 13,
-                df["dx_eac_srcsy_asnd_clm_no"].values[i],
-                table_body)
-            ws.write(currow, startcol + 14, "", table_body)
-            ws.write(currow, startcol + 15, "", table_body)
-            ws.write(currow, startcol + 16, "", table_body)
-
-        if df['ais'].values[i] == 1:
-            ws.write(currow, startcol + 17, "Y", table_body)
-        else:
-            ws.write(currow, startcol + 17, "", table_body)
-
-        ws.write(
-            currow,
-            startcol + 18,
-            df["pall_care_code"].values[i],
-            table_body)
-        ws.write(
-            currow,
-            startcol + 19,
-            df["pall_care_svce_dt"].values[i],
-            table_body_date2)
-        ws.write(
-            currow,
-            startcol + 20,
-            df["pall_care_eac_srcsy_asnd_clm_no"].values[i],
-            table_body)
-        def num(int):
-            if int == 1:
-                return 1
-            else:
-                return ""
-
-        ws.write(
-            currow,
-            startcol + 21,
-            num(df["hosp03_num"].values[i]),
-            table_body)
-        currow = currow + 1
-
-
-
-def hosp04_detail(ws, df, startrow=0, startcol=0, hospital=False):
-    df = df.fillna("")
-    print("HOSP04 DATAFRAME")
-    print(df)
-    width = 20
-    length = len(df)
-    autostartcol = startcol
-    if hospital:
-        width = 22
-        ws.write(startrow + 2, startcol, "Hospital ID", header)
-        ws.set_column(startcol, startcol, 10)
-        ws.write(startrow + 2, startcol + 1, "Hospital Name", header)
-        ws.set_column(startcol + 1, startcol + 1, 30)
-        startcol = startcol + 2
-
-    ws.autofilter(
-        startrow + 2,
-        autostartcol,
-        startrow + 2 + length,
-        autostartcol + width)
-    ws.freeze_panes(startrow + 3, 0)
-
-    ws.merge_range(
-        startrow,
-        autostartcol,
-        startrow,
-        autostartcol + width,
-        cqmbenchmarks['hosp04']['title'],
-        table_title)
-    ws.write(startrow + 2, startcol, "Member Last Name  ", header)
-    ws.set_column(startcol, startcol, 20)
-    ws.write(startrow + 2, startcol + 1, "Member First Name  ", header)
-    ws.set_column(startcol + 1, startcol + 1, 20)
-    ws.write(startrow + 2, startcol + 2, "Birth Date  ", header)
-    ws.set_column(startcol + 2, startcol + 2, 10)
-    ws.write(startrow + 2, startcol + 3, "Unique Member ID  ", header)
-    ws.set_column(startcol + 3, startcol + 3, 20)
-    ws.write(startrow + 2, startcol + 4, "Product  ", header)
-    ws.set_column(startcol + 4, startcol + 4, 20)
-
-    ws.merge_range(
-        startrow + 1,
-        startcol + 5,
-        startrow + 1,
-        startcol + 9,
-        "Index Admission  ",
-        headerwrap_group)
-    ws.write(startrow + 2, startcol + 5, "Patient Number  ", header)
-    ws.set_column(startcol + 5, startcol + 5, 15)
-    ws.write(startrow + 2, startcol + 6, "Admission Date  ", header)
-    ws.set_column(startcol + 6, startcol + 6, 15)
-    ws.write(startrow + 2, startcol + 7, "Discharge Date  ", header)
-    ws.set_column(startcol + 7, startcol + 7, 15)
-    ws.write(startrow + 2, startcol + 8, "Claim Number  ", header)
-    ws.set_column(startcol + 8, startcol + 8, 20)
-    ws.write(startrow + 2, startcol + 9, "Type of Bill  ", header)
-    ws.set_column(startcol + 9, startcol + 9, 10)
-
-    ws.merge_range(
-        startrow + 1,
-        startcol + 10,
-        startrow + 1,
-        startcol + 16,
-        "Denominator Criteria  ",
-        headerwrap_group)
-    ws.write(startrow + 2, startcol + 10, "Description  ", header)
-    ws.set_column(startcol + 10, startcol + 10, 25)
-    ws.write(startrow + 2, startcol + 11, "Code  ", header)
-    ws.set_column(startcol + 11, startcol + 11, 6)
-    ws.write(startrow + 2, startcol + 12, "Service Date  ", header)
-    ws.set_column(startcol + 12, startcol + 12, 12)
-    ws.write(startrow + 2, startcol + 13, "Claim Number  ", header)
-    ws.set_column(startcol + 13, startcol + 13, 20)
-    ws.write(startrow + 2, startcol + 14, "Code  ", header)
-    ws.set_column(startcol + 14, startcol + 14, 6)
-    ws.write(startrow + 2, startcol + 15, "Service Date  ", header)
-    ws.set_column(startcol + 15, startcol + 15, 12)
-    ws.write(startrow + 2, startcol + 16, "Claim Number  ", header)
-    ws.set_column(startcol + 16, startcol + 16, 20)
-
-    ws.merge_range(
-        startrow + 1,
-        startcol + 17,
-        startrow + 1,
-        startcol + 20,
-        "Numerator Criteria",
-        headerwrap_group)
-    ws.write(startrow + 2, startcol + 17, "AIS  ", header)
-    ws.set_column(startcol + 17, startcol + 17, 6)
-    ws.write(startrow + 2, startcol + 18, "Code  ", header)
-    ws.set_column(startcol + 18, startcol + 18, 6)
-    ws.write(startrow + 2, startcol + 19, "Service Date  ", header)
-    ws.set_column(startcol + 19, startcol + 19, 12)
-    ws.write(startrow + 2, startcol + 20, "Claim Number  ", header)
-    ws.set_column(startcol + 20, startcol + 20, 20)
-    ws.write(startrow + 2, startcol + 21, 'Numerator', header)
-    ws.set_column(startcol + 21, startcol + 2, None, None, {'hidden': 1})
-
-    currow = startrow + 3
-    for i in range(0, len(df)):
-        if hospital:
-            startcol = startcol - 2
-            curcol = itercol(
-                ws,
-                currow,
-                startcol,
-                0,
-                df['quality_blue_id'].values[i],
-                table_body)
-            curcol = itercol(
-                ws,
-                currow,
-                curcol,
-                0,
-                df['quality_blue_name'].values[i],
-                table_body)
-            startcol = startcol + 2
-        curcol = itercol(
-            ws,
-            currow,
-            startcol,
-            0,
-            df['EACM_LA_NM'].values[i],
-            table_body)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['EACM_FST_NM'].values[i],
-            table_body)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['EACM_BIR_DT'].values[i],
-            table_body_date2)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['EACAG_UNQ_MBR_ID'].values[i],
-            table_body_date)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['product'].values[i],
-            table_body_date)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['PRV_PAT_CL_NO'].values[i],
-            table_body)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['EAC_ADMM_DT'].values[i],
-            table_body_date2)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['EAC_DCG_DT'].values[i],
-            table_body_date2)
-        curcol = itercol(
-            ws, currow, curcol, 0, str(
-                df['EAC_SRCSY_ASND_CLM_NO'].values[i]), table_body)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['EACFBT_CD'].values[i],
-            table_body)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['description'].values[i],
-            table_body)
-        if df['description'].values[i] == "COPD/CF with O2":
-            ws.write(
-                currow,
-                startcol + 11,
-                df["dx2_code"].values[i],
-                table_body)
-            ws.write(
-                currow,
-                startcol + 12,
-                df["dx2_svce_dt"].values[i],
-                table_body_date2)
-            ws.write(
-                currow,
-                startcol + 13,
-                df["dx2_eac_srcsy_asnd_clm_no"].values[i],
-                table_body)
-            ws.write(
-                currow,
-                startcol + 14,
-                df["dx3_code"].values[i],
-                table_body)
-            ws.write(
-                currow,
-                startcol + 15,
-                df["dx3_svce_dt"].values[i],
-                table_body_date2)
-            ws.write(
-                currow,
-                startcol + 16,
-                df["dx3_eac_srcsy_asnd_clm_no"].values[i],
-                table_body)
-        elif df['description'].values[i] == "Substantial Risk of Death":
-            ws.write(
-                currow,
-                startcol + 11,
-                df["proc_code"].values[i],
-                table_body)
-            ws.write(
-                currow,
-                startcol + 12,
-                df["proc_svce_dt"].values[i],
-                table_body_date2)
-            ws.write(
-                currow,
-                startcol + 13,
-                df["proc_eac_srcsy_asnd_clm_no"].values[i],
-                table_body)
-            ws.write(currow, startcol + 14, "", table_body)
-            ws.write(currow, startcol + 15, "", table_body)
-            ws.write(currow, startcol + 16, "", table_body)
-        else:
-            ws.write(
-                currow,
-                startcol + 11,
-                df["dx_code"].values[i],
-                table_body)
-            ws.write(
-                currow,
-                startcol + 12,
-                df["dx_svce_dt"].values[i],
-                table_body_date2)
-            ws.write(
-                currow,
-                startcol + 13,
-                df["dx_eac_srcsy_asnd_clm_no"].values[i],
-                table_body)
-            ws.write(currow, startcol + 14, "", table_body)
-            ws.write(currow, startcol + 15, "", table_body)
-            ws.write(currow, startcol + 16, "", table_body)
-
-        if df['ais'].values[i] == 1:
-            ws.write(currow, startcol + 17, "Y", table_body)
-        else:
-            ws.write(currow, startcol + 17, "", table_body)
-
-        ws.write(
-            currow,
-            startcol + 18,
-            df["pall_care_code"].values[i],
-            table_body)
-        ws.write(
-            currow,
-            startcol + 19,
-            df["pall_care_svce_dt"].values[i],
-            table_body_date2)
-        ws.write(
-            currow,
-            startcol + 20,
-            df["pall_care_eac_srcsy_asnd_clm_no"].values[i],
-            table_body)
-        def num(int):
-            if int == 1:
-                return 1
-            else:
-                return ""
-
-        ws.write(
-            currow,
-            startcol + 21,
-            num(df["hosp04_num"].values[i]),
-            table_body)
-        currow = currow + 1
-        
-        
-
-def hosp19_detail(ws, df, startrow=0, startcol=0, title='', hospital=False):
-    df = df.fillna("")
-    width = 11
-    length = len(df)
-    autostartcol = startcol
-    if hospital:
-        width = 13
-        ws.write(startrow + 2, startcol, "Hospital ID  ", header)
-        ws.set_column(startcol, startcol, 10)
-        ws.write(startrow + 2, startcol + 1, "Hospital Name  ", header)
-        ws.set_column(startcol + 1, startcol + 1, 30)
-        startcol = startcol + 2
-
-    ws.autofilter(
-        startrow + 2,
-        autostartcol,
-        startrow + 2 + length,
-        autostartcol + width)
-    ws.freeze_panes(startrow + 3, 0)
-
-    ws.merge_range(
-        startrow,
-        autostartcol,
-        startrow,
-        autostartcol +
-        width,
-        title,
-        table_title)
-    ws.write(startrow + 2, startcol, "Member Last Name  ", header)
-    ws.set_column(startcol, startcol, 20)
-    ws.write(startrow + 2, startcol + 1, "Member First Name  ", header)
-    ws.set_column(startcol + 1, startcol + 1, 20)
-    ws.write(startrow + 2, startcol + 2, "Birth Date  ", header)
-    ws.set_column(startcol + 2, startcol + 2, 10)
-    ws.write(startrow + 2, startcol + 3, "Unique Member ID  ", header)
-    ws.set_column(startcol + 3, startcol + 3, 20)
-    ws.write(startrow + 2, startcol + 4, "Product  ", header)
-    ws.set_column(startcol + 4, startcol + 4, 20)
-
-    ws.merge_range(
-        startrow + 1,
-        startcol + 5,
-        startrow + 1,
-        startcol + 9,
-        "Index ED Visit",
-        headerwrap_group)
-    ws.write(startrow + 2, startcol + 5, "Patient Number  ", header)
-    ws.set_column(startcol + 5, startcol + 5, 20)
-    ws.write(startrow + 2, startcol + 6, "Service Date  ", header)
-    ws.set_column(startcol + 6, startcol + 6, 10)
-    ws.write(startrow + 2, startcol + 7, "Claim Number  ", header)
-    ws.set_column(startcol + 7, startcol + 7, 15)
-    ws.write(startrow + 2, startcol + 8, "Diagnosis  ", header)
-    ws.set_column(startcol + 8, startcol + 8, 10)
-    ws.write(startrow + 2, startcol + 9, "Diagnosis Description  ", header)
-    ws.set_column(startcol + 9, startcol + 9, 100)
-
-    ws.merge_range(
-        startrow + 1,
-        startcol + 10,
-        startrow + 1,
-        startcol + 14,
-        "Return ED Visit  ",
-        headerwrap_group)
-    ws.write(startrow + 2, startcol + 10, "Service Date  ", header)
-    ws.set_column(startcol + 10, startcol + 10, 10)
-    ws.write(startrow + 2, startcol + 11, "Claim Number  ", header)
-    ws.set_column(startcol + 11, startcol + 11, 15)
-    ws.write(startrow + 2, startcol + 12, "Diagnosis  ", header)
-    ws.set_column(startcol + 12, startcol + 12, 10)
-    ws.write(startrow + 2, startcol + 13, "Diagnosis Description  ", header)
-    ws.set_column(startcol + 13, startcol + 13, 100)
-    ws.write(startrow + 2, startcol + 14, "Place of Capture  ", header)
-    ws.set_column(startcol + 14, startcol + 14, 35)
-
-    currow = startrow + 3
-    for i in range(0, len(df)):
-        if hospital:
-            startcol = startcol - 2
-            curcol = itercol(
-                ws,
-                currow,
-                startcol,
-                0,
-                df['quality_blue_id'].values[i],
-                table_body)
-            curcol = itercol(
-                ws,
-                currow,
-                curcol,
-                0,
-                df['quality_blue_name'].values[i],
-                table_body)
-            startcol = startcol + 2
-        curcol = itercol(
-            ws,
-            currow,
-            startcol,
-            0,
-            df['EACM_LA_NM'].values[i],
-            table_body)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['EACM_FST_NM'].values[i],
-            table_body)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['EACM_BIR_DT'].values[i],
-            table_body_date2)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['EACAG_UNQ_MBR_ID'].values[i],
-            table_body)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['product'].values[i],
-            table_body_date)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['PRV_PAT_CL_NO'].values[i],
-            table_body)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['SVCE_DT'].values[i],
-            table_body_date2)
-        curcol = itercol(
-            ws, currow, curcol, 0, str(
-                df['EAC_SRCSY_ASND_CLM_NO'].values[i]), table_body)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['PRI_DIAG_CD'].values[i],
-            table_body)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            str(
-                df['description_de'].values[i]), table_body)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['num_svce_dt'].values[i],
-            table_body_date2)
-        curcol = itercol(
-            ws, currow, curcol, 0, str(
-                df['num_claim'].values[i]), table_body)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['num_diag'].values[i],
-            table_body)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            str(
-                df['description_nu'].values[i]), table_body)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['num_provname'].values[i],
-            table_body)
-
-        currow = currow + 1
-
-
-def hosp21_detail(ws, df, startrow=0, startcol=0, hospital=False):
-    df = df.fillna("")
-    #print("hosp21 DATAFRAME")
-    # print(df)
-    width = 16
-    length = len(df)
-    autostartcol = startcol
-    if hospital:
-        width = 18
-        ws.write(startrow + 2, startcol, "Hospital ID  ", header)
-        ws.set_column(startcol, startcol, 10)
-        ws.write(startrow + 2, startcol + 1, "Hospital Name  ", header)
-        ws.set_column(startcol + 1, startcol + 1, 30)
-        startcol = startcol + 2
-
-    ws.autofilter(
-        startrow + 2,
-        autostartcol,
-        startrow + 2 + length,
-        autostartcol + width)
-    ws.freeze_panes(startrow + 3, 0)
-
-    ws.merge_range(
-        startrow,
-        autostartcol,
-        startrow,
-        autostartcol + width,
-        cqmbenchmarks['hosp21']['title'],
-        table_title)
-    ws.write(startrow + 2, startcol, "Member Last Name", header)
-    ws.set_column(startcol, startcol, 20)
-    ws.write(startrow + 2, startcol + 1, "Member First Name", header)
-    ws.set_column(startcol + 1, startcol + 1, 20)
-    ws.write(startrow + 2, startcol + 2, "Birth Date", header)
-    ws.set_column(startcol + 2, startcol + 2, 10)
-    ws.write(startrow + 2, startcol + 3, "Unique Member ID", header)
-    ws.set_column(startcol + 3, startcol + 3, 20)
-    ws.write(startrow + 2, startcol + 4, "Product", header)
-    ws.set_column(startcol + 4, startcol + 4, 20)
-
-    ws.merge_range(
-        startrow + 1,
-        startcol + 5,
-        startrow + 1,
-        startcol + 12,
-        "Index Admission",
-        headerwrap_group)
-    ws.write(startrow + 2, startcol + 5, "Patient Number", header)
-    ws.set_column(startcol + 5, startcol + 5, 15)
-    ws.write(startrow + 2, startcol + 6, "Admission Date", header)
-    ws.set_column(startcol + 6, startcol + 6, 10)
-    ws.write(startrow + 2, startcol + 7, "Discharge Date", header)
-    ws.set_column(startcol + 7, startcol + 7, 10)
-    ws.write(startrow + 2, startcol + 8, "Claim Number", header)
-    ws.set_column(startcol + 8, startcol + 8, 20)
-    ws.write(startrow + 2, startcol + 9, "Type of Bill", header)
-    ws.set_column(startcol + 9, startcol + 9, 10)
-    ws.write(startrow + 2, startcol + 10, "Description", header)
-    ws.set_column(startcol + 10, startcol + 10, 30)
-    ws.write(startrow + 2, startcol + 11, "DRG", header)
-    ws.set_column(startcol + 11, startcol + 11, 10)
-    ws.write(startrow + 2, startcol + 12, "Discharge Status", headerwrap)
-    ws.set_column(startcol + 12, startcol + 12, 10)
-    ws.set_row(startrow + 2, 30, headerwrap)
-    ws.merge_range(
-        startrow + 1,
-        startcol + 13,
-        startrow + 1,
-        startcol + 16,
-        "Follow-up Visit",
-        headerwrap_group)
-    ws.write(startrow + 2, startcol + 13, "Service Date", headerwrap)
-    ws.set_column(startcol + 13, startcol + 13, 10)
-    ws.write(startrow + 2, startcol + 14, "Claim Number", headerwrap)
-    ws.set_column(startcol + 14, startcol + 14, 20)
-    ws.write(startrow + 2, startcol + 15, "Description", header)
-    ws.set_column(startcol + 15, startcol + 15, 30)
-    ws.write(startrow + 2, startcol + 16, "Code", header)
-    ws.set_column(startcol + 16, startcol + 16, 15)
-
-    currow = startrow + 3
-    for i in range(0, len(df)):
-        if hospital:
-            startcol = startcol - 2
-            curcol = itercol(
-                ws,
-                currow,
-                startcol,
-                0,
-                df['quality_blue_id'].values[i],
-                table_body)
-            curcol = itercol(
-                ws,
-                currow,
-                curcol,
-                0,
-                df['quality_blue_name'].values[i],
-                table_body)
-            startcol = startcol + 2
-        curcol = itercol(
-            ws,
-            currow,
-            startcol,
-            0,
-            df['EACM_LA_NM'].values[i],
-            table_body)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['EACM_FST_NM'].values[i],
-            table_body)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['EACM_BIR_DT'].values[i],
-            table_body_date2)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['EACAG_UNQ_MBR_ID'].values[i],
-            table_body_date)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['product'].values[i],
-            table_body_date)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['PRV_PAT_CL_NO'].values[i],
-            table_body)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['EAC_ADMM_DT'].values[i],
-            table_body_date2)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['EAC_DCG_DT'].values[i],
-            table_body_date2)
-        curcol = itercol(
-            ws, currow, curcol, 0, str(
-                df['EAC_SRCSY_ASND_CLM_NO'].values[i]), table_body)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['EACFBT_CD'].values[i],
-            table_body)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['description'].values[i],
-            table_body)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['CMN_EACDRG_CD'].values[i],
-            table_body)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['EACDS_CD'].values[i],
-            table_body)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['follow_up_svce_dt'].values[i],
-            table_body_date2)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['follow_up_clm_no'].values[i],
-            table_body)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['follow_up_description'].values[i],
-            table_body)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['follow_up_proc_code'].values[i],
-            table_body)
-        currow = currow + 1
-
-
-def reads_detail(ws, df, startrow=0, startcol=0, title="", hospital=False):
-    df = df.fillna("")
-    #print("hosp21 DATAFRAME")
-    # print(df)
-    width = 12
-    length = len(df)
-    autostartcol = startcol
-    if hospital:
-        width = 14
-        ws.write(startrow + 2, startcol, "Hospital ID", header)
-        ws.set_column(startcol, startcol, 10)
-        ws.write(startrow + 2, startcol + 1, "Hospital Name", header)
-        ws.set_column(startcol + 1, startcol + 1, 30)
-        startcol = startcol + 2
-
-    ws.autofilter(
-        startrow + 2,
-        autostartcol,
-        startrow + 2 + length,
-        autostartcol + width)
-    ws.freeze_panes(startrow + 3, 0)
-
-    ws.merge_range(
-        startrow,
-        autostartcol,
-        startrow,
-        autostartcol +
-        width,
-        title,
-        table_title)
-    ws.write(startrow + 2, startcol, "Member Last Name", header)
-    ws.set_column(startcol, startcol, 20)
-    ws.write(startrow + 2, startcol + 1, "Member First Name", header)
-    ws.set_column(startcol + 1, startcol + 1, 20)
-    ws.write(startrow + 2, startcol + 2, "Birth Date", header)
-    ws.set_column(startcol + 2, startcol + 2, 10)
-    ws.write(startrow + 2, startcol + 3, "Unique Member ID", header)
-    ws.set_column(startcol + 3, startcol + 3, 20)
-    ws.write(startrow + 2, startcol + 4, "Product", header)
-    ws.set_column(startcol + 4, startcol + 4, 20)
-
-    ws.merge_range(
-        startrow + 1,
-        startcol + 5,
-        startrow + 1,
-        startcol + 11,
-        "Index Admission",
-        headerwrap_group)
-    ws.write(startrow + 2, startcol + 5, "Patient Number", header)
-    ws.set_column(startcol + 5, startcol + 5, 15)
-    ws.write(startrow + 2, startcol + 6, "Admission Date", header)
-    ws.set_column(startcol + 6, startcol + 6, 10)
-    ws.write(startrow + 2, startcol + 7, "IESD  ", header)
-    ws.set_column(startcol + 7, startcol + 7, 10)
-    ws.write(startrow + 2, startcol + 8, "Diagnosis", header)
-    ws.set_column(startcol + 8, startcol + 8, 10)
-    ws.write(startrow + 2, startcol + 9, "Description", headerwrap)
-    ws.set_column(startcol + 9, startcol + 9, 100)
-    ws.write(startrow + 2, startcol + 10, "MDC Description", headerwrap)
-    ws.set_column(startcol + 10, startcol + 10, 100)
-    ws.write(startrow + 2, startcol + 11, "DRG Description", headerwrap)
-    ws.set_column(startcol + 11, startcol + 11, 100)
-
-    ws.set_row(startrow + 2, 30, headerwrap)
-    ws.merge_range(
-        startrow + 1,
-        startcol + 12,
-        startrow + 1,
-        startcol + 15,
-        "Readmission",
-        headerwrap_group)
-    ws.write(startrow + 2, startcol + 12, "Date", headerwrap)
-    ws.set_column(startcol + 12, startcol + 12, 10)
-    ws.write(startrow + 2, startcol + 13, "Diagnosis", headerwrap)
-    ws.set_column(startcol + 13, startcol + 13, 10)
-    ws.write(startrow + 2, startcol + 14, "Description", headerwrap)
-    ws.set_column(startcol + 14, startcol + 14, 100)
-    ws.write(startrow + 2, startcol + 15, "Place of Capture", headerwrap)
-    ws.set_column(startcol + 15, startcol + 15, 35)
-
-    currow = startrow + 3
-    for i in range(0, len(df)):
-        if hospital:
-            startcol = startcol - 2
-            curcol = itercol(
-                ws,
-                currow,
-                startcol,
-                0,
-                df['quality_blue_id'].values[i],
-                table_body)
-            curcol = itercol(
-                ws,
-                currow,
-                curcol,
-                0,
-                df['quality_blue_name'].values[i],
-                table_body)
-            startcol = startcol + 2
-        curcol = itercol(
-            ws,
-            currow,
-            startcol,
-            0,
-            df['MEM_LNAME'].values[i],
-            table_body)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['MEM_FNAME'].values[i],
-            table_body)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['eacm_bir_dt'].values[i],
-            table_body_date2)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['UMI'].values[i],
-            table_body)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['product'].values[i],
-            table_body)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['PCN'].values[i],
-            table_body)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['ADM_DT2'].values[i],
-            table_body_date2)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['IESD2'].values[i],
-            table_body_date2)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['DIAG_I_1'].values[i],
-            table_body)
-        curcol = itercol(ws, currow, curcol, 0, str(
-            df['dx_description'].values[i]), table_body)
-        curcol = itercol(ws, currow, curcol, 0, str(
-            df['MDC_Description'].values[i]), table_body)
-        curcol = itercol(ws, currow, curcol, 0, str(
-            df['DRG_Description'].values[i]), table_body)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['READMITDATE30'].values[i],
-            table_body_date2)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['DIAG_I_1_30'].values[i],
-            table_body)
-        curcol = itercol(
-            ws, 
-            currow, 
-            curcol, 
-            0, 
-            str(
-                df['dx_30_description'].values[i]), table_body)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['PRV_NM30readmit'].values[i],
-            table_body)
-        #curcol = itercol(ws, currow, curcol, 0, df['PROV_NBR30readmit'].values[i], table_body)
-        #curcol = itercol(ws, currow, curcol, 0, df['PRV_NM30readmit'].values[i], table_body)
-        # df['dx_30_description'].values[i]
-        currow = currow + 1
-
-def hosp22_detail(ws, df, startrow=0, startcol=0, hospital=False):
-    df = df.fillna("")
-    print("HOSP22 DATAFRAME")
-    print(df)
-    width = 8
-    length = len(df)
-    autostartcol = startcol
-    if hospital:
-        width = 8
-        ws.write(startrow + 2, startcol, "Hospital ID", header)
-        ws.set_column(startcol, startcol, 10)
-        ws.write(startrow + 2, startcol + 1, "Hospital Name", header)
-        ws.set_column(startcol + 1, startcol + 1, 30)
-        startcol = startcol + 2
-
-    ws.autofilter(
-        startrow + 2,
-        autostartcol,
-        startrow + 2 + length,
-        autostartcol + width)
-    ws.freeze_panes(startrow + 3, 0)
-
-    ws.merge_range(
-        startrow,
-        autostartcol,
-        startrow,
-        autostartcol + width,
-        cqmbenchmarks['hosp22']['title'],
-        table_title)
-    ws.write(startrow + 2, startcol, "Member Last Name  ", header)
-    ws.set_column(startcol, startcol, 20)
-    ws.write(startrow + 2, startcol + 1, "Member First Name  ", header)
-    ws.set_column(startcol + 1, startcol + 1, 20)
-    ws.write(startrow + 2, startcol + 2, "Birth Date  ", header)
-    ws.set_column(startcol + 2, startcol + 2, 10)
-    ws.write(startrow + 2, startcol + 3, "Unique Member ID  ", header)
-    ws.set_column(startcol + 3, startcol + 3, 20)
-    ws.write(startrow + 2, startcol + 4, "Product  ", header)
-    ws.set_column(startcol + 4, startcol + 4, 20)
-
-    ws.merge_range(
-        startrow + 1,
-        startcol + 5,
-        startrow + 1,
-        startcol + 7,
-        "Denominator Criteria",
-        headerwrap_group)
-    ws.write(startrow + 2, startcol + 5, "Patient Number  ", header)
-    ws.set_column(startcol + 5, startcol + 5, 15)
-    ws.write(startrow + 2, startcol + 6, "Service Date  ", header)
-    ws.set_column(startcol + 6, startcol + 6, 15)
-    ws.write(startrow + 2, startcol + 7, "Claim Number  ", header)
-    ws.set_column(startcol + 7, startcol + 7, 20)
-
-    ws.write(startrow + 1, startcol + 8, "Numerator Criteria", header)
-    ws.set_column(startcol + 8, startcol + 8, 20)
-    ws.write(startrow + 2, startcol + 8, "Indicator", header)
-    ws.set_column(startcol + 8, startcol + 8, 20)
-    
-    currow = startrow + 3
-    for i in range(0, len(df)):
-        if hospital:
-            startcol = startcol - 2
-            curcol = itercol(
-                ws,
-                currow,
-                startcol,
-                0,
-                df['quality_blue_id'].values[i],
-                table_body)
-            curcol = itercol(
-                ws,
-                currow,
-                curcol,
-                0,
-                df['quality_blue_name'].values[i],
-                table_body)
-            startcol = startcol + 2
-        curcol = itercol(
-            ws,
-            currow,
-            startcol,
-            0,
-            df['EACM_LA_NM'].values[i],
-            table_body)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['EACM_FST_NM'].values[i],
-            table_body)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['EACM_BIR_DT'].values[i],
-            table_body_date2)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['EACAG_UNQ_MBR_ID'].values[i],
-            table_body_date)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['product'].values[i],
-            table_body_date)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['PRV_PAT_CL_NO'].values[i],
-            table_body)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['svce_dt'].values[i],
-            table_body_date2)
-        curcol = itercol(
-            ws, currow, curcol, 0, str(
-                df['EAC_SRCSY_ASND_CLM_NO'].values[i]), table_body)
-
-        def num(int):
-            if int == 1:
-                return 1
-            else:
-                return ""
-
-        ws.write(
-            currow,
-            startcol + 8,
-            num(df["hosp22_num"].values[i]),
-            table_body)
-        currow = currow + 1
-
-
-def hosp23_detail(ws, df, startrow=0, startcol=0, hospital=False):
-    df = df.fillna("")
-    print("HOSP23 DATAFRAME")
-    print(df)
-    width = 8
-    length = len(df)
-    autostartcol = startcol
-    if hospital:
-        width = 8
-        ws.write(startrow + 2, startcol, "Hospital ID", header)
-        ws.set_column(startcol, startcol, 10)
-        ws.write(startrow + 2, startcol + 1, "Hospital Name", header)
-        ws.set_column(startcol + 1, startcol + 1, 30)
-        startcol = startcol + 2
-
-    ws.autofilter(
-        startrow + 2,
-        autostartcol,
-        startrow + 2 + length,
-        autostartcol + width)
-    ws.freeze_panes(startrow + 3, 0)
-
-    ws.merge_range(
-        startrow,
-        autostartcol,
-        startrow,
-        autostartcol + width,
-        cqmbenchmarks['hosp23']['title'],
-        table_title)
-    ws.write(startrow + 2, startcol, "Member Last Name  ", header)
-    ws.set_column(startcol, startcol, 20)
-    ws.write(startrow + 2, startcol + 1, "Member First Name  ", header)
-    ws.set_column(startcol + 1, startcol + 1, 20)
-    ws.write(startrow + 2, startcol + 2, "Birth Date  ", header)
-    ws.set_column(startcol + 2, startcol + 2, 10)
-    ws.write(startrow + 2, startcol + 3, "Unique Member ID  ", header)
-    ws.set_column(startcol + 3, startcol + 3, 20)
-    ws.write(startrow + 2, startcol + 4, "Product  ", header)
-    ws.set_column(startcol + 4, startcol + 4, 20)
-
-    ws.merge_range(
-        startrow + 1,
-        startcol + 5,
-        startrow + 1,
-        startcol + 7,
-        "Denominator Criteria",
-        headerwrap_group)
-    ws.write(startrow + 2, startcol + 5, "Patient Number  ", header)
-    ws.set_column(startcol + 5, startcol + 5, 15)
-    ws.write(startrow + 2, startcol + 6, "Service Date  ", header)
-    ws.set_column(startcol + 6, startcol + 6, 15)
-    ws.write(startrow + 2, startcol + 7, "Claim Number  ", header)
-    ws.set_column(startcol + 7, startcol + 7, 20)
-
-    ws.write(startrow + 1, startcol + 8, "Numerator Criteria", header)
-    ws.set_column(startcol + 8, startcol + 8, 20)
-    ws.write(startrow + 2, startcol + 8, "Indicator", header)
-    ws.set_column(startcol + 8, startcol + 8, 20)
-    
-    currow = startrow + 3
-    for i in range(0, len(df)):
-        if hospital:
-            startcol = startcol - 2
-            curcol = itercol(
-                ws,
-                currow,
-                startcol,
-                0,
-                df['quality_blue_id'].values[i],
-                table_body)
-            curcol = itercol(
-                ws,
-                currow,
-                curcol,
-                0,
-                df['quality_blue_name'].values[i],
-                table_body)
-            startcol = startcol + 2
-        curcol = itercol(
-            ws,
-            currow,
-            startcol,
-            0,
-            df['EACM_LA_NM'].values[i],
-            table_body)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['EACM_FST_NM'].values[i],
-            table_body)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['EACM_BIR_DT'].values[i],
-            table_body_date2)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['EACAG_UNQ_MBR_ID'].values[i],
-            table_body_date)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['product'].values[i],
-            table_body_date)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['PRV_PAT_CL_NO'].values[i],
-            table_body)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['svce_dt'].values[i],
-            table_body_date2)
-        curcol = itercol(
-            ws, currow, curcol, 0, str(
-                df['EAC_SRCSY_ASND_CLM_NO'].values[i]), table_body)
-
-        def num(int):
-            if int == 1:
-                return 1
-            else:
-                return ""
-
-        ws.write(
-            currow,
-            startcol + 8,
-            num(df["hosp23_num"].values[i]),
-            table_body)
-        currow = currow + 1
-
-
-def hosp24_detail(ws, df, startrow=0, startcol=0, hospital=False):
-    df = df.fillna("")
-    print("HOSP24 DATAFRAME")
-    print(df)
-    width = 8
-    length = len(df)
-    autostartcol = startcol
-    if hospital:
-        width = 8
-        ws.write(startrow + 2, startcol, "Hospital ID", header)
-        ws.set_column(startcol, startcol, 10)
-        ws.write(startrow + 2, startcol + 1, "Hospital Name", header)
-        ws.set_column(startcol + 1, startcol + 1, 30)
-        startcol = startcol + 2
-
-    ws.autofilter(
-        startrow + 2,
-        autostartcol,
-        startrow + 2 + length,
-        autostartcol + width)
-    ws.freeze_panes(startrow + 3, 0)
-
-    ws.merge_range(
-        startrow,
-        autostartcol,
-        startrow,
-        autostartcol + width,
-        cqmbenchmarks['hosp24']['title'],
-        table_title)
-    ws.write(startrow + 2, startcol, "Member Last Name  ", header)
-    ws.set_column(startcol, startcol, 20)
-    ws.write(startrow + 2, startcol + 1, "Member First Name  ", header)
-    ws.set_column(startcol + 1, startcol + 1, 20)
-    ws.write(startrow + 2, startcol + 2, "Birth Date  ", header)
-    ws.set_column(startcol + 2, startcol + 2, 10)
-    ws.write(startrow + 2, startcol + 3, "Unique Member ID  ", header)
-    ws.set_column(startcol + 3, startcol + 3, 20)
-    ws.write(startrow + 2, startcol + 4, "Product  ", header)
-    ws.set_column(startcol + 4, startcol + 4, 20)
-
-    ws.merge_range(
-        startrow + 1,
-        startcol + 5,
-        startrow + 1,
-        startcol + 7,
-        "Denominator Criteria",
-        headerwrap_group)
-    ws.write(startrow + 2, startcol + 5, "Patient Number  ", header)
-    ws.set_column(startcol + 5, startcol + 5, 15)
-    ws.write(startrow + 2, startcol + 6, "Service Date  ", header)
-    ws.set_column(startcol + 6, startcol + 6, 15)
-    ws.write(startrow + 2, startcol + 7, "Claim Number  ", header)
-    ws.set_column(startcol + 7, startcol + 7, 20)
-
-    ws.write(startrow + 1, startcol + 8, "Numerator Criteria", header)
-    ws.set_column(startcol + 8, startcol + 8, 20)
-    ws.write(startrow + 2, startcol + 8, "Indicator", header)
-    ws.set_column(startcol + 8, startcol + 8, 20)
-    
-    currow = startrow + 3
-    for i in range(0, len(df)):
-        if hospital:
-            startcol = startcol - 2
-            curcol = itercol(
-                ws,
-                currow,
-                startcol,
-                0,
-                df['quality_blue_id'].values[i],
-                table_body)
-            curcol = itercol(
-                ws,
-                currow,
-                curcol,
-                0,
-                df['quality_blue_name'].values[i],
-                table_body)
-            startcol = startcol + 2
-        curcol = itercol(
-            ws,
-            currow,
-            startcol,
-            0,
-            df['EACM_LA_NM'].values[i],
-            table_body)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['EACM_FST_NM'].values[i],
-            table_body)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['EACM_BIR_DT'].values[i],
-            table_body_date2)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['EACAG_UNQ_MBR_ID'].values[i],
-            table_body_date)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['product'].values[i],
-            table_body_date)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['PRV_PAT_CL_NO'].values[i],
-            table_body)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['svce_dt'].values[i],
-            table_body_date2)
-        curcol = itercol(
-            ws, currow, curcol, 0, str(
-                df['EAC_SRCSY_ASND_CLM_NO'].values[i]), table_body)
-        def num(int):
-            if int == 1:
-                return 1
-            else:
-                return ""
-
-        ws.write(
-            currow,
-            startcol + 8,
-            num(df["hosp24_num"].values[i]),
-            table_body)
-        currow = currow + 1
-
-
-
-def cqm_mbr_detail(ws, df, startrow=0, startcol=0):
-    df = df.fillna("")
-    #print("hosp21 DATAFRAME")
-    # print(df)
-    width = 28
-    length = len(df)
-    autostartcol = startcol
-
-    ws.autofilter(
-        startrow + 2,
-        autostartcol,
-        startrow + 2 + length,
-        autostartcol + width)
-    ws.freeze_panes(startrow + 3, 0)
-
-    ws.merge_range(
-        startrow,
-        autostartcol,
-        startrow,
-        autostartcol +
-        width,
-        "MEMBER SUMMARY",
-        table_title)
-    ws.write(startrow + 2, startcol, "Practice ID", header)
-    ws.set_column(startcol, startcol, 12)
-    ws.write(startrow + 2, startcol + 1, "Practice Name", header)
-    ws.set_column(startcol + 1, startcol + 1, 30)
-    ws.write(startrow + 2, startcol + 2, "Physician NPI", header)
-    ws.set_column(startcol + 2, startcol + 2, 15)
-    ws.write(startrow + 2, startcol + 3, "Physician Name", header)
-    ws.set_column(startcol + 3, startcol + 3, 30)
-    ws.write(startrow + 2, startcol + 4, "Member Last Name", header)
-    ws.set_column(startcol + 4, startcol + 4, 20)
-    ws.write(startrow + 2, startcol + 5, "Member First Name", header)
-    ws.set_column(startcol + 5, startcol + 5, 20)
-    ws.write(startrow + 2, startcol + 6, "Birth Date", header)
-    ws.set_column(startcol + 6, startcol + 6, 10)
-    ws.write(startrow + 2, startcol + 7, "Unique Member ID", header)
-    ws.set_column(startcol + 7, startcol + 7, 20)
-
-    ws.set_column(startcol + 4, startcol + 27, 27)
-    ws.merge_range(
-        startrow + 1,
-        startcol + 8,
-        startrow + 1,
-        startcol + 9,
-        cqmbenchmarks['hosp03']['title'],
-        headerwrap_group)
-    ws.write(startrow + 2, startcol + 8, "Denominator  ", header_center)
-    ws.write(startrow + 2, startcol + 9, "Numerator  ", header_center)
-
-    ws.merge_range(
-        startrow + 1,
-        startcol + 10,
-        startrow + 1,
-        startcol + 11,
-        cqmbenchmarks['hosp04']['title'],
-        headerwrap_group)
-    ws.write(startrow + 2, startcol + 10, "Denominator  ", header_center)
-    ws.write(startrow + 2, startcol + 11, "Numerator  ", header_center)
 
-    ws.merge_range(
-        startrow + 1,
-        startcol + 12,
-        startrow + 1,
-        startcol + 13,
-        cqmbenchmarks['hosp19']['title'],
-        headerwrap_group)
-    ws.write(startrow + 2, startcol + 12, "Denominator  ", header_center)
-    ws.write(startrow + 2, startcol + 13, "Numerator  ", header_center)
-
-    ws.merge_range(
-        startrow + 1,
-        startcol + 14,
-        startrow + 1,
-        startcol + 15,
-        cqmbenchmarks['hosp20']['title'],
-        headerwrap_group)
-    ws.write(startrow + 2, startcol + 14, "Denominator  ", header_center)
-    ws.write(startrow + 2, startcol + 15, "Numerator  ", header_center)
-
-    ws.merge_range(
-        startrow + 1,
-        startcol + 16,
-        startrow + 1,
-        startcol + 17,
-        cqmbenchmarks['rrama']['title'],
-        headerwrap_group)
-    ws.write(startrow + 2, startcol + 16, "Denominator  ", header_center)
-    ws.write(startrow + 2, startcol + 17, "Numerator  ", header_center)
-
-    ws.merge_range(
-        startrow + 1,
-        startcol + 18,
-        startrow + 1,
-        startcol + 19,
-        cqmbenchmarks['rracomm']['title'],
-        headerwrap_group)
-    ws.write(startrow + 2, startcol + 18, "Denominator  ", header_center)
-    ws.write(startrow + 2, startcol + 19, "Numerator  ", header_center)
-
-    ws.merge_range(
-        startrow + 1,
-        startcol + 20,
-        startrow + 1,
-        startcol + 21,
-        cqmbenchmarks['hosp21']['title'],
-        headerwrap_group)
-    ws.write(startrow + 2, startcol + 20, "Denominator  ", header_center)
-    ws.write(startrow + 2, startcol + 21, "Numerator  ", header_center)
-    
-
-    ws.merge_range(
-        startrow + 1,
-        startcol + 22,
-        startrow + 1,
-        startcol + 23,
-        cqmbenchmarks['hosp22']['title'],
-        headerwrap_group)
-    ws.write(startrow + 2, startcol + 22, "Denominator  ", header_center)
-    ws.write(startrow + 2, startcol + 23, "Numerator  ", header_center)
-
-    ws.merge_range(
-        startrow + 1,
-        startcol + 24,
-        startrow + 1,
-        startcol + 25,
-        cqmbenchmarks['hosp23']['title'],
-        headerwrap_group)
-    ws.write(startrow + 2, startcol + 24, "Denominator  ", header_center)
-    ws.write(startrow + 2, startcol + 25, "Numerator  ", header_center)
-
-    ws.merge_range(
-        startrow + 1,
-        startcol + 26,
-        startrow + 1,
-        startcol + 27,
-        cqmbenchmarks['hosp24']['title'],
-        headerwrap_group)
-    ws.write(startrow + 2, startcol + 26, "Denominator  ", header_center)
-    ws.write(startrow + 2, startcol + 27, "Numerator  ", header_center)
+def hosp21_detail(ws, df, startrow=0, startcol=0, hospital=False,
+                  styles=None, stream=False):
+    render_detail(ws, df, 'hosp21', startrow, startcol, hospital=hospital,
+                  styles=styles, stream=stream)
 
-    ws.write(startrow + 2, startcol + 28, "Last PCP Office Visit  ", header_center)
-    ws.set_column(startcol + 28, startcol + 28, 25)
 
-    currow = startrow + 3
-    for i in range(0, len(df)):
-        curcol = itercol(
-            ws,
-            currow,
-            startcol,
-            0,
-            df['practice_id'].values[i],
-            table_body)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['practice_name'].values[i],
-            table_body)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['physician_npi'].values[i],
-            table_body)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['physician_name'].values[i],
-            table_body)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['mbr_last_nm'].values[i],
-            table_body)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['mbr_frst_nm'].values[i],
-            table_body)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['mbr_bir_dt'].values[i],
-            table_body_date2)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['umi'].values[i],
-            table_body)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['hosp03_den'].values[i],
-            table_body_center)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['hosp03_num'].values[i],
-            table_body_center)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['hosp04_den'].values[i],
-            table_body_center)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['hosp04_num'].values[i],
-            table_body_center)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['hosp19_den'].values[i],
-            table_body_center)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['hosp19_num'].values[i],
-            table_body_center)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['hosp20_den'].values[i],
-            table_body_center)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['hosp20_num'].values[i],
-            table_body_center)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['rrama_den'].values[i],
-            table_body_center)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['rrama_num'].values[i],
-            table_body_center)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['rracomm_den'].values[i],
-            table_body_center)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['rracomm_num'].values[i],
-            table_body_center)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['hosp21_den'].values[i],
-            table_body_center)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['hosp21_num'].values[i],
-            table_body_center)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['hosp22_den'].values[i],
-            table_body_center)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['hosp22_num'].values[i],
-            table_body_center)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['hosp23_den'].values[i],
-            table_body_center)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['hosp23_num'].values[i],
-            table_body_center)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['hosp24_den'].values[i],
-            table_body_center)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['hosp24_num'].values[i],
-            table_body_center)
-        curcol = itercol(
-            ws,
-            currow,
-            curcol,
-            0,
-            df['LAST_PCP_VISIT_DATE'].values[i],
-            table_body_date2)
+def reads_detail(ws, df, startrow=0, startcol=0, title="", hospital=False,
+                 styles=None, stream=False):
+    render_detail(ws, df, 'reads', startrow, startcol, title, hospital,
+                  styles, stream)
 
-        currow = currow + 1
 
+def hosp22_detail(ws, df, startrow=0, startcol=0, hospital=False,
+                  styles=None, stream=False):
+    print("HOSP22 DATAFRAME")
+    print(df)
+    render_detail(ws, df, 'hosp22', startrow, startcol, hospital=hospital,
+                  styles=styles, stream=stream)
 
 
+def hosp23_detail(ws, df, startrow=0, startcol=0, hospital=False,
+                  styles=None, stream=False):
+    print("HOSP23 DATAFRAME")
+    print(df)
+    render_detail(ws, df, 'hosp23', startrow, startcol, hospital=hospital,
+                  styles=styles, stream=stream)
 
 
-def cqmtable(worksheet, startrow, df):
-    worksheet.merge_range(startrow,0,startrow,9,'CLINICAL QUALITY METRICS',table_title)
-    worksheet.merge_range(startrow + 1,0,startrow + 1,5,'Clinical Quality Metric',header)
-    worksheet.write(startrow + 1, 6, 'Rate', header_num)
-    worksheet.write(startrow + 1, 7, 'Earned', header_num)
-    worksheet.merge_range(startrow + 1,8,startrow + 1,9,'Available',header_num)
-    worksheet.merge_range(startrow,11,startrow,18,'THRESHOLDS',table_title)
-    worksheet.write(startrow + 1, 11, 'Max', header_num)
-    worksheet.merge_range(startrow + 1,12,startrow + 1,13,'Points',header_num)
-    worksheet.write(startrow + 1, 14, 'Mid', header_num)
-    worksheet.merge_range(startrow + 1,15,startrow + 1,16,'Points',header_num)
-    worksheet.write(startrow + 1, 17, 'Min', header_num)
-    worksheet.merge_range(startrow + 1,18,startrow + 1,19,'Points',header_num)
+def hosp24_detail(ws, df, startrow=0, startcol=0, hospital=False,
+                  styles=None, stream=False):
+    print("HOSP24 DATAFRAME")
+    print(df)
+    render_detail(ws, df, 'hosp24', startrow, startcol, hospital=hospital,
+                  styles=styles, stream=stream)
+
+
+def cqm_mbr_detail(ws, df, startrow=0, startcol=0, styles=None,
+                   stream=False):
+    render_detail(ws, df, 'cqm_mbr_detail', startrow, startcol,
+                  styles=styles, stream=stream)
+
+
+def cqmtable(worksheet, startrow, df, styles=None):
+    styles = bound_styles(styles)
+    worksheet.merge_range(startrow,0,startrow,9,'CLINICAL QUALITY METRICS',styles.table_title)
+    worksheet.merge_range(startrow + 1,0,startrow + 1,5,'Clinical Quality Metric',styles.header)
+    worksheet.write(startrow + 1, 6, 'Rate', styles.header_num)
+    worksheet.write(startrow + 1, 7, 'Earned', styles.header_num)
+    worksheet.merge_range(startrow + 1,8,startrow + 1,9,'Available',styles.header_num)
+    worksheet.merge_range(startrow,11,startrow,18,'THRESHOLDS',styles.table_title)
+    worksheet.write(startrow + 1, 11, 'Max', styles.header_num)
+    worksheet.merge_range(startrow + 1,12,startrow + 1,13,'Points',styles.header_num)
+    worksheet.write(startrow + 1, 14, 'Mid', styles.header_num)
+    worksheet.merge_range(startrow + 1,15,startrow + 1,16,'Points',styles.header_num)
+    worksheet.write(startrow + 1, 17, 'Min', styles.header_num)
+    worksheet.merge_range(startrow + 1,18,startrow + 1,19,'Points',styles.header_num)
 
     # Function to create the rows for Clinical Quality Metrics, otherwise this
     # code would be repetitive
@@ -5774,21 +5385,21 @@ def cqmtable(worksheet, startrow, df):
         elif maxpoints < midpoints:
             gtlt = u'\u2264'
 
-        worksheet.merge_range(row, 0, row, 5, metric, table_body)
+        worksheet.merge_range(row, 0, row, 5, metric, styles.table_body)
         print("***************************PRINT # if points == 0 and available != 0:**********************")
         print("***************************PRINT # if points == 0 and available != 0:**********************")
         print("***************************PRINT # if points == 0 and available != 0:**********************")
         if points == 0 and available != 0:
-            worksheet.write(row, 6, rate, table_body_pct2_red)
-            worksheet.write(row, 7, points, table_body_num2)
-            worksheet.merge_range(row, 8, row, 9, available, table_body)
+            worksheet.write(row, 6, rate, styles.table_body_pct2_red)
+            worksheet.write(row, 7, points, styles.table_body_num2)
+            worksheet.merge_range(row, 8, row, 9, available, styles.table_body)
         else:
             print("********************WITHIN ELSE points == 0 and available != 0:**************************************")
             print("********************WITHIN ELSE points == 0 and available != 0:**************************************")
             print("********************WITHIN ELSE points == 0 and available != 0:**************************************")
-            worksheet.write(row, 6, rate, table_body_pct2)
-            worksheet.write(row, 7, points, table_body_num2)
-            worksheet.merge_range(row, 8, row, 9, available, table_body)
+            worksheet.write(row, 6, rate, styles.table_body_pct2)
+            worksheet.write(row, 7, points, styles.table_body_num2)
+            worksheet.merge_range(row, 8, row, 9, available, styles.table_body)
         print("***************************PRINT # if points == 0 and available != 0:22222**********************")
         print("***************************PRINT # if points == 0 and available != 0:22222**********************")
         print("***************************PRINT # if points == 0 and available != 0:22222**********************")
@@ -5796,33 +5407,33 @@ def cqmtable(worksheet, startrow, df):
         print(available)
         print(maxpoints)
         if points == available and available != 0:
-            worksheet.write(row, 6, rate, table_body_pct2_green)
-            worksheet.write(row,11,gtlt + '{:.2%}'.format(maxpoints),table_body_pct2_green)
-            worksheet.merge_range(row,12,row,13,str(available) + " Points",table_body_pct2_green)
+            worksheet.write(row, 6, rate, styles.table_body_pct2_green)
+            worksheet.write(row,11,gtlt + '{:.2%}'.format(maxpoints),styles.table_body_pct2_green)
+            worksheet.merge_range(row,12,row,13,str(available) + " Points",styles.table_body_pct2_green)
         else:
             print("********************WITHIN ELSE points == 0 and available != 0:22222**************************************")
             print("********************WITHIN ELSE points == 0 and available != 0:22222**************************************")
             print("********************WITHIN ELSE points == 0 and available != 0:22222**************************************")
             if available != 0:
-                worksheet.write(row,11,gtlt + '{:.2%}'.format(maxpoints),table_body_pct2)
+                worksheet.write(row,11,gtlt + '{:.2%}'.format(maxpoints),styles.table_body_pct2)
                 print("********************WITHIN ELSE points == 0 and available != 0:22222 PART II**************************************")
                 print("********************WITHIN ELSE points == 0 and available != 0:22222 PART II**************************************")
                 print("********************WITHIN ELSE points == 0 and available != 0:22222 PART II**************************************")
-                worksheet.merge_range(row, 12, row, 13, str(available) + " Points", table_body_pct2)
+                worksheet.merge_range(row, 12, row, 13, str(available) + " Points", styles.table_body_pct2)
         print("***************************PRINT # if points == 0 and available != 0:33333**********************")
         print("***************************PRINT # if points == 0 and available != 0:33333**********************")
         print("***************************PRINT # if points == 0 and available != 0:33333**********************")
         if points == cqmbenchmarks[measure_cd]['pointsmid'] and available != 0:
-            worksheet.write(row, 6, rate, table_body_pct2_yellow)
-            worksheet.write(row,14,gtlt + '{:.2%}'.format(midpoints),table_body_pct2_yellow)
-            worksheet.merge_range(row, 15, row, 16, str(cqmbenchmarks[measure_cd]['pointsmid']) + " Points", table_body_pct2_yellow)
+            worksheet.write(row, 6, rate, styles.table_body_pct2_yellow)
+            worksheet.write(row,14,gtlt + '{:.2%}'.format(midpoints),styles.table_body_pct2_yellow)
+            worksheet.merge_range(row, 15, row, 16, str(cqmbenchmarks[measure_cd]['pointsmid']) + " Points", styles.table_body_pct2_yellow)
         else:
             print("********************WITHIN ELSE points == 0 and available != 0:33333**************************************")
             print("********************WITHIN ELSE points == 0 and available != 0:33333**************************************")
             print("********************WITHIN ELSE points == 0 and available != 0:33333**************************************")
             if available != 0:
-                worksheet.write(row,14,gtlt + '{:.2%}'.format(midpoints),table_body_pct2)
-                worksheet.merge_range(row, 15, row, 16, str(cqmbenchmarks[measure_cd]['pointsmid']) + " Points", table_body_pct2)
+                worksheet.write(row,14,gtlt + '{:.2%}'.format(midpoints),styles.table_body_pct2)
+                worksheet.merge_range(row, 15, row, 16, str(cqmbenchmarks[measure_cd]['pointsmid']) + " Points", styles.table_body_pct2)
 
         print("***************************PRINT # if points == 0 and available != 0:44444**********************")
         print("***************************PRINT # if points == 0 and available != 0:44444**********************")
@@ -5831,21 +5442,21 @@ def cqmtable(worksheet, startrow, df):
         print(available)
         print(minpoints)
         if points == available * .5 and available != 0:
-            worksheet.write(row, 6, rate, table_body_pct2_orange)
-            worksheet.write(row,17,gtlt + '{:.2%}'.format(minpoints),table_body_pct2_orange)
-            worksheet.merge_range(row, 18, row, 19, str(cqmbenchmarks[measure_cd]['pointsmin']) + " Points", table_body_pct2_orange)
+            worksheet.write(row, 6, rate, styles.table_body_pct2_orange)
+            worksheet.write(row,17,gtlt + '{:.2%}'.format(minpoints),styles.table_body_pct2_orange)
+            worksheet.merge_range(row, 18, row, 19, str(cqmbenchmarks[measure_cd]['pointsmin']) + " Points", styles.table_body_pct2_orange)
         else:
             print("********************WITHIN ELSE points == 0 and available != 0:44444**************************************")
             print("********************WITHIN ELSE points == 0 and available != 0:44444**************************************")
             print("********************WITHIN ELSE points == 0 and available != 0:44444**************************************")
             if available != 0:
-                worksheet.write(row,17,gtlt + '{:.2%}'.format(minpoints),table_body_pct2)
+                worksheet.write(row,17,gtlt + '{:.2%}'.format(minpoints),styles.table_body_pct2)
                 print("********************WITHIN ELSE points == 0 and available != 0:44444 - 222222**************************************")
                 print("********************WITHIN ELSE points == 0 and available != 0:44444 - 222222**************************************")
                 print("********************WITHIN ELSE points == 0 and available != 0:44444 - 222222**************************************")
                 print(row)
-                print(table_body_pct2)
-                worksheet.merge_range(row, 18, row, 19, str(cqmbenchmarks[measure_cd]['pointsmin']) + " Points", table_body_pct2)
+                print(styles.table_body_pct2)
+                worksheet.merge_range(row, 18, row, 19, str(cqmbenchmarks[measure_cd]['pointsmin']) + " Points", styles.table_body_pct2)
                 
     for i in range(0, len(df)):
             cqmrow(startrow + 2 + i,
@@ -5861,15 +5472,18 @@ def cqmtable(worksheet, startrow, df):
     print("***************************PRINT # worksheet.write(startrow + len(df) + 2, 0, TOTAL, table_title:**********************")
     print("***************************PRINT # worksheet.write(startrow + len(df) + 2, 0, TOTAL, table_title:**********************")
     print("***************************PRINT # worksheet.write(startrow + len(df) + 2, 0, TOTAL, table_title:**********************")
-    worksheet.write(startrow + len(df) + 2, 0, "TOTAL", table_title)
-    worksheet.merge_range(startrow + len(df) + 2,1, startrow + len(df) + 2,7, df["total_points_earned"].values[0],table_title)
-    worksheet.merge_range(startrow + len(df) + 2,8, startrow + len(df) + 2,9, df["total_points_available"].values[0],table_title)
-    worksheet.merge_range(startrow + len(df) + 2,11,startrow + len(df) + 2,19,"",table_title)
+    worksheet.write(startrow + len(df) + 2, 0, "TOTAL", styles.table_title)
+    worksheet.merge_range(startrow + len(df) + 2,1, startrow + len(df) + 2,7, df["total_points_earned"].values[0],styles.table_title)
+    worksheet.merge_range(startrow + len(df) + 2,8, startrow + len(df) + 2,9, df["total_points_available"].values[0],styles.table_title)
+    worksheet.merge_range(startrow + len(df) + 2,11,startrow + len(df) + 2,19,"",styles.table_title)
 
     return startrow + len(df) + 4
 
 
-def cqm_monthly(wb, ws, df, measure_cd, startrow):
+# This function writes the monthly trend table and chart of one measure. df is
+# one hospital's store_trend() rows.
+def cqm_monthly(wb, ws, df, measure_cd, startrow, styles=None):
+    styles = bound_styles(styles)
     df = df.copy(
         deep=True).where(
         df['measure_cd'] == measure_cd).dropna(
@@ -5883,7 +5497,7 @@ def cqm_monthly(wb, ws, df, measure_cd, startrow):
             startrow,
             14,
             cqmbenchmarks[measure_cd]['title'],
-            table_title)
+            styles.table_title)
     else:
         ws.merge_range(
             startrow,
@@ -5891,27 +5505,27 @@ def cqm_monthly(wb, ws, df, measure_cd, startrow):
             startrow,
             8,
             cqmbenchmarks[measure_cd]['title'],
-            table_title)
+            styles.table_title)
     currow = startrow + 1
-    ws.merge_range(currow, 0, currow, 1, "Period", header)
-    ws.merge_range(currow, 2, currow, 3, "Denominator", header_num)
-    ws.merge_range(currow, 4, currow, 5, "Numerator", header_num)
+    ws.merge_range(currow, 0, currow, 1, "Period", styles.header)
+    ws.merge_range(currow, 2, currow, 3, "Denominator", styles.header_num)
+    ws.merge_range(currow, 4, currow, 5, "Numerator", styles.header_num)
 
     if measure_cd in ['rrama', 'rracomm']:
-        ws.merge_range(currow, 6, currow, 7, "Observed", header_num)
-        ws.merge_range(currow, 8, currow, 9, "Expected", header_num)
-        ws.merge_range(currow, 10, currow, 11, "Market Rate", header_num)
+        ws.merge_range(currow, 6, currow, 7, "Observed", styles.header_num)
+        ws.merge_range(currow, 8, currow, 9, "Expected", styles.header_num)
+        ws.merge_range(currow, 10, currow, 11, "Market Rate", styles.header_num)
         ws.merge_range(
             currow,
             12,
             currow,
             13,
             "Risk-Adjusted Rate",
-            header_num)
-        ws.write(currow, 14, "Tier", header)
+            styles.header_num)
+        ws.write(currow, 14, "Tier", styles.header)
     else:
-        ws.merge_range(currow, 6, currow, 7, "Rate", header_num)
-        ws.write(currow, 8, "Tier", header)
+        ws.merge_range(currow, 6, currow, 7, "Rate", styles.header_num)
+        ws.write(currow, 8, "Tier", styles.header)
 
     for i in range(0, 14):
         currow = currow + 1
@@ -5921,21 +5535,21 @@ def cqm_monthly(wb, ws, df, measure_cd, startrow):
                            ", " +
                            str(df['month'].values[i] +
                                1) +
-                           ", 1)-1", table_body_date)
+                           ", 1)-1", styles.table_body_date)
             ws.merge_range(
                 currow,
                 2,
                 currow,
                 3,
                 df['denominator'].values[i],
-                table_body)
+                styles.table_body)
             ws.merge_range(
                 currow,
                 4,
                 currow,
                 5,
                 df['numerator'].values[i],
-                table_body)
+                styles.table_body)
             if measure_cd in ['rrama', 'rracomm']:
                 ws.merge_range(
                     currow,
@@ -5943,29 +5557,29 @@ def cqm_monthly(wb, ws, df, measure_cd, startrow):
                     currow,
                     7,
                     df["observed"].values[i],
-                    table_body_pct2)
+                    styles.table_body_pct2)
                 ws.merge_range(
                     currow,
                     8,
                     currow,
                     9,
                     df["expected"].values[i],
-                    table_body_pct2)
+                    styles.table_body_pct2)
                 ws.merge_range(
                     currow,
                     10,
                     currow,
                     11,
                     df["mkt_expected"].values[i],
-                    table_body_pct2)
+                    styles.table_body_pct2)
                 ws.merge_range(
                     currow,
                     12,
                     currow,
                     13,
                     df["rate"].values[i],
-                    table_body_pct2)
-                ws.write(currow, 14, df["tier"].values[i], table_body)
+                    styles.table_body_pct2)
+                ws.write(currow, 14, df["tier"].values[i], styles.table_body)
             else:
                 ws.merge_range(
                     currow,
@@ -5973,21 +5587,21 @@ def cqm_monthly(wb, ws, df, measure_cd, startrow):
                     currow,
                     7,
                     df['rate'].values[i],
-                    table_body_pct2)
-                ws.write(currow, 8, df['tier'].values[i], table_body)
+                    styles.table_body_pct2)
+                ws.write(currow, 8, df['tier'].values[i], styles.table_body)
         except BaseException:
-            ws.merge_range(currow, 0, currow, 1, "", table_body_date)
-            ws.merge_range(currow, 2, currow, 3, '', table_body)
-            ws.merge_range(currow, 4, currow, 5, '', table_body)
+            ws.merge_range(currow, 0, currow, 1, "", styles.table_body_date)
+            ws.merge_range(currow, 2, currow, 3, '', styles.table_body)
+            ws.merge_range(currow, 4, currow, 5, '', styles.table_body)
             if measure_cd in ['rrama', 'rracomm']:
-                ws.merge_range(currow, 6, currow, 7, '', table_body_pct2)
-                ws.merge_range(currow, 8, currow, 9, '', table_body_pct2)
-                ws.merge_range(currow, 10, currow, 11, '', table_body_pct2)
-                ws.merge_range(currow, 12, currow, 13, '', table_body_pct2)
-                ws.write(currow, 14, '', table_body)
+                ws.merge_range(currow, 6, currow, 7, '', styles.table_body_pct2)
+                ws.merge_range(currow, 8, currow, 9, '', styles.table_body_pct2)
+                ws.merge_range(currow, 10, currow, 11, '', styles.table_body_pct2)
+                ws.merge_range(currow, 12, currow, 13, '', styles.table_body_pct2)
+                ws.write(currow, 14, '', styles.table_body)
             else:
-                ws.merge_range(currow, 6, currow, 7, '', table_body_pct2)
-                ws.write(currow, 8, '', table_body)
+                ws.merge_range(currow, 6, currow, 7, '', styles.table_body_pct2)
+                ws.write(currow, 8, '', styles.table_body)
 
     series1 = '=' + "'" + ws.get_name() + "'" + '!' + colnum_string(0) + str(startrow + 3) + \
         ':' + colnum_string(0) + str(startrow + 2 + len(df['month']))
@@ -6065,8 +5679,9 @@ def cqm_monthly(wb, ws, df, measure_cd, startrow):
     return currow + 2
 
 
-def hosp03_drivers(ws, df, startrow=6, startcol=0):
+def hosp03_drivers(ws, df, startrow=6, startcol=0, styles=None):
 
+    styles = bound_styles(styles)
     columns = {
         'Condition': 5,
         'Denominator': 1,
@@ -6090,35 +5705,35 @@ def hosp03_drivers(ws, df, startrow=6, startcol=0):
         startcol,
         columns['Condition'],
         "Condition",
-        headerwrap)
+        styles.headerwrap)
     curcol = itercol(
         ws,
         currow,
         curcol,
         columns['Denominator'],
         "Denominator",
-        headerwrap_num)
+        styles.headerwrap_num)
     curcol = itercol(
         ws,
         currow,
         curcol,
         columns['Numerator'],
         "Numerator",
-        headerwrap_num)
+        styles.headerwrap_num)
     curcol = itercol(
         ws,
         currow,
         curcol,
         columns['Rate'],
         "Rate",
-        headerwrap_num)
+        styles.headerwrap_num)
     curcol = itercol(
         ws,
         currow,
         curcol,
         columns['QB Program Rate'],
         "QB Program Rate",
-        headerwrap_num)
+        styles.headerwrap_num)
     #curcol = itercol(ws, currow, curcol, columns['Similar Size Rate'], "Similar Size Rate", headerwrap_num)
     curcol = itercol(
         ws,
@@ -6126,14 +5741,14 @@ def hosp03_drivers(ws, df, startrow=6, startcol=0):
         curcol,
         columns['% of Total Denominator'],
         "% of Total Denominator",
-        headerwrap_num)
+        styles.headerwrap_num)
     curcol = itercol(
         ws,
         currow,
         curcol,
         columns['% of Total Numerator'],
         "% of Total Numerator",
-        headerwrap_num)
+        styles.headerwrap_num)
 
     ws.merge_range(
         startrow,
@@ -6141,7 +5756,7 @@ def hosp03_drivers(ws, df, startrow=6, startcol=0):
         startrow,
         curcol - 1,
         "KEY DRIVERS",
-        table_title)
+        styles.table_title)
 
     for i in range(0, len(df)):
         curcol = startcol
@@ -6152,54 +5767,55 @@ def hosp03_drivers(ws, df, startrow=6, startcol=0):
             curcol,
             columns['Condition'],
             df['description'].values[i],
-            table_body)
+            styles.table_body)
         curcol = itercol(
             ws,
             currow,
             curcol,
             columns['Denominator'],
             df['hosp03_den'].values[i],
-            table_body)
+            styles.table_body)
         curcol = itercol(
             ws,
             currow,
             curcol,
             columns['Numerator'],
             df['hosp03_num'].values[i],
-            table_body)
+            styles.table_body)
         curcol = itercol(
             ws,
             currow,
             curcol,
             columns['Rate'],
             df['rate'].values[i],
-            table_body_pct2)
+            styles.table_body_pct2)
         curcol = itercol(
             ws,
             currow,
             curcol,
             columns['QB Program Rate'],
             df['program_rate'].values[i],
-            table_body_pct2)
+            styles.table_body_pct2)
         curcol = itercol(
             ws,
             currow,
             curcol,
             columns['% of Total Denominator'],
             df['pct_total_den'].values[i],
-            table_body_pct2)
+            styles.table_body_pct2)
         curcol = itercol(
             ws,
             currow,
             curcol,
             columns['% of Total Numerator'],
             df['pct_total_num'].values[i],
-            table_body_pct2)
+            styles.table_body_pct2)
 
     return currow + 2
 
-def hosp04_drivers(ws, df, startrow=6, startcol=0):
+def hosp04_drivers(ws, df, startrow=6, startcol=0, styles=None):
 
+    styles = bound_styles(styles)
     columns = {
         'Condition': 5,
         'Denominator': 1,
@@ -6223,35 +5839,35 @@ def hosp04_drivers(ws, df, startrow=6, startcol=0):
         startcol,
         columns['Condition'],
         "Condition",
-        headerwrap)
+        styles.headerwrap)
     curcol = itercol(
         ws,
         currow,
         curcol,
         columns['Denominator'],
         "Denominator",
-        headerwrap_num)
+        styles.headerwrap_num)
     curcol = itercol(
         ws,
         currow,
         curcol,
         columns['Numerator'],
         "Numerator",
-        headerwrap_num)
+        styles.headerwrap_num)
     curcol = itercol(
         ws,
         currow,
         curcol,
         columns['Rate'],
         "Rate",
-        headerwrap_num)
+        styles.headerwrap_num)
     curcol = itercol(
         ws,
         currow,
         curcol,
         columns['QB Program Rate'],
         "QB Program Rate",
-        headerwrap_num)
+        styles.headerwrap_num)
     #curcol = itercol(ws, currow, curcol, columns['Similar Size Rate'], "Similar Size Rate", headerwrap_num)
     curcol = itercol(
         ws,
@@ -6259,14 +5875,14 @@ def hosp04_drivers(ws, df, startrow=6, startcol=0):
         curcol,
         columns['% of Total Denominator'],
         "% of Total Denominator",
-        headerwrap_num)
+        styles.headerwrap_num)
     curcol = itercol(
         ws,
         currow,
         curcol,
         columns['% of Total Numerator'],
         "% of Total Numerator",
-        headerwrap_num)
+        styles.headerwrap_num)
 
     ws.merge_range(
         startrow,
@@ -6274,7 +5890,7 @@ def hosp04_drivers(ws, df, startrow=6, startcol=0):
         startrow,
         curcol - 1,
         "KEY DRIVERS",
-        table_title)
+        styles.table_title)
 
     for i in range(0, len(df)):
         curcol = startcol
@@ -6285,77 +5901,78 @@ def hosp04_drivers(ws, df, startrow=6, startcol=0):
             curcol,
             columns['Condition'],
             df['description'].values[i],
-            table_body)
+            styles.table_body)
         curcol = itercol(
             ws,
             currow,
             curcol,
             columns['Denominator'],
             df['hosp04_den'].values[i],
-            table_body)
+            styles.table_body)
         curcol = itercol(
             ws,
             currow,
             curcol,
             columns['Numerator'],
             df['hosp04_num'].values[i],
-            table_body)
+            styles.table_body)
         curcol = itercol(
             ws,
             currow,
             curcol,
             columns['Rate'],
             df['rate'].values[i],
-            table_body_pct2)
+            styles.table_body_pct2)
         curcol = itercol(
             ws,
             currow,
             curcol,
             columns['QB Program Rate'],
             df['program_rate'].values[i],
-            table_body_pct2)
+            styles.table_body_pct2)
         curcol = itercol(
             ws,
             currow,
             curcol,
             columns['% of Total Denominator'],
             df['pct_total_den'].values[i],
-            table_body_pct2)
+            styles.table_body_pct2)
         curcol = itercol(
             ws,
             currow,
             curcol,
             columns['% of Total Numerator'],
             df['pct_total_num'].values[i],
-            table_body_pct2)
+            styles.table_body_pct2)
 
     return currow + 2
 
-def hosp19_summary(ws, measure_cd, df, startrow=6, startcol=0):
+def hosp19_summary(ws, measure_cd, df, startrow=6, startcol=0, styles=None):
+    styles = bound_styles(styles)
     ws.merge_range(
         startrow,
         startcol,
         startrow,
         startcol + 9,
         cqmbenchmarks[measure_cd]['title'],
-        table_title)
+        styles.table_title)
     currow = startrow + 1
-    ws.merge_range(currow, startcol, currow, startcol + 4, "Scenario", header)
+    ws.merge_range(currow, startcol, currow, startcol + 4, "Scenario", styles.header)
     ws.merge_range(
         currow,
         startcol + 5,
         currow,
         startcol + 6,
         "Denominator",
-        header_num)
+        styles.header_num)
     ws.merge_range(
         currow,
         startcol + 7,
         currow,
         startcol + 8,
         "Numerator",
-        header_num)
-    ws.write(currow, startcol + 9, "Rate", header_num)
+        styles.header_num)
+    ws.write(currow, startcol + 9, "Rate", styles.header_num)
     currow = currow + 1
     ws.merge_range(
         currow,
@@ -6363,21 +5980,21 @@ def hosp19_summary(ws, measure_cd, df, startrow=6, startcol=0):
         currow,
         startcol + 4,
         "Hospital Rate",
-        table_body)
+        styles.table_body)
     ws.merge_range(currow, startcol + 5, currow, startcol + 6,
-                   df[measure_cd + '_den'].values[0], table_body)
+                   df[measure_cd + '_den'].values[0], styles.table_body)
     ws.merge_range(currow, startcol + 7, currow, startcol + 8,
-                   df[measure_cd + '_num'].values[0], table_body)
+                   df[measure_cd + '_num'].values[0], styles.table_body)
     try:
         ws.write(currow,
                  startcol + 9,
                  df[measure_cd + '_rate'].values[0],
-                 table_body_pct2)
+                 styles.table_body_pct2)
     except BaseException:
         ws.write(currow,
                  startcol + 9,
                  df[measure_cd + '_rate'].values[0],
-                 table_body_pct2)
+                 styles.table_body_pct2)
     currow = currow + 1
     ws.merge_range(
         currow,
@@ -6385,23 +6002,23 @@ def hosp19_summary(ws, measure_cd, df, startrow=6, startcol=0):
         currow,
         startcol + 4,
         "Same Hospital Rate",
-        table_body)
+        styles.table_body)
     ws.merge_range(currow, startcol + 5, currow, startcol + 6,
-                   df[measure_cd + '_num'].values[0], table_body)
+                   df[measure_cd + '_num'].values[0], styles.table_body)
     ws.merge_range(
         currow,
         startcol + 7,
         currow,
         startcol + 8,
         df['same_hosp_num'].values[0],
-        table_body)
+        styles.table_body)
     try:
         ws.write(currow, startcol +
                  9, df['same_hosp_num'].values[0] /
                  df[measure_cd +
-                    '_num'].values[0], table_body_pct2)
+                    '_num'].values[0], styles.table_body_pct2)
     except BaseException:
-        ws.write(currow, startcol + 9, '', table_body_pct2)
+        ws.write(currow, startcol + 9, '', styles.table_body_pct2)
     currow = currow + 1
     ws.merge_range(
         currow,
@@ -6409,26 +6026,27 @@ def hosp19_summary(ws, measure_cd, df, startrow=6, startcol=0):
         currow,
         startcol + 4,
         "Same Diagnosis Rate",
-        table_body)
+        styles.table_body)
     ws.merge_range(currow, startcol + 5, currow, startcol + 6,
-                   df[measure_cd + '_num'].values[0], table_body)
+                   df[measure_cd + '_num'].values[0], styles.table_body)
     ws.merge_range(currow, startcol + 7, currow, startcol + 8,
-                   df['same_dx_' + measure_cd + '_num'].values[0], table_body)
+                   df['same_dx_' + measure_cd + '_num'].values[0], styles.table_body)
     try:
         ws.write(currow, startcol +
                  9, df['same_dx_' +
                        measure_cd +
                        '_num'].values[0] /
                  df[measure_cd +
-                    '_num'].values[0], table_body_pct2)
+                    '_num'].values[0], styles.table_body_pct2)
     except BaseException:
-        ws.write(currow, startcol + 9, '', table_body_pct2)
+        ws.write(currow, startcol + 9, '', styles.table_body_pct2)
 
     return currow + 2
 
 
-def hosp19_drivers(ws, df, measure_cd, startrow=6, startcol=0):
+def hosp19_drivers(ws, df, measure_cd, startrow=6, startcol=0, styles=None):
 
+    styles = bound_styles(styles)
     columns = {
         'Primary Diagnosis': 5,
         'Code': 0,
@@ -6453,35 +6071,35 @@ def hosp19_drivers(ws, df, measure_cd, startrow=6, startcol=0):
         startcol,
         columns['Primary Diagnosis'],
         "Primary Diagnosis",
-        headerwrap)
+        styles.headerwrap)
     curcol = itercol(
         ws,
         currow,
         curcol,
         columns['Code'],
         "Code",
-        headerwrap_num)
+        styles.headerwrap_num)
     curcol = itercol(
         ws,
         currow,
         curcol,
         columns['Denominator'],
         "Denominator",
-        headerwrap_num)
+        styles.headerwrap_num)
     curcol = itercol(
         ws,
         currow,
         curcol,
         columns['Numerator'],
         "Numerator",
-        headerwrap_num)
+        styles.headerwrap_num)
     curcol = itercol(
         ws,
         currow,
         curcol,
         columns['Rate'],
         "Rate",
-        headerwrap_num)
+        styles.headerwrap_num)
     #curcol = itercol(ws, currow, curcol, columns['QB Program Rate'], "QB Program Rate", headerwrap_num)
     #curcol = itercol(ws, currow, curcol, columns['Similar Size Rate'], "Similar Size Rate", headerwrap_num)
     curcol = itercol(
@@ -6490,17 +6108,17 @@ def hosp19_drivers(ws, df, measure_cd, startrow=6, startcol=0):
         curcol,
         columns['% of Total Denominator'],
         "% of Total Denominator",
-        headerwrap_num)
+        styles.headerwrap_num)
     curcol = itercol(
         ws,
         currow,
         curcol,
         columns['% of Total Numerator'],
         "% of Total Numerator",
-        headerwrap_num)
+        styles.headerwrap_num)
 
     ws.merge_range(startrow, startcol, startrow, curcol -
-                   1, "Top 20 Diagnosis Codes by Volume", table_title)
+                   1, "Top 20 Diagnosis Codes by Volume", styles.table_title)
 
     for i in range(0, len(df)):
         curcol = startcol
@@ -6511,32 +6129,32 @@ def hosp19_drivers(ws, df, measure_cd, startrow=6, startcol=0):
             curcol,
             columns['Primary Diagnosis'],
             df['description'].values[i],
-            table_body)
+            styles.table_body)
         curcol = itercol(
             ws,
             currow,
             curcol,
             columns['Code'],
             df['PRI_DIAG_CD'].values[i],
-            table_body)
+            styles.table_body)
         curcol = itercol(ws,
                          currow,
                          curcol,
                          columns['Denominator'],
                          df['dx_' + measure_cd + '_den'].values[i],
-                         table_body)
+                         styles.table_body)
         curcol = itercol(ws,
                          currow,
                          curcol,
                          columns['Numerator'],
                          df['dx_' + measure_cd + '_num'].values[i],
-                         table_body)
+                         styles.table_body)
         curcol = itercol(ws,
                          currow,
                          curcol,
                          columns['Rate'],
                          df['dx_' + measure_cd + '_rate'].values[i],
-                         table_body_pct2)
+                         styles.table_body_pct2)
         #curcol = itercol(ws, currow, curcol, columns['QB Program Rate'], "", table_body_pct2)
         curcol = itercol(
             ws,
@@ -6544,19 +6162,20 @@ def hosp19_drivers(ws, df, measure_cd, startrow=6, startcol=0):
             curcol,
             columns['% of Total Denominator'],
             df['pct_total_den'].values[i],
-            table_body_pct2)
+            styles.table_body_pct2)
         curcol = itercol(
             ws,
             currow,
             curcol,
             columns['% of Total Numerator'],
             df['pct_total_num'].values[i],
-            table_body_pct2)
+            styles.table_body_pct2)
 
     return currow + 2
 
 
-def readm_top5(ws, df, category, startrow=6, startcol=0):
+def readm_top5(ws, df, category, startrow=6, startcol=0, styles=None):
+    styles = bound_styles(styles)
     df = df.copy(deep=True).where(df['pcr_den'] >= 5).dropna().sort_values(
         by=['risk_adjust_rate', 'pcr_den'], ascending=[True, False])
     df2 = df.copy(deep=True).where(df['pcr_den'] >= 5).dropna().sort_values(
@@ -6594,7 +6213,7 @@ def readm_top5(ws, df, category, startrow=6, startcol=0):
             startcol,
             columns['Description'],
             'Description',
-            headerwrap)
+            styles.headerwrap)
         #curcol = itercol(ws, currow, curcol, columns['Code'], 'Code', headerwrap)
         curcol = itercol(
             ws,
@@ -6602,56 +6221,56 @@ def readm_top5(ws, df, category, startrow=6, startcol=0):
             curcol,
             columns['Denominator'],
             'Denominator',
-            headerwrap_num)
+            styles.headerwrap_num)
         curcol = itercol(
             ws,
             currow,
             curcol,
             columns['Numerator'],
             'Numerator',
-            headerwrap_num)
+            styles.headerwrap_num)
         curcol = itercol(
             ws,
             currow,
             curcol,
             columns['Observed Rate'],
             'Observed Rate',
-            headerwrap_num)
+            styles.headerwrap_num)
         curcol = itercol(
             ws,
             currow,
             curcol,
             columns['Expected Rate'],
             'Expected Rate',
-            headerwrap_num)
+            styles.headerwrap_num)
         curcol = itercol(
             ws,
             currow,
             curcol,
             columns['Market Observed Rate'],
             'Market Rate',
-            headerwrap_num)
+            styles.headerwrap_num)
         curcol = itercol(
             ws,
             currow,
             curcol,
             columns['Risk-Adjusted Rate'],
             'Risk-Adjusted Rate',
-            headerwrap_num)
+            styles.headerwrap_num)
         curcol = itercol(
             ws,
             currow,
             curcol,
             columns['% of Total Denominator'],
             "% of Total Denominator",
-            headerwrap_num)
+            styles.headerwrap_num)
         curcol = itercol(
             ws,
             currow,
             curcol,
             columns['% of Total Numerator'],
             "% of Total Numerator",
-            headerwrap_num)
+            styles.headerwrap_num)
 
         ws.merge_range(
             currow - 1,
@@ -6659,7 +6278,7 @@ def readm_top5(ws, df, category, startrow=6, startcol=0):
             currow - 1,
             curcol - 1,
             titletext,
-            table_title)
+            styles.table_title)
         ws.set_row(currow, 45)
 
         return currow + 1
@@ -6668,7 +6287,7 @@ def readm_top5(ws, df, category, startrow=6, startcol=0):
         currow = header(categories[category]['title'], startrow, startcol)
         for i in range(0, len(df)):
             curcol = itercol(ws, currow, startcol, columns['Description'], str(
-                df[category + '_description'].values[i]), table_body)
+                df[category + '_description'].values[i]), styles.table_body)
             #curcol = itercol(ws, currow, curcol, columns['Code'], df[categories[category]['codevar']].values[i], table_body)
             curcol = itercol(
                 ws,
@@ -6676,56 +6295,56 @@ def readm_top5(ws, df, category, startrow=6, startcol=0):
                 curcol,
                 columns['Denominator'],
                 df['pcr_den'].values[i],
-                table_body)
+                styles.table_body)
             curcol = itercol(
                 ws,
                 currow,
                 curcol,
                 columns['Numerator'],
                 df['pcr_num'].values[i],
-                table_body)
+                styles.table_body)
             curcol = itercol(
                 ws,
                 currow,
                 curcol,
                 columns['Observed Rate'],
                 df['observed_rate'].values[i],
-                table_body_pct2)
+                styles.table_body_pct2)
             curcol = itercol(
                 ws,
                 currow,
                 curcol,
                 columns['Expected Rate'],
                 df['expected_rate'].values[i],
-                table_body_pct2)
+                styles.table_body_pct2)
             curcol = itercol(
                 ws,
                 currow,
                 curcol,
                 columns['Market Observed Rate'],
                 df['reg_observed_rate'].values[i],
-                table_body_pct2)
+                styles.table_body_pct2)
             curcol = itercol(
                 ws,
                 currow,
                 curcol,
                 columns['Risk-Adjusted Rate'],
                 df['risk_adjust_rate'].values[i],
-                table_body_pct2)
+                styles.table_body_pct2)
             curcol = itercol(
                 ws,
                 currow,
                 curcol,
                 columns['% of Total Denominator'],
                 df['pct_tot_den'].values[i],
-                table_body_pct2)
+                styles.table_body_pct2)
             curcol = itercol(
                 ws,
                 currow,
                 curcol,
                 columns['% of Total Numerator'],
                 df['pct_tot_num'].values[i],
-                table_body_pct2)
+                styles.table_body_pct2)
             currow = currow + 1
     else:
         currow = header(
@@ -6735,7 +6354,7 @@ def readm_top5(ws, df, category, startrow=6, startcol=0):
             startcol)
         for i in range(0, 5):
             curcol = itercol(ws, currow, startcol, columns['Description'], str(
-                df[category + '_description'].values[i]), table_body)
+                df[category + '_description'].values[i]), styles.table_body)
             #curcol = itercol(ws, currow, curcol, columns['Code'], df[categories[category]['codevar']].values[i], table_body)
             curcol = itercol(
                 ws,
@@ -6743,56 +6362,56 @@ def readm_top5(ws, df, category, startrow=6, startcol=0):
                 curcol,
                 columns['Denominator'],
                 df['pcr_den'].values[i],
-                table_body)
+                styles.table_body)
             curcol = itercol(
                 ws,
                 currow,
                 curcol,
                 columns['Numerator'],
                 df['pcr_num'].values[i],
-                table_body)
+                styles.table_body)
             curcol = itercol(
                 ws,
                 currow,
                 curcol,
                 columns['Observed Rate'],
                 df['observed_rate'].values[i],
-                table_body_pct2)
+                styles.table_body_pct2)
             curcol = itercol(
                 ws,
                 currow,
                 curcol,
                 columns['Expected Rate'],
                 df['expected_rate'].values[i],
-                table_body_pct2)
+                styles.table_body_pct2)
             curcol = itercol(
                 ws,
                 currow,
                 curcol,
                 columns['Market Observed Rate'],
                 df['reg_observed_rate'].values[i],
-                table_body_pct2)
+                styles.table_body_pct2)
             curcol = itercol(
                 ws,
                 currow,
                 curcol,
                 columns['Risk-Adjusted Rate'],
                 df['risk_adjust_rate'].values[i],
-                table_body_pct2)
+                styles.table_body_pct2)
             curcol = itercol(
                 ws,
                 currow,
                 curcol,
                 columns['% of Total Denominator'],
                 df['pct_tot_den'].values[i],
-                table_body_pct2)
+                styles.table_body_pct2)
             curcol = itercol(
                 ws,
                 currow,
                 curcol,
                 columns['% of Total Numerator'],
                 df['pct_tot_num'].values[i],
-                table_body_pct2)
+                styles.table_body_pct2)
             currow = currow + 1
         currow = currow + 1
         currow = header(
@@ -6802,7 +6421,7 @@ def readm_top5(ws, df, category, startrow=6, startcol=0):
             startcol)
         for i in range(0, 5):
             curcol = itercol(ws, currow, startcol, columns['Description'], str(
-                df2[category + '_description'].values[i]), table_body)
+                df2[category + '_description'].values[i]), styles.table_body)
             #curcol = itercol(ws, currow, curcol, columns['Code'], df[categories[category]['codevar']].values[i], table_body)
             curcol = itercol(
                 ws,
@@ -6810,63 +6429,64 @@ def readm_top5(ws, df, category, startrow=6, startcol=0):
                 curcol,
                 columns['Denominator'],
                 df2['pcr_den'].values[i],
-                table_body)
+                styles.table_body)
             curcol = itercol(
                 ws,
                 currow,
                 curcol,
                 columns['Numerator'],
                 df2['pcr_num'].values[i],
-                table_body)
+                styles.table_body)
             curcol = itercol(
                 ws,
                 currow,
                 curcol,
                 columns['Observed Rate'],
                 df2['observed_rate'].values[i],
-                table_body_pct2)
+                styles.table_body_pct2)
             curcol = itercol(
                 ws,
                 currow,
                 curcol,
                 columns['Expected Rate'],
                 df2['expected_rate'].values[i],
-                table_body_pct2)
+                styles.table_body_pct2)
             curcol = itercol(
                 ws,
                 currow,
                 curcol,
                 columns['Market Observed Rate'],
                 df2['reg_observed_rate'].values[i],
-                table_body_pct2)
+                styles.table_body_pct2)
             curcol = itercol(
                 ws,
                 currow,
                 curcol,
                 columns['Risk-Adjusted Rate'],
                 df2['risk_adjust_rate'].values[i],
-                table_body_pct2)
+                styles.table_body_pct2)
             curcol = itercol(
                 ws,
                 currow,
                 curcol,
                 columns['% of Total Denominator'],
                 df2['pct_tot_den'].values[i],
-                table_body_pct2)
+                styles.table_body_pct2)
             curcol = itercol(
                 ws,
                 currow,
                 curcol,
                 columns['% of Total Numerator'],
                 df2['pct_tot_num'].values[i],
-                table_body_pct2)
+                styles.table_body_pct2)
             currow = currow + 1
 
     return currow + 1
 
 
-def hosp21_drivers(ws, df, startrow=6, startcol=0):
+def hosp21_drivers(ws, df, startrow=6, startcol=0, styles=None):
 
+    styles = bound_styles(styles)
     columns = {
         'Condition': 5,
         'Denominator': 1,
@@ -6890,28 +6510,28 @@ def hosp21_drivers(ws, df, startrow=6, startcol=0):
         startcol,
         columns['Condition'],
         "Episode DRG",
-        headerwrap)
+        styles.headerwrap)
     curcol = itercol(
         ws,
         currow,
         curcol,
         columns['Denominator'],
         "Denominator",
-        headerwrap_num)
+        styles.headerwrap_num)
     curcol = itercol(
         ws,
         currow,
         curcol,
         columns['Numerator'],
         "Numerator",
-        headerwrap_num)
+        styles.headerwrap_num)
     curcol = itercol(
         ws,
         currow,
         curcol,
         columns['Rate'],
         "Rate",
-        headerwrap_num)
+        styles.headerwrap_num)
     #curcol = itercol(ws, currow, curcol, columns['QB Program Rate'], "QB Program Rate", headerwrap_num)
     #curcol = itercol(ws, currow, curcol, columns['Similar Size Rate'], "Similar Size Rate", headerwrap_num)
     curcol = itercol(
@@ -6920,14 +6540,14 @@ def hosp21_drivers(ws, df, startrow=6, startcol=0):
         curcol,
         columns['% of Total Denominator'],
         "% of Total Denominator",
-        headerwrap_num)
+        styles.headerwrap_num)
     curcol = itercol(
         ws,
         currow,
         curcol,
         columns['% of Total Numerator'],
         "% of Total Numerator",
-        headerwrap_num)
+        styles.headerwrap_num)
 
     ws.merge_range(
         startrow,
@@ -6935,7 +6555,7 @@ def hosp21_drivers(ws, df, startrow=6, startcol=0):
         startrow,
         curcol - 1,
         "KEY DRIVERS",
-        table_title)
+        styles.table_title)
 
     for i in range(0, len(df)):
         curcol = startcol
@@ -6946,28 +6566,28 @@ def hosp21_drivers(ws, df, startrow=6, startcol=0):
             curcol,
             columns['Condition'],
             df['description'].values[i],
-            table_body)
+            styles.table_body)
         curcol = itercol(
             ws,
             currow,
             curcol,
             columns['Denominator'],
             df['hosp21_den'].values[i],
-            table_body)
+            styles.table_body)
         curcol = itercol(
             ws,
             currow,
             curcol,
             columns['Numerator'],
             df['hosp21_num'].values[i],
-            table_body)
+            styles.table_body)
         curcol = itercol(
             ws,
             currow,
             curcol,
             columns['Rate'],
             df['hosp21_rate'].values[i],
-            table_body_pct2)
+            styles.table_body_pct2)
         #curcol = itercol(ws, currow, curcol, columns['QB Program Rate'], "", table_body_pct2)
         curcol = itercol(
             ws,
@@ -6975,14 +6595,14 @@ def hosp21_drivers(ws, df, startrow=6, startcol=0):
             curcol,
             columns['% of Total Denominator'],
             df['pct_tot_den'].values[i],
-            table_body_pct2)
+            styles.table_body_pct2)
         curcol = itercol(
             ws,
             currow,
             curcol,
             columns['% of Total Numerator'],
             df['pct_tot_num'].values[i],
-            table_body_pct2)
+            styles.table_body_pct2)
 
     return currow + 2
 
@@ -6997,8 +6617,10 @@ def dennum_table(
         mkt=0,
         rate=0,
         startrow=6,
-        startcol=0):
+        startcol=0,
+        styles=None):
 
+    styles = bound_styles(styles)
     if msr in ['rrama', 'rracomm']:
         ws.merge_range(
             startrow,
@@ -7006,7 +6628,7 @@ def dennum_table(
             startrow,
             startcol + 11,
             cqmbenchmarks[msr]['title'],
-            table_title)
+            styles.table_title)
         ws.set_row(startrow + 1, 30)
         ws.merge_range(
             startrow + 1,
@@ -7014,84 +6636,84 @@ def dennum_table(
             startrow + 1,
             startcol + 1,
             'Denominator',
-            header_num)
+            styles.header_num)
         ws.merge_range(
             startrow + 1,
             startcol + 2,
             startrow + 1,
             startcol + 3,
             'Numerator',
-            header_num)
+            styles.header_num)
         ws.merge_range(
             startrow + 1,
             startcol + 4,
             startrow + 1,
             startcol + 5,
             'Observed Rate',
-            header_num)
+            styles.header_num)
         ws.merge_range(
             startrow + 1,
             startcol + 6,
             startrow + 1,
             startcol + 7,
             'Expected Rate',
-            header_num)
+            styles.header_num)
         ws.merge_range(
             startrow + 1,
             startcol + 8,
             startrow + 1,
             startcol + 9,
             'Market Expected Rate',
-            headerwrap_num)
+            styles.headerwrap_num)
         ws.merge_range(
             startrow + 1,
             startcol + 10,
             startrow + 1,
             startcol + 11,
             'Risk-Adjusted Rate',
-            header_num)
+            styles.header_num)
         ws.merge_range(
             startrow + 2,
             startcol,
             startrow + 2,
             startcol + 1,
             den,
-            table_body)
+            styles.table_body)
         ws.merge_range(
             startrow + 2,
             startcol + 2,
             startrow + 2,
             startcol + 3,
             num,
-            table_body)
+            styles.table_body)
         ws.merge_range(
             startrow + 2,
             startcol + 4,
             startrow + 2,
             startcol + 5,
             obs,
-            table_body_pct2)
+            styles.table_body_pct2)
         ws.merge_range(
             startrow + 2,
             startcol + 6,
             startrow + 2,
             startcol + 7,
             exp,
-            table_body_pct2)
+            styles.table_body_pct2)
         ws.merge_range(
             startrow + 2,
             startcol + 8,
             startrow + 2,
             startcol + 9,
             mkt,
-            table_body_pct2)
+            styles.table_body_pct2)
         ws.merge_range(
             startrow + 2,
             startcol + 10,
             startrow + 2,
             startcol + 11,
             rate,
-            table_body_pct2)
+            styles.table_body_pct2)
     else:
         ws.merge_range(
             startrow,
@@ -7099,49 +6721,49 @@ def dennum_table(
             startrow,
             startcol + 5,
             cqmbenchmarks[msr]['title'],
-            table_title)
+            styles.table_title)
         ws.merge_range(
             startrow + 1,
             startcol,
             startrow + 1,
             startcol + 1,
             'Denominator',
-            header_num)
+            styles.header_num)
         ws.merge_range(
             startrow + 1,
             startcol + 2,
             startrow + 1,
             startcol + 3,
             'Numerator',
-            header_num)
+            styles.header_num)
         ws.merge_range(
             startrow + 1,
             startcol + 4,
             startrow + 1,
             startcol + 5,
             'Rate',
-            header_num)
+            styles.header_num)
         ws.merge_range(
             startrow + 2,
             startcol,
             startrow + 2,
             startcol + 1,
             den,
-            table_body)
+            styles.table_body)
         ws.merge_range(
             startrow + 2,
             startcol + 2,
             startrow + 2,
             startcol + 3,
             num,
-            table_body)
+            styles.table_body)
         ws.merge_range(
             startrow + 2,
             startcol + 4,
             startrow + 2,
             startcol + 5,
             rate,
-            table_body_pct2)
+            styles.table_body_pct2)
 
     return startrow + 4
 